@@ -6,6 +6,8 @@ from enum import Enum
 from typing import Any, Dict, Optional, Protocol, runtime_checkable, List, Literal, Tuple
 from abc import ABC, abstractmethod
 
+from adapters.klines import Klines
+
 
     
 # -----------------------------
@@ -72,6 +74,24 @@ class OrderStatus:
     raw: Optional[Dict[str, Any]] = None    # exchange raw payload (optional)
 
 
+@dataclass(frozen=True)
+class OrderResult:
+    """Per-order outcome of a batch call (place_orders / cancel_orders)."""
+    ok: bool
+    symbol: str
+    order_id: Optional[str] = None
+    client_order_id: Optional[str] = None
+    code: Optional[str] = None              # exchange / adapter error code when not ok
+    message: str = ""
+    raw: Optional[Dict[str, Any]] = None    # dry-run: the batch payload this order was sent in
+
+
+def _result_code(e: Exception) -> Optional[str]:
+    if isinstance(e, NotImplementedError):
+        return "not_implemented"
+    return getattr(e, "code", None)
+
+
 # -----------------------------
 # Capabilities
 # -----------------------------
@@ -179,6 +199,13 @@ class TradingAdapter(Protocol):
         """
         ...
 
+    def get_order_book(self, symbol: str, limit: int = 50) -> Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]:
+        """
+        Return (bids, asks) as [(price, size), ...], best level first.
+        bids descending, asks ascending.
+        """
+        ...
+
     # --- account state ---
     def get_balances(self) -> List[Balance]: ...
 
@@ -193,6 +220,57 @@ class TradingAdapter(Protocol):
 
     def get_order(self, order_id: str, *, symbol: Optional[str] = None) -> OrderStatus: ...
 
+    def get_open_orders(self, symbol: Optional[str] = None) -> List[OrderStatus]:
+        """Live orders (all symbols when None, if the venue allows). Return empty list if not supported."""
+        return []
+
+    def cancel_all_orders(self, symbol: Optional[str] = None) -> List[OrderResult]:
+        """
+        Venue-side cancel-all for one symbol (or the whole category when None).
+        One OrderResult per order the venue reports as cancelled.
+        """
+        ...
+
+    def place_orders(self, reqs: List[OrderRequest]) -> List[OrderResult]:
+        """
+        Place many orders; one OrderResult per request, same order.
+        Default: one place_order per request (adapters with a batch endpoint override).
+        """
+        out: List[OrderResult] = []
+        for r in reqs:
+            try:
+                st = self.place_order(r)
+                out.append(OrderResult(
+                    ok=True,
+                    symbol=r.symbol,
+                    order_id=getattr(st, "order_id", None),
+                    client_order_id=r.client_order_id,
+                    raw=st if isinstance(st, dict) else getattr(st, "raw", None),
+                ))
+            except (AdapterError, NotImplementedError) as e:
+                # a venue without live orders still answers once per request
+                out.append(OrderResult(ok=False, symbol=r.symbol, client_order_id=r.client_order_id, code=_result_code(e), message=str(e)))
+        return out
+
+    def cancel_orders(self, order_ids: List[str], *, symbol: Optional[str] = None) -> List[OrderResult]:
+        """Cancel many orders; one OrderResult per id, same order. Default: one cancel_order per id."""
+        out: List[OrderResult] = []
+        for oid in order_ids:
+            try:
+                self.cancel_order(oid, symbol=symbol)
+                out.append(OrderResult(ok=True, symbol=symbol or "", order_id=oid))
+            except (AdapterError, NotImplementedError) as e:
+                out.append(OrderResult(ok=False, symbol=symbol or "", order_id=oid, code=_result_code(e), message=str(e)))
+        return out
+
+    def get_klines(self, symbol: str, interval: str, start_ms: int, end_ms: Optional[int] = None) -> Klines:
+        """
+        Candles ("1m" ... "1w", see adapters/klines.INTERVAL_MS) with
+        start_ms <= open time <= end_ms, columnar and deduped by open time.
+        Long ranges are paginated past the venue's per-call limit.
+        """
+        raise NotImplementedError(f"{self.name}: get_klines not supported")
+
     def get_daily_closes(self, symbol: str, n: int = 50) -> List[float]:
             """Return daily close prices (ascending by time)."""
             ...
@@ -1,70 +1,149 @@
 # adapters/bybit/trading.py
 from __future__ import annotations
 
-import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple, cast
-from urllib.error import HTTPError, URLError
 from urllib.parse import urlencode
-from urllib.request import Request, urlopen
 
 from adapters.base import (
+    AdapterError,
     Balance,
     Capabilities,
+    ErrorClass,
     MarketInfo,
     OrderRequest,
+    OrderResult,
     OrderStatus,
     TradingAdapter,
 )
+from adapters.clock import ClockSync
+from adapters.klines import Klines, fetch_klines
+from adapters.ratelimit import Priority, get_rate_limiter
+from adapters.rest import RestClient
+from adapters.signing import BybitSigner, bybit_signer_from_auth
+from utils.auth_loader_bybit import load_bybit_api_keys
 
 
 @dataclass
 class BybitTradingConfig:
     dry_run: bool = True
-    base_url: str = "https://api-demo.bybit.com"
+    base_url: Optional[str] = None      # None: BYBIT_BASE_URL, else the demo host
     category: str = "linear"  # "linear" | "spot" | "inverse" etc.
+    # equivalent REST hosts for hedged reads (e.g. https://api.bytick.com for mainnet)
+    alt_base_urls: Tuple[str, ...] = ()
+    recv_window_ms: int = 5000
+
+
+# max orders per create-batch / cancel-batch request
+BATCH_LIMITS: Dict[str, int] = {"spot": 10, "linear": 20, "inverse": 20, "option": 20}
+_BATCH_WORKERS = 4
+
+# OrderRequest spelling -> Bybit v5 enums (case sensitive on the venue)
+_BYBIT_SIDE = {"buy": "Buy", "sell": "Sell"}
+_BYBIT_ORDER_TYPE = {"limit": "Limit", "market": "Market"}
+
+# max candles per /v5/market/kline call; normalized interval -> Bybit spelling
+KLINE_LIMIT = 1000
+_KLINE_INTERVALS: Dict[str, str] = {
+    "1m": "1", "3m": "3", "5m": "5", "15m": "15", "30m": "30", "1h": "60", "2h": "120",
+    "4h": "240", "6h": "360", "12h": "720", "1d": "D", "1w": "W",
+}
 
 
 class BybitTradingAdapter(TradingAdapter):
     """
     Read-only + dry-run capable adapter for Bybit v5 public endpoints.
     - Market data: executable (public)
-    - Orders: dry-run returns payload; live raises NotImplementedError (for now)
+    - Orders: dry-run returns payload; live is signed create / cancel
+      (cancels need the symbol: Bybit has no cross-symbol cancel by id)
+    - Batch orders: create-batch / cancel-batch (dry-run payloads or signed live)
     """
 
     def __init__(self, config: Optional[BybitTradingConfig] = None):
         self.config = config or BybitTradingConfig()
-        self.base_url = (
-            os.environ.get("BYBIT_BASE_URL", self.config.base_url).rstrip("/")
-        )
-        # allow env override for category too
+        # an explicit config.base_url wins; the env var is only the default
+        base_url = (
+            self.config.base_url or os.environ.get("BYBIT_BASE_URL") or "https://api-demo.bybit.com"
+        ).strip().rstrip("/")
+        # category: env override
         self.config.category = os.environ.get("BYBIT_CATEGORY", self.config.category)
         self._instrument_cache: Dict[str, MarketInfo] = {}
+        self._clock: Optional[ClockSync] = None
+        self._clock_lock = threading.Lock()
+        self._signer: Optional[BybitSigner] = None
+        # request budget is per IP/UID -> one limiter shared by all bybit adapters
+        self._rest = RestClient(
+            "bybit",
+            base_url,
+            limiter=get_rate_limiter("bybit"),
+            ret_code_key="retCode",
+            no_cache=("/v5/market/time",),
+            alt_base_urls=_env_list("BYBIT_ALT_BASE_URLS") or self.config.alt_base_urls,
+            probe_path="/v5/market/time",
+        )
+
+    @property
+    def base_url(self) -> str:
+        return self._rest.base_url
+
+    @base_url.setter
+    def base_url(self, value: str) -> None:
+        self._rest.base_url = value.rstrip("/")
+
+    def endpoint_status(self) -> Dict[str, Any]:
+        """Active host + per-host RTT / failures."""
+        return self._rest.pool.status()
+
+    def start_endpoint_probe(self, interval_sec: float = 30.0) -> None:
+        """Background RTT probe of every configured host (no-op with a single host)."""
+        if len(self._rest.pool) > 1:
+            self._rest.pool.start(self._rest.probe, interval_sec=interval_sec)
+
+    def warm_up(self, connections: int = 2, *, keepalive_sec: float = 15.0) -> List[Dict[str, Any]]:
+        """Resolve DNS, open pooled connections and send one cheap request per host."""
+        return self._rest.warm_up(connections=connections, keepalive_sec=keepalive_sec)
 
     # -------------------------
     # HTTP helpers
     # -------------------------
-    def _get_json(self, path: str, *, timeout: float = 10.0) -> Dict[str, Any]:
-        url = f"{self.base_url}{path}"
-        req = Request(url, headers={"User-Agent": "UnivBot/1.0"})
-        try:
-            with urlopen(req, timeout=timeout) as resp:
-                raw = resp.read().decode("utf-8", errors="replace")
-        except HTTPError as e:
-            raise RuntimeError(f"bybit http error: {e.code} {e.reason} url={url}") from e
-        except URLError as e:
-            raise RuntimeError(f"bybit network error: {e.reason} url={url}") from e
-        except Exception as e:
-            raise RuntimeError(f"bybit request failed: {e!r} url={url}") from e
-
-        try:
-            data = json.loads(raw)
-        except Exception as e:
-            raise RuntimeError(f"bybit invalid json: {raw[:200]} url={url}") from e
-
-        # Bybit normally returns dict
-        return data if isinstance(data, dict) else {"raw": data}
+    def _get_json(
+        self, path: str, *, timeout: float = 10.0, priority: Priority = Priority.NORMAL
+    ) -> Dict[str, Any]:
+        return self._rest.get_json(path, timeout=timeout, priority=priority)
+
+    @property
+    def signer(self) -> Optional[BybitSigner]:
+        """HMAC signer from BYBIT_API_KEY / BYBIT_API_SECRET (None in the public core)."""
+        if self._signer is None:
+            auth = dict(load_bybit_api_keys())
+            auth.setdefault("recv_window", self.config.recv_window_ms)
+            # timestamps from the server-clock estimate: no time request per order
+            self._signer = bybit_signer_from_auth(auth, clock=lambda: self.clock.timestamp_ms())
+        return self._signer
+
+    def _private_json(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        *,
+        timeout: float = 10.0,
+        priority: Priority = Priority.HIGH,
+    ) -> Dict[str, Any]:
+        signer = self.signer
+        if signer is None:
+            raise AdapterError(
+                "bybit private endpoint needs BYBIT_API_KEY / BYBIT_API_SECRET",
+                error_class=ErrorClass.STOP,
+                code="auth_missing",
+                details={"path": path},
+            )
+        return self._rest.signed_json(
+            lambda: signer.sign(method, path, params), timeout=timeout, priority=priority
+        )
 
     # -------------------------
     # TradingAdapter interface
@@ -96,22 +175,51 @@ class BybitTradingAdapter(TradingAdapter):
         _ = self.get_server_time_ms()
 
     def get_server_time_ms(self) -> int:
+        return int(self._server_time_precise_ms())
+
+    def _server_time_precise_ms(self) -> float:
         timeout = float(os.environ.get("BYBIT_HTTP_TIMEOUT", "10"))
-        j = self._get_json("/v5/market/time", timeout=timeout)
-        # Prefer result.timeSecond if present; fallback to top-level "time"
+        j = self._get_json("/v5/market/time", timeout=timeout, priority=Priority.HIGH)
+        # most precise first: result.timeNano (ns) > top-level "time" (ms) > result.timeSecond (s)
         result = j.get("result") or {}
-        t = result.get("timeSecond")
-        if isinstance(t, (int, float)):
-            return int(t) * 1000
-        if isinstance(t, str) and t.strip().isdigit():
-            return int(t.strip()) * 1000
+        tn = result.get("timeNano")
+        if isinstance(tn, (int, float)) or (isinstance(tn, str) and tn.strip().isdigit()):
+            return int(tn) / 1_000_000.0
 
         t2 = j.get("time")
         if isinstance(t2, (int, float)):
-            return int(t2)
+            return float(t2)
         if isinstance(t2, str) and t2.strip().isdigit():
-            return int(t2.strip())
-        return 0
+            return float(t2.strip())
+
+        t = result.get("timeSecond")
+        if isinstance(t, (int, float)):
+            return float(t) * 1000.0
+        if isinstance(t, str) and t.strip().isdigit():
+            return float(t.strip()) * 1000.0
+        # never a fake 0: ClockSync.sync() drops samples that raise
+        raise RuntimeError(f"bybit: no parsable server time in {j!r}")
+
+    @property
+    def clock(self) -> ClockSync:
+        """Server clock estimator (lazy; background refresh every UNIVBOT_CLOCK_REFRESH_SEC)."""
+        clock = self._clock
+        if clock is None:
+            # first use may race (md thread + order thread): one estimator, one refresh thread
+            with self._clock_lock:
+                if self._clock is None:
+                    clock = ClockSync(
+                        self._server_time_precise_ms,
+                        refresh_sec=float(os.environ.get("UNIVBOT_CLOCK_REFRESH_SEC", "60")),
+                    )
+                    clock.start()
+                    self._clock = clock
+                clock = self._clock
+        return clock
+
+    def now_server_ms(self) -> int:
+        """Estimated Bybit time without a round trip (local wall clock until first sync)."""
+        return self.clock.timestamp_ms()
 
     def normalize_symbol(self, symbol: str) -> str:
         # Bybit expects e.g. "BTCUSDT"
@@ -142,8 +250,28 @@ class BybitTradingAdapter(TradingAdapter):
         # bids/asks: [["price","size"], ...] (strings)
         return float(bids[0][0]), float(asks[0][0])
 
+    def get_order_book(self, symbol: str, limit: int = 50) -> Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]:
+        sym = self.normalize_symbol(symbol)
+        params = {"category": self.config.category, "symbol": sym, "limit": int(limit)}
+        qs = urlencode(params)
+
+        timeout = float(os.environ.get("BYBIT_HTTP_TIMEOUT", "10"))
+        j = self._get_json(f"/v5/market/orderbook?{qs}", timeout=timeout)
+
+        result = j.get("result") or {}
+        bids = [(float(p), float(q)) for p, q, *_ in (result.get("b") or [])]
+        asks = [(float(p), float(q)) for p, q, *_ in (result.get("a") or [])]
+        if not bids or not asks:
+            raise RuntimeError(f"bybit orderbook empty for {sym}: {j}")
+        return bids, asks
+
     def get_daily_closes(self, symbol: str, n: int = 50) -> List[float]:
         sym = self.normalize_symbol(symbol)
+        if n > KLINE_LIMIT:
+            # more than one call can return: paginated backfill
+            now = int(self.clock.timestamp_ms())
+            k = self.get_klines(sym, "1d", now - n * 86_400_000, now)
+            return list(k.close)[-n:]
         params = {"category": self.config.category, "symbol": sym, "interval": "D", "limit": n}
         qs = urlencode(params)
 
@@ -155,9 +283,26 @@ class BybitTradingAdapter(TradingAdapter):
             raise RuntimeError(f"no kline returned for {sym}: {j}")
 
         # Each entry: [timestamp(ms), open, high, low, close, volume, turnover]
-        arr.sort(key=lambda x: int(x[0]) if x and x[0] is not None else 0)
+        # (sorted copy: responses may be shared between coalesced callers)
+        arr = sorted(arr, key=lambda x: int(x[0]) if x and x[0] is not None else 0)
         return [float(e[4]) for e in arr]
 
+    def get_klines(self, symbol: str, interval: str, start_ms: int, end_ms: Optional[int] = None) -> Klines:
+        """Candles with start_ms <= open time <= end_ms (default: now), any range length."""
+        sym = self.normalize_symbol(symbol)
+        iv = _KLINE_INTERVALS.get(interval)
+        if iv is None:
+            raise ValueError(f"bybit: unsupported kline interval {interval!r}")
+        timeout = float(os.environ.get("BYBIT_HTTP_TIMEOUT", "10"))
+
+        def page(a: int, b: int, limit: int) -> Klines:
+            params = {"category": self.config.category, "symbol": sym, "interval": iv, "start": a, "end": b, "limit": limit}
+            j = self._get_json(f"/v5/market/kline?{urlencode(params)}", timeout=timeout, priority=Priority.LOW)
+            # [startTime, open, high, low, close, volume, turnover], newest first
+            return Klines.from_raw(sym, interval, (j.get("result") or {}).get("list") or [])
+
+        return fetch_klines(sym, interval, start_ms, end_ms, page, limit=KLINE_LIMIT)
+
     def get_market_info(self, symbol: str) -> MarketInfo:
         sym = self.normalize_symbol(symbol)
 
@@ -204,65 +349,294 @@ class BybitTradingAdapter(TradingAdapter):
         return []
 
     # -------------------------
-    # Orders (dry-run only for now)
+    # Orders (dry-run payloads or signed live)
     # -------------------------
-    def place_order(self, req: OrderRequest) -> OrderStatus:
-        # Build a Bybit v5 create payload (safe minimal)
+    def _order_body(self, req: OrderRequest) -> Dict[str, Any]:
+        # Bybit v5 create payload (safe minimal)
         body: Dict[str, Any] = {
             "category": self.config.category,
             "symbol": self.normalize_symbol(req.symbol),
-            "side": req.side,
-            "orderType": req.order_type,
+            "side": _BYBIT_SIDE.get(req.side, req.side),
+            "orderType": _BYBIT_ORDER_TYPE.get(req.order_type, req.order_type),
             "qty": str(req.qty),
         }
         if req.price is not None:
             body["price"] = str(req.price)
         if req.time_in_force is not None:
             body["timeInForce"] = req.time_in_force
-        if req.reduce_only is not None:
+        if req.reduce_only is not None and self.config.category != "spot":
+            # spot has no reduce-only orders
             body["reduceOnly"] = bool(req.reduce_only)
         if req.client_order_id is not None:
             body["orderLinkId"] = str(req.client_order_id)
+        return body
+
+    @staticmethod
+    def _id_key(order_id: str) -> str:
+        # heuristics: if looks like our client ids (safe-buy-...), use orderLinkId; else orderId
+        if isinstance(order_id, str) and ("safe-" in order_id or "orderLinkId" in order_id):
+            return "orderLinkId"
+        return "orderId"
+
+    def _cancel_body(self, order_id: str, symbol: Optional[str]) -> Dict[str, Any]:
+        if not symbol:
+            # a guessed symbol would cancel nothing (or the wrong book): fail this order instead
+            raise AdapterError(
+                f"bybit cancel needs a symbol: {order_id}",
+                error_class=ErrorClass.STOP,
+                code="symbol_required",
+                details={"order_id": order_id},
+            )
+        return {
+            "category": self.config.category,
+            "symbol": self.normalize_symbol(symbol),
+            self._id_key(order_id): order_id,
+        }
+
+    def place_order(self, req: OrderRequest) -> OrderStatus:
+        body = self._order_body(req)
 
         if self.config.dry_run:
             payload = {"dry_run": True, "path": "/v5/order/create", "body": body}
             return cast(OrderStatus, payload)
 
-        raise NotImplementedError("live order placement not implemented yet")
+        timeout = float(os.environ.get("BYBIT_HTTP_TIMEOUT", "10"))
+        j = self._private_json("POST", "/v5/order/create", body, timeout=timeout, priority=Priority.HIGH)
+        res = j.get("result") or {}
+        return OrderStatus(
+            order_id=str(res.get("orderId") or ""),
+            client_order_id=res.get("orderLinkId") or req.client_order_id,
+            symbol=body["symbol"],
+            side=req.side,
+            order_type=req.order_type,
+            qty=float(req.qty),
+            filled_qty=0.0,
+            avg_price=None,
+            status="new",
+            raw=res,
+        )
 
     def cancel_order(self, order_id: str, *, symbol: Optional[str] = None) -> None:
-        body: Dict[str, Any] = {
-            "category": self.config.category,
-            "symbol": self.normalize_symbol(symbol or BTC_SYMBOL_FALLBACK()),
-            # prefer orderLinkId for safety if caller passes client id; else use orderId
-        }
-        # heuristics: if looks like our client ids (safe-buy-...), use orderLinkId
-        if isinstance(order_id, str) and ("safe-" in order_id or "orderLinkId" in order_id):
-            body["orderLinkId"] = order_id
-        else:
-            body["orderId"] = order_id
+        body = self._cancel_body(order_id, symbol)
 
         if self.config.dry_run:
             _ = {"dry_run": True, "path": "/v5/order/cancel", "body": body}
             return None
 
-        raise NotImplementedError("live order cancel not implemented yet")
+        timeout = float(os.environ.get("BYBIT_HTTP_TIMEOUT", "10"))
+        self._private_json("POST", "/v5/order/cancel", body, timeout=timeout, priority=Priority.CRITICAL)
+        return None
+
+    # -------------------------
+    # Batch orders (create-batch / cancel-batch)
+    # -------------------------
+    def _batch_limit(self) -> int:
+        return BATCH_LIMITS.get(self.config.category, 10)
+
+    def place_orders(self, reqs: List[OrderRequest]) -> List[OrderResult]:
+        """
+        /v5/order/create-batch, chunked to the category limit (spot 10, others 20).
+        Chunks are sent concurrently; results keep the input order.
+        """
+        items = []
+        for r in reqs:
+            b = self._order_body(r)
+            b.pop("category", None)
+            items.append(b)
+        return self._batch("/v5/order/create-batch", items)
+
+    def cancel_orders(self, order_ids: List[str], *, symbol: Optional[str] = None) -> List[OrderResult]:
+        """/v5/order/cancel-batch, chunked like place_orders (no symbol: every id fails symbol_required)."""
+        if not symbol:
+            return [
+                OrderResult(ok=False, symbol="", order_id=oid, code="symbol_required", message="bybit cancel needs a symbol")
+                for oid in order_ids
+            ]
+        items = []
+        for oid in order_ids:
+            b = self._cancel_body(oid, symbol)
+            b.pop("category", None)
+            items.append(b)
+        return self._batch("/v5/order/cancel-batch", items)
+
+    def _batch(self, path: str, items: List[Dict[str, Any]]) -> List[OrderResult]:
+        if not items:
+            return []
+        n = self._batch_limit()
+        chunks = [items[i:i + n] for i in range(0, len(items), n)]
+        payloads = [{"category": self.config.category, "request": c} for c in chunks]
+
+        if self.config.dry_run:
+            out: List[OrderResult] = []
+            for p in payloads:
+                dry = {"dry_run": True, "path": path, "body": p}
+                out.extend(
+                    OrderResult(
+                        ok=True,
+                        symbol=it["symbol"],
+                        order_id=it.get("orderId"),
+                        client_order_id=it.get("orderLinkId"),
+                        raw=dry,
+                    )
+                    for it in p["request"]
+                )
+            return out
+
+        timeout = float(os.environ.get("BYBIT_HTTP_TIMEOUT", "10"))
+
+        def _send(p: Dict[str, Any]) -> List[OrderResult]:
+            try:
+                j = self._private_json("POST", path, p, timeout=timeout, priority=Priority.CRITICAL if "cancel" in path else Priority.HIGH)
+            except AdapterError as e:
+                # whole chunk failed: same error for every order in it
+                return [
+                    OrderResult(
+                        ok=False,
+                        symbol=it["symbol"],
+                        order_id=it.get("orderId"),
+                        client_order_id=it.get("orderLinkId"),
+                        code=e.code,
+                        message=str(e),
+                    )
+                    for it in p["request"]
+                ]
+            return _batch_results(p["request"], j)
+
+        if len(payloads) == 1:
+            return _send(payloads[0])
+        with ThreadPoolExecutor(max_workers=min(len(payloads), _BATCH_WORKERS)) as pool:
+            return [r for chunk in pool.map(_send, payloads) for r in chunk]
+
+    # -------------------------
+    # Open orders / cancel-all (kill switch path)
+    # -------------------------
+    def _scope(self, symbol: Optional[str]) -> Dict[str, Any]:
+        """symbol, or the whole settle coin for derivatives (linear / inverse need one of them)."""
+        q: Dict[str, Any] = {"category": self.config.category}
+        if symbol:
+            q["symbol"] = self.normalize_symbol(symbol)
+        elif self.config.category in ("linear", "inverse"):
+            q["settleCoin"] = os.environ.get("BYBIT_SETTLE_COIN", "USDT")
+        return q
+
+    def get_open_orders(self, symbol: Optional[str] = None) -> List[OrderStatus]:
+        if self.config.dry_run:
+            return []
+        timeout = float(os.environ.get("BYBIT_HTTP_TIMEOUT", "10"))
+        q = self._scope(symbol)
+        q.update({"openOnly": 0, "limit": 50})
+        out: List[OrderStatus] = []
+        while True:
+            j = self._private_json("GET", "/v5/order/realtime", q, timeout=timeout, priority=Priority.CRITICAL)
+            result = j.get("result") or {}
+            out.extend(_parse_order(r) for r in (result.get("list") or []))
+            cursor = result.get("nextPageCursor")
+            if not cursor:
+                return out
+            q["cursor"] = cursor
+
+    def cancel_all_orders(self, symbol: Optional[str] = None) -> List[OrderResult]:
+        """/v5/order/cancel-all for one symbol or the whole category / settle coin."""
+        body = self._scope(symbol)
+        if self.config.dry_run:
+            dry = {"dry_run": True, "path": "/v5/order/cancel-all", "body": body}
+            return [OrderResult(ok=True, symbol=str(body.get("symbol") or ""), raw=dry)]
+
+        timeout = float(os.environ.get("BYBIT_HTTP_TIMEOUT", "10"))
+        j = self._private_json("POST", "/v5/order/cancel-all", body, timeout=timeout, priority=Priority.CRITICAL)
+        rows = (j.get("result") or {}).get("list") or []
+        return [
+            OrderResult(
+                ok=True,
+                symbol=str(r.get("symbol") or body.get("symbol") or ""),
+                order_id=r.get("orderId"),
+                client_order_id=r.get("orderLinkId") or None,
+                raw=r,
+            )
+            for r in rows
+        ]
 
     def get_order(self, order_id: str, *, symbol: Optional[str] = None) -> OrderStatus:
+        q = self._scope(symbol)
+        q[self._id_key(order_id)] = order_id
         if self.config.dry_run:
-            payload = {
-                "dry_run": True,
-                "path": "/v5/order/realtime",
-                "query": {
-                    "category": self.config.category,
-                    "symbol": self.normalize_symbol(symbol or BTC_SYMBOL_FALLBACK()),
-                    "orderId": order_id,
-                },
-            }
+            payload = {"dry_run": True, "path": "/v5/order/realtime", "query": q}
             return cast(OrderStatus, payload)
-        raise NotImplementedError("live get_order not implemented yet")
 
+        timeout = float(os.environ.get("BYBIT_HTTP_TIMEOUT", "10"))
+        j = self._private_json("GET", "/v5/order/realtime", q, timeout=timeout)
+        rows = (j.get("result") or {}).get("list") or []
+        if not rows:
+            # realtime (openOnly=0) lists live orders only: a fill / cancel since the
+            # last look is in the history, and must not read as "unknown order"
+            j = self._private_json("GET", "/v5/order/history", q, timeout=timeout)
+            rows = (j.get("result") or {}).get("list") or []
+        if not rows:
+            raise AdapterError(
+                f"bybit order not found: {order_id}",
+                error_class=ErrorClass.STOP,
+                code="order_not_found",
+                details={"order_id": order_id, "symbol": q.get("symbol")},
+            )
+        return _parse_order(rows[0])
+
+
+_BYBIT_STATUS: Dict[str, str] = {
+    "Created": "new",
+    "New": "new",
+    "Untriggered": "new",
+    "PartiallyFilled": "partially_filled",
+    "Filled": "filled",
+    "Cancelled": "canceled",
+    "PartiallyFilledCanceled": "canceled",
+    "Deactivated": "canceled",
+    "Rejected": "rejected",
+    "Triggered": "new",
+}
+
+
+def _parse_order(r: Dict[str, Any]) -> OrderStatus:
+    """Bybit v5 order row (realtime / history) -> OrderStatus."""
+    avg = r.get("avgPrice")
+    return OrderStatus(
+        order_id=str(r.get("orderId") or ""),
+        client_order_id=r.get("orderLinkId") or None,
+        symbol=str(r.get("symbol") or ""),
+        side="buy" if str(r.get("side") or "").lower() == "buy" else "sell",
+        order_type="market" if str(r.get("orderType") or "").lower() == "market" else "limit",
+        qty=float(r.get("qty") or 0.0),
+        filled_qty=float(r.get("cumExecQty") or 0.0),
+        avg_price=float(avg) if avg not in (None, "", "0") else None,
+        status=cast(Any, _BYBIT_STATUS.get(str(r.get("orderStatus") or ""), "new")),
+        raw=r,
+    )
+
+
+def _batch_results(sent: List[Dict[str, Any]], j: Dict[str, Any]) -> List[OrderResult]:
+    """Zip result.list with retExtInfo.list (both aligned with the request list)."""
+    rows = (j.get("result") or {}).get("list") or []
+    infos = (j.get("retExtInfo") or {}).get("list") or []
+    out: List[OrderResult] = []
+    for i, it in enumerate(sent):
+        row = rows[i] if i < len(rows) and isinstance(rows[i], dict) else {}
+        info = infos[i] if i < len(infos) and isinstance(infos[i], dict) else {}
+        code = info.get("code", 0)
+        ok = code in (0, "0")
+        out.append(
+            OrderResult(
+                ok=ok,
+                symbol=str(row.get("symbol") or it["symbol"]),
+                order_id=str(row.get("orderId") or it.get("orderId") or "") or None,
+                client_order_id=str(row.get("orderLinkId") or it.get("orderLinkId") or "") or None,
+                code=None if ok else str(code),
+                message=str(info.get("msg") or ""),
+                raw=row or None,
+            )
+        )
+    return out
+
+
+def _env_list(name: str) -> Tuple[str, ...]:
+    v = os.environ.get(name, "")
+    return tuple(x.strip() for x in v.split(",") if x.strip())
 
-def BTC_SYMBOL_FALLBACK() -> str:
-    # used only when cancel/get_order called without symbol
-    return "BTCUSDT"
@@ -0,0 +1,376 @@
+# adapters/capture.py
+"""
+Capture / replay of raw exchange responses.
+
+Capture: every response body the HTTP layer receives (and anything a stream
+layer hands to Recorder.record) is written with its receive timestamp to
+append-only segment files:
+
+    segment = frame*
+    frame   = b"UBR1" | u32 payload_len | u32 crc32 | zlib(records)
+    record  = u64 recv_ns | u16 status | u16 kind_len | u32 key_len
+              | u32 hdr_len | u32 body_len | kind | key | headers(json) | body
+
+Records are buffered and compressed per block (a frame), so compression
+sees many similar payloads at once; compression and file writes run on a
+background writer thread, off the request path. A torn last frame (crash)
+is skipped on read. Segments roll over at `segment_bytes`.
+
+Replay: ReplayTransport is a drop-in for HttpTransport. Each request gets
+the next recorded response for the same method + path + query (host and
+volatile signing params ignored), either as fast as possible or at the recorded pace, and
+goes through the same parsing code as live traffic. Its ReplayClock becomes
+the process clock (adapters.clock.get_clock): "now" is the receive time of
+the latest served record, and sleep() under asap advances that time instead
+of blocking, so TTLs and refresh cadences see the recorded timeline.
+
+  UNIVBOT_CAPTURE_DIR=out/capture   record (get_transport() wraps the live transport)
+  UNIVBOT_REPLAY_DIR=out/capture    replay instead of the network
+  UNIVBOT_REPLAY_PACE=asap|recorded|<speed multiplier>
+"""
+from __future__ import annotations
+
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Mapping, NamedTuple, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from adapters.clock import SystemClock
+from adapters.transport import HttpResponse, HttpTransport
+
+_MAGIC = b"UBR1"
+_FRAME = struct.Struct("<4sII")
+_REC = struct.Struct("<QHHIII")
+SEGMENT_SUFFIX = ".ubr"
+
+# query params that change on every signed request
+_VOLATILE_PARAMS = frozenset({"timestamp", "signature", "recvWindow"})
+
+
+class CaptureRecord(NamedTuple):
+    recv_ns: int
+    kind: str          # "http" | stream channel name
+    key: str           # "GET /path?query"
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+
+def request_key(method: str, url: str) -> str:
+    """
+    Replay match key: method + path + stable query. Host is left out (endpoint
+    failover picks hosts at run time) and signing params are dropped.
+    """
+    u = urlsplit(url)
+    q = [(k, v) for k, v in parse_qsl(u.query, keep_blank_values=True) if k not in _VOLATILE_PARAMS]
+    query = urlencode(sorted(q))
+    return f"{method.upper()} {u.path}" + (f"?{query}" if query else "")
+
+
+# -------------------------
+# Writer
+# -------------------------
+class Recorder:
+    """
+    Buffers records in the calling thread; full blocks are handed to one
+    background writer thread that compresses and appends them in order, so
+    zlib never runs on the request path. flush() / close() wait for the
+    writer; at most `max_pending` blocks queue up before record() waits.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        *,
+        block_records: int = 256,
+        block_bytes: int = 1 << 20,
+        flush_sec: float = 2.0,
+        segment_bytes: int = 64 << 20,
+        level: int = 6,
+        max_pending: int = 64,
+    ) -> None:
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.block_records = block_records
+        self.block_bytes = block_bytes
+        self.flush_sec = flush_sec
+        self.segment_bytes = segment_bytes
+        self.level = level
+        self._lock = threading.Lock()
+        self._buf: List[bytes] = []
+        self._buf_bytes = 0
+        self._last_flush = time.monotonic()
+        self._q: "queue.Queue[Optional[List[bytes]]]" = queue.Queue(maxsize=max_pending)
+        self._writer: Optional[threading.Thread] = None
+        # writer thread only
+        self._fh: Optional[Any] = None
+        self._seg_bytes = 0
+        self._seq = 0
+        self.stats: Dict[str, int] = {"records": 0, "raw_bytes": 0, "written_bytes": 0, "frames": 0, "write_errors": 0}
+
+    def record(
+        self,
+        kind: str,
+        key: str,
+        body: bytes,
+        *,
+        status: int = 0,
+        headers: Optional[Mapping[str, str]] = None,
+        recv_ns: Optional[int] = None,
+    ) -> None:
+        k = kind.encode("utf-8")
+        kk = key.encode("utf-8")
+        h = json.dumps(dict(headers or {}), separators=(",", ":")).encode("utf-8") if headers else b""
+        rec = b"".join((
+            _REC.pack(recv_ns if recv_ns is not None else time.time_ns(), status, len(k), len(kk), len(h), len(body)),
+            k, kk, h, body,
+        ))
+        with self._lock:
+            self._buf.append(rec)
+            self._buf_bytes += len(rec)
+            self.stats["records"] += 1
+            self.stats["raw_bytes"] += len(rec)
+            if (
+                len(self._buf) >= self.block_records
+                or self._buf_bytes >= self.block_bytes
+                or time.monotonic() - self._last_flush >= self.flush_sec
+            ):
+                self._handoff_locked()
+
+    def flush(self) -> None:
+        """Hand off the current block and wait until everything queued is on disk."""
+        with self._lock:
+            self._handoff_locked()
+        self._q.join()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._q.put(None)
+            writer.join()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _handoff_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buf:
+            return
+        block, self._buf, self._buf_bytes = self._buf, [], 0
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, name="capture-writer", daemon=True)
+            self._writer.start()
+        # under the lock: blocks reach the writer in record order
+        self._q.put(block)
+
+    def _write_loop(self) -> None:
+        while True:
+            block = self._q.get()
+            try:
+                if block is None:
+                    return
+                self._write_block(block)
+            except Exception:
+                # capture must never take the trading path down with it
+                self.stats["write_errors"] += 1
+            finally:
+                self._q.task_done()
+
+    def _write_block(self, block: List[bytes]) -> None:
+        payload = zlib.compress(b"".join(block), self.level)
+        if self._fh is None or self._seg_bytes >= self.segment_bytes:
+            if self._fh is not None:
+                self._fh.close()
+            self._seq += 1
+            name = time.strftime("capture-%Y%m%d-%H%M%S", time.gmtime()) + f"-{os.getpid()}-{self._seq:04d}{SEGMENT_SUFFIX}"
+            self._fh = open(self.dir / name, "ab")
+            self._seg_bytes = 0
+        frame = _FRAME.pack(_MAGIC, len(payload), zlib.crc32(payload)) + payload
+        self._fh.write(frame)
+        self._fh.flush()
+        self._seg_bytes += len(frame)
+        self.stats["written_bytes"] += len(frame)
+        self.stats["frames"] += 1
+
+
+# -------------------------
+# Reader
+# -------------------------
+def segment_files(directory: Union[str, Path]) -> List[Path]:
+    return sorted(Path(directory).glob(f"*{SEGMENT_SUFFIX}"))
+
+
+def read_segment(path: Union[str, Path]) -> Iterator[CaptureRecord]:
+    data = Path(path).read_bytes()
+    off = 0
+    n = len(data)
+    while off + _FRAME.size <= n:
+        magic, plen, crc = _FRAME.unpack_from(data, off)
+        start = off + _FRAME.size
+        if magic != _MAGIC or start + plen > n:
+            return                      # torn tail
+        payload = data[start:start + plen]
+        off = start + plen
+        if zlib.crc32(payload) != crc:
+            continue
+        block = zlib.decompress(payload)
+        p = 0
+        while p < len(block):
+            ns, status, kl, kkl, hl, bl = _REC.unpack_from(block, p)
+            p += _REC.size
+            kind = block[p:p + kl].decode("utf-8"); p += kl
+            key = block[p:p + kkl].decode("utf-8"); p += kkl
+            hdr = json.loads(block[p:p + hl]) if hl else {}; p += hl
+            body = block[p:p + bl]; p += bl
+            yield CaptureRecord(ns, kind, key, status, hdr, body)
+
+
+def read_records(directory: Union[str, Path], *, kind: Optional[str] = None) -> Iterator[CaptureRecord]:
+    """All records of every segment, segment order then write order."""
+    for f in segment_files(directory):
+        for r in read_segment(f):
+            if kind is None or r.kind == kind:
+                yield r
+
+
+# -------------------------
+# Transports
+# -------------------------
+class RecordingTransport:
+    """Live transport that also records every response (same interface as HttpTransport)."""
+
+    def __init__(self, inner: HttpTransport, recorder: Recorder) -> None:
+        self.inner = inner
+        self.recorder = recorder
+
+    def __getattr__(self, item: str) -> Any:
+        # warm / keepalive / stats / dns of the live transport
+        return getattr(self.inner, item)
+
+    def request(self, method: str, url: str, **kw: Any) -> HttpResponse:
+        resp = self.inner.request(method, url, **kw)
+        self.recorder.record(
+            "http",
+            request_key(method, url),
+            resp.body,
+            status=resp.status,
+            headers=resp.headers,
+            recv_ns=time.time_ns(),
+        )
+        return resp
+
+
+class ReplayClock(SystemClock):
+    """
+    Recorded timeline. asap: time = latest served recv_ns, advanced by
+    sleep() without blocking. paced: recorded time of the first served
+    record + real elapsed time * speed. Before anything was served: wall clock.
+    """
+
+    def __init__(self, speed: float = 0.0) -> None:
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._now_ns = 0
+        self._t0_rec: Optional[int] = None
+        self._t0_wall = 0.0
+
+    def observe(self, recv_ns: int) -> float:
+        """A record was served: advance the clock; returns seconds to wait before handing it out."""
+        with self._lock:
+            if self._t0_rec is None:
+                self._t0_rec, self._t0_wall = recv_ns, time.monotonic()
+            self._now_ns = max(self._now_ns, recv_ns)
+            if self.speed <= 0:
+                return 0.0
+            due = self._t0_wall + (recv_ns - self._t0_rec) / 1e9 / self.speed
+        return max(0.0, due - time.monotonic())
+
+    def time_ns(self) -> int:
+        with self._lock:
+            if self._t0_rec is None:
+                return time.time_ns()
+            if self.speed > 0:
+                return self._t0_rec + int((time.monotonic() - self._t0_wall) * 1e9 * self.speed)
+            return self._now_ns
+
+    def time_ms(self) -> int:
+        return self.time_ns() // 1_000_000
+
+    def monotonic(self) -> float:
+        return self.time_ns() / 1e9
+
+    def sleep(self, sec: float) -> None:
+        if self.speed > 0:
+            time.sleep(sec / self.speed)
+            return
+        with self._lock:
+            if self._t0_rec is not None:
+                self._now_ns += int(sec * 1e9)
+
+
+class ReplayTransport:
+    """Serves recorded responses instead of the network."""
+
+    def __init__(self, directory: Union[str, Path], *, pace: Union[str, float] = "asap", loop: bool = False) -> None:
+        self.directory = Path(directory)
+        self.loop = loop
+        self.speed = 0.0 if pace == "asap" else (1.0 if pace == "recorded" else float(pace))
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[CaptureRecord]] = {}
+        self._served: Dict[str, List[CaptureRecord]] = {}
+        self.clock = ReplayClock(self.speed)
+        self.stats: Dict[str, int] = {"loaded": 0, "served": 0, "miss": 0}
+        for r in read_records(self.directory, kind="http"):
+            self._queues.setdefault(r.key, deque()).append(r)
+            self.stats["loaded"] += 1
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: Optional[Mapping[str, str]] = None,
+        body: Optional[bytes] = None,
+        timeout: Optional[float] = None,
+    ) -> HttpResponse:
+        key = request_key(method, url)
+        with self._lock:
+            q = self._queues.get(key)
+            if not q and self.loop and self._served.get(key):
+                q = self._queues[key] = deque(self._served.pop(key))
+            if not q:
+                self.stats["miss"] += 1
+                miss = json.dumps({"replay": "miss", "key": key}).encode("utf-8")
+                return HttpResponse(404, "Replay Miss", {"Content-Type": "application/json"}, miss)
+            rec = q.popleft()
+            if self.loop:
+                self._served.setdefault(key, []).append(rec)
+            self.stats["served"] += 1
+            delay = self.clock.observe(rec.recv_ns)
+
+        if delay > 0:
+            time.sleep(delay)
+        return HttpResponse(rec.status, "OK" if rec.status < 400 else "", rec.headers, rec.body)
+
+    # HttpTransport interface used by RestClient.warm_up(): nothing to warm in replay
+    def warm(self, base_url: str, **kw: Any) -> Dict[str, Any]:
+        return {"host": base_url, "replay": True, "connections": 0, "ok": 0}
+
+    def start_keepalive(self, *, interval_sec: float = 15.0) -> None:
+        return None
+
+    def stop_keepalive(self) -> None:
+        return None
+
+    def remaining(self) -> int:
+        with self._lock:
+            return sum(len(q) for q in self._queues.values())
@@ -0,0 +1,207 @@
+# adapters/clock.py
+"""
+Server clock-offset estimator (NTP-style, RTT/2 compensation).
+
+sync() samples the exchange time endpoint several times:
+    offset = server_ms - (local_send + local_recv) / 2
+keeps the lowest-RTT half of the samples (least queueing noise) and takes
+their median. Successive syncs fit a drift (ppm) so now_server_ms() stays
+accurate between refreshes. now_server_ms() is a local computation: no
+request on the signing / TTL path.
+
+Times are anchored on time.monotonic() so wall-clock jumps on the host do
+not move the estimate.
+
+get_clock() is the process clock (wall ms / monotonic / sleep) for code
+that judges ages and schedules work: the system clock live, the replay
+clock (adapters.capture.ReplayClock, driven by recorded receive times)
+under UNIVBOT_REPLAY_DIR.
+"""
+from __future__ import annotations
+
+import os
+import statistics as st
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ClockSample:
+    mono_ms: float        # local monotonic midpoint of the request
+    server_ms: float
+    rtt_ms: float
+
+
+class ClockSync:
+    def __init__(
+        self,
+        sample_fn: Callable[[], float],
+        *,
+        samples: int = 5,
+        refresh_sec: float = 60.0,
+        history: int = 16,
+    ) -> None:
+        """sample_fn() -> server time in ms (float, as precise as the venue gives)."""
+        self.sample_fn = sample_fn
+        self.samples = max(1, samples)
+        self.refresh_sec = refresh_sec
+        self._lock = threading.Lock()
+        # (monotonic ms, offset ms) per sync, for drift
+        self._history: Deque[Tuple[float, float]] = deque(maxlen=history)
+        self._anchor_mono = 0.0
+        self._anchor_offset = 0.0      # server - monotonic at anchor
+        self._drift = 0.0              # d(offset)/d(mono), dimensionless
+        self._rtt_ms: Optional[float] = None
+        self._synced_mono = 0.0
+        self._wall_minus_mono = time.time() * 1000.0 - time.monotonic() * 1000.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -------------------------
+    # Sampling
+    # -------------------------
+    def _sample(self) -> ClockSample:
+        t0 = time.monotonic() * 1000.0
+        server = float(self.sample_fn())
+        t1 = time.monotonic() * 1000.0
+        return ClockSample(mono_ms=(t0 + t1) / 2.0, server_ms=server, rtt_ms=t1 - t0)
+
+    def sync(self) -> Dict[str, Any]:
+        got: List[ClockSample] = []
+        for _ in range(self.samples):
+            try:
+                got.append(self._sample())
+            except Exception:
+                continue
+        if not got:
+            raise RuntimeError("clock sync failed: no server time samples")
+
+        got.sort(key=lambda s: s.rtt_ms)
+        best = got[: max(1, (len(got) + 1) // 2)]
+        offset = st.median(s.server_ms - s.mono_ms for s in best)
+        mono = st.median(s.mono_ms for s in best)
+
+        with self._lock:
+            self._history.append((mono, offset))
+            if len(self._history) >= 2:
+                xs = [h[0] for h in self._history]
+                ys = [h[1] for h in self._history]
+                mx, my = st.fmean(xs), st.fmean(ys)
+                den = sum((x - mx) ** 2 for x in xs)
+                self._drift = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / den if den > 0 else 0.0
+            self._anchor_mono = mono
+            self._anchor_offset = offset
+            self._rtt_ms = best[0].rtt_ms
+            self._synced_mono = time.monotonic() * 1000.0
+        return self.status()
+
+    # -------------------------
+    # Reads (no I/O)
+    # -------------------------
+    @property
+    def synced(self) -> bool:
+        return self._synced_mono > 0
+
+    def offset_ms(self) -> float:
+        """server - local wall clock, in ms (what the venue thinks minus what we think)."""
+        mono = time.monotonic() * 1000.0
+        return self.now_server_ms() - (mono + self._wall_minus_mono)
+
+    def now_server_ms(self) -> float:
+        """Estimated exchange time; falls back to local wall clock before the first sync."""
+        mono = time.monotonic() * 1000.0
+        with self._lock:
+            if not self._synced_mono:
+                return time.time() * 1000.0
+            return mono + self._anchor_offset + self._drift * (mono - self._anchor_mono)
+
+    def timestamp_ms(self) -> int:
+        """Integer server time for request signing (X-BAPI-TIMESTAMP / timestamp=)."""
+        return int(self.now_server_ms())
+
+    def age_sec(self) -> Optional[float]:
+        if not self._synced_mono:
+            return None
+        return (time.monotonic() * 1000.0 - self._synced_mono) / 1000.0
+
+    def expired(self, ts_ms: float, ttl_sec: float) -> bool:
+        """TTL check against server time (e.g. RISK_SMOKE_TTL_SEC)."""
+        return self.now_server_ms() - float(ts_ms) > ttl_sec * 1000.0
+
+    def within_recv_window(self, ts_ms: float, recv_window_ms: float) -> bool:
+        """Would a request stamped `ts_ms` still be inside the venue's recv_window now?"""
+        now = self.now_server_ms()
+        return ts_ms <= now + 1000.0 and now - ts_ms <= recv_window_ms
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            synced = bool(self._synced_mono)
+            rtt = self._rtt_ms
+            drift_ppm = self._drift * 1e6
+        return {
+            "synced": synced,
+            "offset_ms": round(self.offset_ms(), 3) if synced else None,
+            "rtt_ms": None if rtt is None else round(rtt, 3),
+            "drift_ppm": round(drift_ppm, 3),
+            "age_sec": self.age_sec(),
+        }
+
+    # -------------------------
+    # Background refresh
+    # -------------------------
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def _loop() -> None:
+            while True:
+                try:
+                    self.sync()
+                except Exception:
+                    pass
+                if self._stop.wait(self.refresh_sec):
+                    return
+
+        self._thread = threading.Thread(target=_loop, name="clock-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# -------------------------
+# Process clock (live / replay)
+# -------------------------
+class SystemClock:
+    """time.time / time.monotonic / time.sleep."""
+
+    def time_ms(self) -> int:
+        return int(time.time() * 1000)
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, sec: float) -> None:
+        time.sleep(sec)
+
+
+_SYSTEM_CLOCK = SystemClock()
+_CLOCK: Optional[SystemClock] = None
+
+
+def set_clock(clock: Optional[SystemClock]) -> None:
+    """Install the process clock (None = system clock)."""
+    global _CLOCK
+    _CLOCK = clock
+
+
+def get_clock() -> SystemClock:
+    if _CLOCK is None and os.environ.get("UNIVBOT_REPLAY_DIR", "").strip():
+        from adapters.transport import get_transport
+
+        get_transport()     # builds the ReplayTransport, which installs its clock
+    return _CLOCK or _SYSTEM_CLOCK
@@ -0,0 +1,127 @@
+# adapters/coalesce.py
+"""
+Request coalescing (singleflight) for idempotent reads.
+
+- concurrent calls with the same key share one in-flight request
+  (the first caller runs it, the others wait for its result / error)
+- a caller only joins a flight of the same or a more urgent priority: a
+  more urgent caller sends its own request (and later callers join that
+  one) instead of inheriting e.g. a sheddable leader's RateLimitShed
+- a follower waits at most its own timeout (FlightTimeout), not the leader's
+- optional max-age cache: a result younger than max_age is served without
+  a request at all (errors are never cached)
+
+Results are shared objects: callers must treat them as read-only.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class FlightTimeout(TimeoutError):
+    """A follower's own timeout expired before the shared request finished."""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters", "priority")
+
+    def __init__(self, priority: int) -> None:
+        self.done = threading.Event()
+        self.priority = priority
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, *, max_entries: int = 10_000) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+        self.stats: Dict[str, int] = {"leader": 0, "shared": 0, "cache_hit": 0, "overtake": 0}
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], T],
+        *,
+        max_age: float = 0.0,
+        priority: int = 0,
+        timeout: Optional[float] = None,
+    ) -> T:
+        """
+        priority: lower value is more urgent (adapters.ratelimit.Priority);
+        timeout: max seconds to wait as a follower (None = until the leader ends).
+        """
+        now = time.monotonic()
+        with self._lock:
+            if max_age > 0:
+                hit = self._cache.get(key)
+                if hit is not None and now - hit[0] <= max_age:
+                    self.stats["cache_hit"] += 1
+                    return hit[1]
+
+            call = self._calls.get(key)
+            if call is not None and call.priority <= priority:
+                call.waiters += 1
+                self.stats["shared"] += 1
+                leader = False
+            else:
+                if call is not None:
+                    self.stats["overtake"] += 1
+                call = self._calls[key] = _Call(priority)
+                self.stats["leader"] += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise FlightTimeout(f"coalesced request {key} not done within {timeout}s")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                if call.error is None and max_age > 0:
+                    if len(self._cache) >= self.max_entries:
+                        self._cache.clear()
+                    self._cache[key] = (time.monotonic(), call.result)
+            call.done.set()
+        return call.result
+
+    def forget(self, key: Optional[str] = None) -> None:
+        """Drop cached results (all keys if key is None)."""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+
+# -------------------------
+# Shared per-exchange flights
+# -------------------------
+_FLIGHTS: Dict[str, SingleFlight] = {}
+_FLIGHTS_LOCK = threading.Lock()
+
+
+def get_single_flight(exchange: str) -> SingleFlight:
+    """Process-wide: components holding separate adapter instances still share reads."""
+    ex = exchange.strip().lower()
+    with _FLIGHTS_LOCK:
+        sf = _FLIGHTS.get(ex)
+        if sf is None:
+            sf = _FLIGHTS[ex] = SingleFlight()
+        return sf
@@ -0,0 +1,303 @@
+# adapters/dispatch.py
+"""
+Order dispatch queue with priority classes (kill > cancel > reduce-only > new).
+
+Sits in front of an adapter's order primitives (place_orders /
+cancel_orders / cancel_all_orders: the ones every venue answers per order,
+batch endpoint or not; a failed item is raised as AdapterError):
+- every request is queued under its class; workers always take the most
+  urgent class that has budget
+- each class has its own token bucket, so new entries can never spend the
+  budget cancels and reduce-only closes need (the venue limiter still
+  applies underneath)
+- new / reduce-only work may occupy at most `workers - 1` workers: one
+  worker is always free for kill / cancel
+- cancel-then-replace coalescing by client_order_id while still queued:
+    place(X) queued, cancel(X) arrives -> neither is sent
+    place(X) queued, place(X) arrives  -> the queued request is replaced
+    cancel(X) queued, cancel(X) arrives -> shares the queued cancel
+- queueing delay (submit -> sent) is recorded per class
+- a Future the caller cancels while it is still queued is never sent
+
+Same invariant tools/guard_smoke_test.py checks for the pause latch: risk
+reduction is never stuck behind risk taking.
+"""
+from __future__ import annotations
+
+import itertools
+import statistics as st
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional, cast
+
+from adapters.base import AdapterError, ErrorClass, OrderRequest, OrderResult, TradingAdapter
+from adapters.ratelimit import BucketSpec, TokenBucket
+from adapters.resilience import classify_ret_code
+
+
+class OrderClass(IntEnum):
+    """Lower value is dispatched first."""
+    KILL = 0
+    CANCEL = 1
+    REDUCE = 2      # reduce_only=True
+    NEW = 3
+
+
+DEFAULT_BUDGETS: Dict[OrderClass, BucketSpec] = {
+    OrderClass.KILL: BucketSpec(capacity=20, per_sec=20),
+    OrderClass.CANCEL: BucketSpec(capacity=10, per_sec=10),
+    OrderClass.REDUCE: BucketSpec(capacity=5, per_sec=5),
+    OrderClass.NEW: BucketSpec(capacity=5, per_sec=4),
+}
+
+_IDLE_WAIT_SEC = 0.5
+# adapter-side codes an OrderResult can carry for a transient failure (venue codes: classify_ret_code)
+_RETRY_CODES = frozenset({"network", "timeout", "invalid_json", "rate_limit_shed", "circuit_open"})
+_METRIC_WINDOW = 1024
+
+
+class Coalesced(AdapterError):
+    """Result of a queued request that was dropped / replaced before it was sent."""
+    def __init__(self, message: str) -> None:
+        super().__init__(message, error_class=ErrorClass.STOP, code="coalesced")
+
+
+def _fail(fut: "Future[Any]", exc: BaseException) -> None:
+    try:
+        fut.set_exception(exc)
+    except InvalidStateError:
+        pass        # cancelled by the caller meanwhile
+
+
+class _Job:
+    __slots__ = ("cls", "seq", "key", "fn", "future", "enqueued", "dead")
+
+    def __init__(self, cls: OrderClass, seq: int, key: Optional[str], fn: Callable[[], Any]) -> None:
+        self.cls = cls
+        self.seq = seq
+        self.key = key
+        self.fn = fn
+        self.future: "Future[Any]" = Future()
+        self.enqueued = time.monotonic()
+        self.dead = False           # coalesced away; skipped when popped
+
+
+class OrderDispatcher:
+    def __init__(
+        self,
+        adapter: TradingAdapter,
+        *,
+        budgets: Optional[Mapping[OrderClass, BucketSpec]] = None,
+        workers: int = 4,
+    ) -> None:
+        self.adapter = adapter
+        specs = dict(DEFAULT_BUDGETS)
+        specs.update(budgets or {})
+        self._buckets: Dict[OrderClass, TokenBucket] = {c: TokenBucket(specs[c]) for c in OrderClass}
+        self.workers = max(2, workers)
+        self._cv = threading.Condition()
+        # one FIFO per class: picking the next job looks at 4 queue heads, not the backlog
+        self._queues: Dict[OrderClass, Deque[_Job]] = {c: deque() for c in OrderClass}
+        self._seq = itertools.count()
+        self._queued_place: Dict[str, _Job] = {}     # client_order_id -> queued place
+        self._queued_cancel: Dict[str, _Job] = {}    # order / client id -> queued cancel
+        self._inflight_low = 0                       # REDUCE + NEW being sent
+        self._delays: Dict[OrderClass, Deque[float]] = {c: deque(maxlen=_METRIC_WINDOW) for c in OrderClass}
+        self._counts: Dict[str, int] = {"sent": 0, "coalesced": 0, "replaced": 0, "errors": 0, "abandoned": 0}
+        self._threads: List[threading.Thread] = []
+        self._stop = False
+
+    # -------------------------
+    # Submit
+    # -------------------------
+    def submit_place(self, req: OrderRequest) -> "Future[Any]":
+        cls = OrderClass.REDUCE if req.reduce_only else OrderClass.NEW
+        cid = req.client_order_id
+        with self._cv:
+            if cid is not None:
+                old = self._queued_place.pop(cid, None)
+                if old is not None and not old.dead:
+                    # replace while still queued: keep one request, the latest
+                    old.dead = True
+                    _fail(old.future, Coalesced(f"replaced by newer place for {cid}"))
+                    self._counts["replaced"] += 1
+            job = self._push(cls, cid, lambda: self._one("place", self.adapter.place_orders([req])))
+            if cid is not None:
+                self._queued_place[cid] = job
+            return job.future
+
+    def submit_cancel(self, order_id: str, *, symbol: Optional[str] = None) -> "Future[Any]":
+        with self._cv:
+            pending = self._queued_place.pop(order_id, None)
+            if pending is not None and not pending.dead:
+                # the order never left: drop the place, the cancel is already done
+                pending.dead = True
+                _fail(pending.future, Coalesced(f"canceled before send: {order_id}"))
+                self._counts["coalesced"] += 1
+                done: "Future[Any]" = Future()
+                done.set_result(None)
+                return done
+            dup = self._queued_cancel.get(order_id)
+            if dup is not None and not dup.dead:
+                self._counts["coalesced"] += 1
+                return dup.future
+            job = self._push(
+                OrderClass.CANCEL, order_id, lambda: self._one("cancel", self.adapter.cancel_orders([order_id], symbol=symbol))
+            )
+            self._queued_cancel[order_id] = job
+            return job.future
+
+    def submit_kill(self, fn: Callable[[], Any]) -> "Future[Any]":
+        """e.g. submit_kill(lambda: adapter.cancel_all_orders(symbol))"""
+        with self._cv:
+            return self._push(OrderClass.KILL, None, fn).future
+
+    def _one(self, what: str, results: List[OrderResult]) -> OrderResult:
+        """Single-item batch result -> the OrderResult, or its error raised."""
+        if len(results) != 1:
+            raise AdapterError(
+                f"{self.adapter.name} {what}: expected 1 result, got {len(results)}",
+                error_class=ErrorClass.STOP,
+                code="bad_batch_result",
+            )
+        r = results[0]
+        if not r.ok:
+            code = r.code or ""
+            if code.lstrip("-").isdigit():
+                error_class = classify_ret_code(self.adapter.name, code, r.message)
+            else:
+                error_class = ErrorClass.RETRY if code in _RETRY_CODES else ErrorClass.STOP
+            raise AdapterError(
+                f"{self.adapter.name} {what} failed: {r.code} {r.message}".rstrip(),
+                error_class=error_class,
+                code=r.code,
+                details={"result": r},
+            )
+        return r
+
+    def _push(self, cls: OrderClass, key: Optional[str], fn: Callable[[], Any]) -> _Job:
+        job = _Job(cls, next(self._seq), key, fn)
+        self._queues[cls].append(job)
+        self._cv.notify()
+        return job
+
+    def submit_cancel_all(self, symbol: Optional[str] = None) -> "Future[Any]":
+        return self.submit_kill(lambda: self.adapter.cancel_all_orders(symbol))
+
+    # blocking wrappers (same signatures as the adapter)
+    def place_order(self, req: OrderRequest, *, timeout: Optional[float] = None) -> OrderResult:
+        return cast(OrderResult, self.submit_place(req).result(timeout))
+
+    def cancel_order(self, order_id: str, *, symbol: Optional[str] = None, timeout: Optional[float] = None) -> None:
+        self.submit_cancel(order_id, symbol=symbol).result(timeout)
+
+    def cancel_all_orders(self, symbol: Optional[str] = None, *, timeout: Optional[float] = None) -> List[OrderResult]:
+        return cast(List[OrderResult], self.submit_cancel_all(symbol).result(timeout))
+
+    # -------------------------
+    # Workers
+    # -------------------------
+    def start(self) -> "OrderDispatcher":
+        if self._threads:
+            return self
+        self._stop = False
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"{self.adapter.name}-dispatch-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self) -> None:
+        with self._cv:
+            self._stop = True
+            self._cv.notify_all()
+        self._threads = []
+
+    def _take(self) -> Optional[_Job]:
+        """Most urgent live job whose class has budget (called with the lock held)."""
+        now = time.monotonic()
+        wait = _IDLE_WAIT_SEC
+        for cls in OrderClass:
+            q = self._queues[cls]
+            while q and q[0].dead:
+                q.popleft()
+            if not q:
+                continue
+            if cls >= OrderClass.REDUCE and self._inflight_low >= self.workers - 1:
+                continue
+            b = self._buckets[cls]
+            w = b.wait_time(1.0, now)
+            if w > 0:
+                wait = min(wait, w)
+                continue
+            b.take(1.0, now)
+            return q.popleft()
+        self._cv.wait(wait)
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                if self._stop:
+                    return
+                job = self._take()
+                if job is None:
+                    continue
+                if job.key is not None:
+                    table = self._queued_cancel if job.cls is OrderClass.CANCEL else self._queued_place
+                    if table.get(job.key) is job:
+                        del table[job.key]
+                if not job.future.set_running_or_notify_cancel():
+                    # the caller cancelled the Future while it was queued: never send it
+                    self._counts["abandoned"] += 1
+                    continue
+                low = job.cls >= OrderClass.REDUCE
+                if low:
+                    self._inflight_low += 1
+                self._delays[job.cls].append(time.monotonic() - job.enqueued)
+
+            try:
+                out = job.fn()
+            except BaseException as e:
+                with self._cv:
+                    self._counts["errors"] += 1
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(out)
+            finally:
+                with self._cv:
+                    self._counts["sent"] += 1
+                    if low:
+                        self._inflight_low -= 1
+                    self._cv.notify_all()
+
+    # -------------------------
+    # Metrics
+    # -------------------------
+    def metrics(self) -> Dict[str, Any]:
+        """Queueing delay (submit -> sent) per class, ms."""
+        with self._cv:
+            delays = {c: list(d) for c, d in self._delays.items()}
+            depth = {c.name.lower(): sum(1 for j in q if not j.dead) for c, q in self._queues.items()}
+            counts = dict(self._counts)
+
+        def _pct(xs: List[float], q: float) -> Optional[float]:
+            if not xs:
+                return None
+            xs = sorted(xs)
+            return round(xs[min(len(xs) - 1, int(q * len(xs)))] * 1000.0, 3)
+
+        per: Dict[str, Dict[str, Any]] = {}
+        for c, xs in delays.items():
+            per[c.name.lower()] = {
+                "n": len(xs),
+                "mean_ms": round(st.fmean(xs) * 1000.0, 3) if xs else None,
+                "p50_ms": _pct(xs, 0.50),
+                "p99_ms": _pct(xs, 0.99),
+                "max_ms": round(max(xs) * 1000.0, 3) if xs else None,
+                "queued": depth[c.name.lower()],
+            }
+        return {"classes": per, **counts}
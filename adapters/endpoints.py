@@ -0,0 +1,167 @@
+# adapters/endpoints.py
+"""
+Endpoint pool per exchange: latency-based routing + failover.
+
+- every equivalent REST host is tracked with an RTT EWMA and a failure count
+- `active` is the fastest host without recent failures (20% hysteresis
+  so two similar hosts do not flap)
+- a request error demotes the host at once; the caller fails over to the
+  next host within the same request
+- an optional background prober times the server-time endpoint (the same
+  one ping()/get_server_time_ms() use) on every host
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+_EWMA_ALPHA = 0.3
+_SWITCH_RATIO = 0.8     # a challenger must be 20% faster to take over
+
+
+@dataclass
+class EndpointHealth:
+    url: str
+    rtt_ms: Optional[float] = None
+    failures: int = 0
+    last_error: str = ""
+    last_ok_ms: int = 0
+    last_probe_ms: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "rtt_ms": None if self.rtt_ms is None else round(self.rtt_ms, 2),
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_ok_ms": self.last_ok_ms,
+            "last_probe_ms": self.last_probe_ms,
+        }
+
+
+class EndpointPool:
+    def __init__(self, name: str, urls: Sequence[str]) -> None:
+        uniq: List[str] = []
+        for u in urls:
+            u = u.strip().rstrip("/")
+            if u and u not in uniq:
+                uniq.append(u)
+        if not uniq:
+            raise ValueError(f"{name}: endpoint pool needs at least one url")
+        self.name = name
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, EndpointHealth] = {u: EndpointHealth(u) for u in uniq}
+        self._order: List[str] = uniq
+        self._active = uniq[0]
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    # -------------------------
+    # Routing
+    # -------------------------
+    @property
+    def active(self) -> str:
+        return self._active
+
+    def ordered(self) -> List[str]:
+        """Active host first, then the rest by (recent failure, rtt)."""
+        with self._lock:
+            rest = sorted(
+                (u for u in self._order if u != self._active),
+                key=lambda u: self._rank(self._hosts[u]),
+            )
+            return [self._active] + rest
+
+    def set_primary(self, url: str) -> None:
+        u = url.strip().rstrip("/")
+        with self._lock:
+            if u not in self._hosts:
+                self._hosts[u] = EndpointHealth(u)
+                self._order.insert(0, u)
+            self._active = u
+
+    @staticmethod
+    def _rank(h: EndpointHealth) -> tuple:
+        return (h.failures > 0, h.rtt_ms if h.rtt_ms is not None else float("inf"))
+
+    def _reselect(self) -> None:
+        cur = self._hosts[self._active]
+        best = min(self._hosts.values(), key=self._rank)
+        if best.url == cur.url:
+            return
+        if cur.failures > 0 and best.failures == 0:
+            self._active = best.url
+            return
+        if best.failures == 0 and best.rtt_ms is not None and (
+            cur.rtt_ms is None or best.rtt_ms < cur.rtt_ms * _SWITCH_RATIO
+        ):
+            self._active = best.url
+
+    # -------------------------
+    # Feedback
+    # -------------------------
+    def report_success(self, url: str, rtt_sec: Optional[float] = None) -> None:
+        with self._lock:
+            h = self._hosts.get(url)
+            if h is None:
+                return
+            h.failures = 0
+            h.last_ok_ms = int(time.time() * 1000)
+            if rtt_sec is not None:
+                ms = rtt_sec * 1000.0
+                h.rtt_ms = ms if h.rtt_ms is None else (1 - _EWMA_ALPHA) * h.rtt_ms + _EWMA_ALPHA * ms
+            self._reselect()
+
+    def report_failure(self, url: str, error: str = "") -> None:
+        with self._lock:
+            h = self._hosts.get(url)
+            if h is None:
+                return
+            h.failures += 1
+            h.last_error = error[:200]
+            self._reselect()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "active": self._active,
+                "hosts": [self._hosts[u].to_dict() for u in self._order],
+            }
+
+    # -------------------------
+    # Background prober
+    # -------------------------
+    def probe_once(self, probe: Callable[[str], float]) -> None:
+        """probe(url) -> rtt seconds (raise on failure)."""
+        for u in list(self._order):
+            now_ms = int(time.time() * 1000)
+            try:
+                rtt = probe(u)
+            except Exception as e:
+                self.report_failure(u, repr(e))
+            else:
+                self.report_success(u, rtt)
+            with self._lock:
+                self._hosts[u].last_probe_ms = now_ms
+
+    def start(self, probe: Callable[[str], float], *, interval_sec: float = 30.0) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def _loop() -> None:
+            while not self._stop.is_set():
+                self.probe_once(probe)
+                self._stop.wait(interval_sec)
+
+        self._thread = threading.Thread(target=_loop, name=f"{self.name}-endpoint-probe", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -2,16 +2,66 @@
 from __future__ import annotations
 
 import os
-from typing import Optional
+from typing import Any, List, Optional
 
 from adapters.base import TradingAdapter
 
 
+def _env_list(name: str) -> List[str]:
+    v = os.environ.get(name, "")
+    return [x.strip() for x in v.split(",") if x.strip()]
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, str(default)))
+    except ValueError:
+        return float(default)
+
+
+def _prepare(adapter: Any) -> None:
+    """Optional start-up work: endpoint probe + connection warm-up."""
+    probe_sec = _env_float("UNIVBOT_ENDPOINT_PROBE_SEC", 30.0)
+    if probe_sec > 0:
+        adapter.start_endpoint_probe(probe_sec)
+
+    conns = int(_env_float("UNIVBOT_WARMUP_CONNS", 0))
+    if conns > 0:
+        try:
+            adapter.warm_up(conns, keepalive_sec=_env_float("UNIVBOT_KEEPALIVE_SEC", 15.0))
+        except Exception:
+            # warm-up is an optimisation: never block adapter construction
+            pass
+
+
+def _paper(adapter: Any, prof: str) -> Any:
+    """profile=paper: orders go to the simulated matching engine (UNIVBOT_PAPER_ENGINE=0 keeps dry-run payloads)."""
+    if prof != "paper" or os.environ.get("UNIVBOT_PAPER_ENGINE", "1").strip() == "0":
+        return adapter
+    from adapters.paper import PaperEngine, PaperTradingAdapter
+
+    return PaperTradingAdapter(
+        adapter,
+        engine=PaperEngine(
+            maker_fee_bps=_env_float("UNIVBOT_PAPER_MAKER_BPS", 1.0),
+            taker_fee_bps=_env_float("UNIVBOT_PAPER_TAKER_BPS", 5.5),
+        ),
+        max_book_age_ms=int(_env_float("UNIVBOT_PAPER_BOOK_AGE_MS", 1000)),
+    )
+
+
 def get_trading_adapter(exchange: Optional[str] = None, profile: str = "paper") -> TradingAdapter:
     """
     Public-core factory (minimal).
     - No secrets required.
     - Uses env/base_url defaults.
+    - BYBIT_BASE_URLS / MEXC_BASE_URLS (comma separated) build an endpoint pool;
+      with more than one host a background RTT probe picks the active one
+      (UNIVBOT_ENDPOINT_PROBE_SEC, 0 = off).
+    - UNIVBOT_WARMUP_CONNS=N pre-resolves DNS and opens N keep-alive connections
+      (kept warm every UNIVBOT_KEEPALIVE_SEC) so the first request is not cold.
+    - profile=paper wraps the adapter in adapters.paper.PaperTradingAdapter:
+      market data stays live, orders are matched by a local simulator.
     """
     ex = (exchange or os.environ.get("EXCHANGE", "bybit")).strip().lower()
     prof = (profile or os.environ.get("PROFILE", "paper")).strip().lower()
@@ -20,20 +70,33 @@ def get_trading_adapter(exchange: Optional[str] = None, profile: str = "paper")
     if ex == "bybit":
         from adapters.bybit.trading import BybitTradingAdapter, BybitTradingConfig
 
-        base_url = os.environ.get("BYBIT_BASE_URL", "https://api-demo.bybit.com").strip()
+        urls = _env_list("BYBIT_BASE_URLS") or [os.environ.get("BYBIT_BASE_URL", "https://api-demo.bybit.com").strip()]
         category = os.environ.get("BYBIT_CATEGORY", "linear").strip()
 
-        return BybitTradingAdapter(
-            BybitTradingConfig(dry_run=bool(dry_run), base_url=base_url, category=category)
+        bybit = BybitTradingAdapter(
+            BybitTradingConfig(
+                dry_run=bool(dry_run),
+                base_url=urls[0],
+                category=category,
+                alt_base_urls=tuple(urls[1:]),
+            )
         )
+        _prepare(bybit)
+        return _paper(bybit, prof)
 
     if ex == "mexc":
         from adapters.mexc.trading import MexcTradingAdapter, MexcTradingConfig
 
-        base_url = os.environ.get("MEXC_BASE_URL")
-        if isinstance(base_url, str) and base_url.strip():
-            os.environ["MEXC_BASE_URL"] = base_url.strip()
+        urls = _env_list("MEXC_BASE_URLS")
 
-        return MexcTradingAdapter(MexcTradingConfig())
+        mexc = MexcTradingAdapter(
+            MexcTradingConfig(
+                dry_run=bool(dry_run),
+                base_url=urls[0] if urls else None,
+                alt_base_urls=tuple(urls[1:]),
+            )
+        )
+        _prepare(mexc)
+        return _paper(mexc, prof)
 
     raise RuntimeError(f"unknown exchange: {ex}")
@@ -0,0 +1,159 @@
+# adapters/hedging.py
+"""
+Hedged requests for idempotent GETs (tail-latency control).
+
+If the primary host has not answered within the learned p95 latency of the
+endpoint, the same request is fired at an alternate host and the first
+successful reply wins. A budget caps extra load (default 5% of requests).
+
+Only safe for reads: the losing request is not cancelled, it just finishes
+in the background.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Rolling per-endpoint latency window; p95 recomputed every `refresh` samples."""
+
+    def __init__(self, *, window: int = 256, min_samples: int = 20, refresh: int = 16) -> None:
+        self.window = window
+        self.min_samples = min_samples
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._p95: Dict[str, float] = {}
+        self._since: Dict[str, int] = {}
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            d = self._samples.get(key)
+            if d is None:
+                d = self._samples[key] = deque(maxlen=self.window)
+            d.append(seconds)
+            n = self._since.get(key, 0) + 1
+            if n >= self.refresh and len(d) >= self.min_samples:
+                s = sorted(d)
+                self._p95[key] = s[min(len(s) - 1, int(len(s) * 0.95))]
+                n = 0
+            self._since[key] = n
+
+    def p95(self, key: str) -> Optional[float]:
+        with self._lock:
+            return self._p95.get(key)
+
+
+class HedgeBudget:
+    """
+    Each primary request earns `ratio` hedge credits (capped at `burst`);
+    a hedge spends one. Long-run hedges <= ratio * requests.
+    """
+
+    def __init__(self, *, ratio: float = 0.05, burst: float = 5.0) -> None:
+        self.ratio = ratio
+        self.burst = burst
+        self._credits = burst
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "hedged": 0, "denied": 0, "hedge_won": 0}
+
+    def on_request(self) -> None:
+        with self._lock:
+            self.stats["requests"] += 1
+            self._credits = min(self.burst, self._credits + self.ratio)
+
+    def available(self) -> bool:
+        """A hedge could be paid for right now (peek, nothing spent)."""
+        with self._lock:
+            return self._credits >= 1.0
+
+    def on_denied(self) -> None:
+        with self._lock:
+            self.stats["denied"] += 1
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._credits >= 1.0:
+                self._credits -= 1.0
+                self.stats["hedged"] += 1
+                return True
+            self.stats["denied"] += 1
+            return False
+
+    def on_hedge_won(self) -> None:
+        with self._lock:
+            self.stats["hedge_won"] += 1
+
+
+class Hedger:
+    def __init__(
+        self,
+        *,
+        tracker: Optional[LatencyTracker] = None,
+        budget: Optional[HedgeBudget] = None,
+        default_delay_sec: float = 0.25,
+        min_delay_sec: float = 0.01,
+        max_workers: int = 32,
+    ) -> None:
+        self.tracker = tracker or LatencyTracker()
+        self.budget = budget or HedgeBudget()
+        self.default_delay_sec = default_delay_sec
+        self.min_delay_sec = min_delay_sec
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def delay_for(self, key: str) -> float:
+        p = self.tracker.p95(key)
+        return max(self.min_delay_sec, p if p is not None else self.default_delay_sec)
+
+    def _timed(self, key: str, fn: Callable[[], T]) -> T:
+        t0 = time.monotonic()
+        out = fn()
+        self.tracker.record(key, time.monotonic() - t0)
+        return out
+
+    def call(self, key: str, attempts: List[Callable[[], T]]) -> T:
+        """
+        attempts[0] is the primary, the rest are alternates (tried in order,
+        at most one hedge is fired per call).
+        """
+        self.budget.on_request()
+        if len(attempts) < 2 or not self.budget.available():
+            # no hedge can be sent: run the primary inline, no thread-pool hop
+            deadline = time.monotonic() + self.delay_for(key)
+            try:
+                return self._timed(key, attempts[0])
+            finally:
+                if len(attempts) >= 2 and time.monotonic() > deadline:
+                    self.budget.on_denied()     # would have hedged
+
+        primary = self._pool.submit(self._timed, key, attempts[0])
+
+        done, _ = wait([primary], timeout=self.delay_for(key))
+        if done and primary.exception() is None:
+            return primary.result()
+        if done or not self.budget.try_spend():
+            # primary failed fast (let the retry layer decide) or no budget left
+            return primary.result()
+
+        hedge = self._pool.submit(self._timed, key, attempts[1])
+        pending: List[Future] = [primary, hedge]
+        first_error: Optional[BaseException] = None
+        while pending:
+            done, rest = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                err = f.exception()
+                if err is None:
+                    if f is hedge:
+                        self.budget.on_hedge_won()
+                    return f.result()
+                if first_error is None:
+                    first_error = err
+            pending = list(rest)
+        assert first_error is not None
+        raise first_error
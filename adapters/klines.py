@@ -0,0 +1,180 @@
+# adapters/klines.py
+"""
+Kline (candle) history shared by the venue adapters.
+
+- one normalized interval vocabulary ("1m" ... "1w"); adapters map it to the
+  venue's own spelling
+- a long [start, end] range is split into pages of at most `limit` candles
+  (venue per-call cap) that are fetched concurrently; the venue rate limiter
+  under RestClient paces them, the pool only bounds in-flight requests
+- pages are merged and deduped by open time (a candle on a page boundary or
+  the still-open last candle may come back twice) and returned columnar
+"""
+from __future__ import annotations
+
+import bisect
+import itertools
+import operator
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+INTERVAL_MS: Dict[str, int] = {
+    "1m": 60_000,
+    "3m": 180_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+    "2h": 7_200_000,
+    "4h": 14_400_000,
+    "6h": 21_600_000,
+    "12h": 43_200_000,
+    "1d": 86_400_000,
+    "1w": 604_800_000,
+}
+
+DEFAULT_WORKERS = 8
+
+# (open_time_ms, open, high, low, close, volume)
+KlineRow = Tuple[int, float, float, float, float, float]
+# (start_ms, end_ms, limit) -> one page, e.g. Klines.from_raw(...)
+PageFetcher = Callable[[int, int, int], "Klines"]
+
+
+def interval_ms(interval: str) -> int:
+    try:
+        return INTERVAL_MS[interval]
+    except KeyError:
+        raise ValueError(f"unsupported kline interval {interval!r} (one of {', '.join(INTERVAL_MS)})") from None
+
+
+@dataclass
+class Klines:
+    """Columnar candles, ascending by open time, one row per open time."""
+    symbol: str
+    interval: str
+    open_time: "array[int]" = field(default_factory=lambda: array("q"))
+    open: "array[float]" = field(default_factory=lambda: array("d"))
+    high: "array[float]" = field(default_factory=lambda: array("d"))
+    low: "array[float]" = field(default_factory=lambda: array("d"))
+    close: "array[float]" = field(default_factory=lambda: array("d"))
+    volume: "array[float]" = field(default_factory=lambda: array("d"))
+
+    @classmethod
+    def from_raw(cls, symbol: str, interval: str, raw: Sequence[Sequence[Any]]) -> "Klines":
+        """
+        Venue rows [open_time, open, high, low, close, volume, ...] (strings or
+        numbers, either time order) parsed straight into columns: no per-row
+        objects survive, which keeps a million-candle backfill out of the GC.
+        """
+        k = cls(
+            symbol,
+            interval,
+            array("q", map(int, map(itemgetter(0), raw))),
+            *(array("d", map(float, map(itemgetter(i), raw))) for i in range(1, 6)),
+        )
+        if len(k) > 1 and k.open_time[0] > k.open_time[-1]:
+            for col in k.columns():
+                col.reverse()
+        return k
+
+    def columns(self) -> Tuple["array[Any]", ...]:
+        return (self.open_time, self.open, self.high, self.low, self.close, self.volume)
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    def rows(self) -> List[KlineRow]:
+        return list(zip(*self.columns()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "open_time": list(self.open_time),
+            "open": list(self.open),
+            "high": list(self.high),
+            "low": list(self.low),
+            "close": list(self.close),
+            "volume": list(self.volume),
+        }
+
+
+def page_ranges(start_ms: int, end_ms: int, step_ms: int, limit: int) -> List[Tuple[int, int]]:
+    """Inclusive [a, b] open-time ranges, each holding at most `limit` candles."""
+    start = start_ms - start_ms % step_ms
+    span = step_ms * limit
+    return [(a, min(a + span - 1, end_ms)) for a in range(start, end_ms + 1, span)]
+
+
+def _ascending(t: "array[int]") -> bool:
+    return all(map(operator.lt, t, itertools.islice(t, 1, None)))
+
+
+def merge_pages(symbol: str, interval: str, pages: Sequence[Klines], start_ms: int, end_ms: int) -> Klines:
+    """
+    Pages are sorted, disjoint runs: order them by first open time, clip to
+    [start_ms, end_ms] and concatenate column-wise; only rows overlapping the
+    previous page are dropped. Anything out of order falls back to a dict merge.
+    """
+    runs = [p for p in pages if len(p)]
+    out = Klines(symbol, interval)
+    if not all(_ascending(p.open_time) for p in runs):
+        by_time: Dict[int, KlineRow] = {}
+        for p in runs:
+            by_time.update((r[0], r) for r in p.rows())
+        rows = [by_time[t] for t in sorted(by_time) if start_ms <= t <= end_ms]
+        for col, vals in zip(out.columns(), zip(*rows)):
+            col.extend(vals)
+        return out
+
+    runs.sort(key=lambda p: p.open_time[0])
+    cols = out.columns()
+    for p in runs:
+        t = p.open_time
+        lo = bisect.bisect_left(t, start_ms)
+        if len(out):
+            lo = max(lo, bisect.bisect_right(t, out.open_time[-1]))
+        hi = bisect.bisect_right(t, end_ms)
+        if lo >= hi:
+            continue
+        for dst, src in zip(cols, p.columns()):
+            dst.extend(src[lo:hi])
+    return out
+
+
+def fetch_klines(
+    symbol: str,
+    interval: str,
+    start_ms: int,
+    end_ms: Optional[int],
+    fetch_page: PageFetcher,
+    *,
+    limit: int,
+    workers: int = DEFAULT_WORKERS,
+) -> Klines:
+    """Split, fetch concurrently, merge. The first failing page aborts the whole call."""
+    step = interval_ms(interval)
+    end = int(time.time() * 1000) if end_ms is None else int(end_ms)
+    ranges = page_ranges(int(start_ms), end, step, limit)
+    if not ranges:
+        return Klines(symbol, interval)
+    if len(ranges) == 1:
+        a, b = ranges[0]
+        return merge_pages(symbol, interval, [fetch_page(a, b, limit)], int(start_ms), end)
+
+    pages: List[Klines] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(ranges))), thread_name_prefix="klines") as pool:
+        futs = [pool.submit(fetch_page, a, b, limit) for a, b in ranges]
+        try:
+            for f in as_completed(futs):
+                pages.append(f.result())
+        except BaseException:
+            for f in futs:
+                f.cancel()
+            raise
+    return merge_pages(symbol, interval, pages, int(start_ms), end)
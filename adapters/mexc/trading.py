@@ -8,27 +8,44 @@ MEXC Trading Adapter (skeleton)
 
 from __future__ import annotations
 import os
-import json
-from urllib.request import Request, urlopen
-from urllib.error import URLError, HTTPError
+import threading
 
 from dataclasses import dataclass
 from typing import Optional, List, Tuple
-from typing import Optional, List, Tuple, Dict, Any
+from typing import Optional, List, Tuple, Dict, Any, cast
 from urllib.parse import urlencode
 
 from adapters.base import (
+    AdapterError,
+    ErrorClass,
     TradingAdapter,
     Balance,
     MarketInfo,
     Capabilities,
     OrderRequest,
+    OrderResult,
     OrderStatus,
 )
+from adapters.clock import ClockSync
+from adapters.klines import Klines, fetch_klines
+from adapters.ratelimit import Priority, get_rate_limiter
+from adapters.rest import RestClient
+from adapters.signing import MexcSigner
 
 @dataclass
 class MexcTradingConfig:
     dry_run: bool = True
+    base_url: Optional[str] = None      # None: MEXC_BASE_URL, else https://api.mexc.com
+    # equivalent REST hosts for hedged reads (MEXC_ALT_BASE_URLS overrides)
+    alt_base_urls: Tuple[str, ...] = ()
+    recv_window_ms: int = 5000
+
+
+# max candles per /api/v3/klines call; normalized interval -> MEXC spelling
+KLINE_LIMIT = 1000
+_KLINE_INTERVALS: Dict[str, str] = {
+    "1m": "1m", "5m": "5m", "15m": "15m", "30m": "30m", "1h": "60m", "4h": "4h", "1d": "1d", "1w": "1W",
+}
 
 
 class MexcTradingAdapter(TradingAdapter):
@@ -53,9 +70,26 @@ class MexcTradingAdapter(TradingAdapter):
 
         return float(bid), float(ask)
 
+    def get_order_book(self, symbol: str, limit: int = 50) -> Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]:
+        params = {"symbol": self.denormalize_symbol(symbol), "limit": int(limit)}
+        qs = urlencode(params)
+
+        timeout = float(os.environ.get("MEXC_HTTP_TIMEOUT", "10"))
+        data = self._get_json(f"/api/v3/depth?{qs}", timeout=timeout)
+
+        bids = [(float(p), float(q)) for p, q, *_ in (data.get("bids") or [])]
+        asks = [(float(p), float(q)) for p, q, *_ in (data.get("asks") or [])]
+        if not bids or not asks:
+            raise RuntimeError(f"MEXC depth empty for {symbol}: {data}")
+        return bids, asks
+
     def get_daily_closes(self, symbol: str, n: int = 50) -> list[float]:
         sym = symbol.upper()
         timeout = float(os.environ.get("MEXC_HTTP_TIMEOUT", "10"))
+        if n > KLINE_LIMIT:
+            # more than one call can return: paginated backfill
+            now = int(self.clock.timestamp_ms())
+            return list(self.get_klines(sym, "1d", now - n * 86_400_000, now).close)[-n:]
 
         qs = urlencode({"symbol": sym, "interval": "1d", "limit": n})
         data = self._get_json(f"/api/v3/klines?{qs}", timeout=timeout)
@@ -67,36 +101,107 @@ class MexcTradingAdapter(TradingAdapter):
         if not isinstance(data, list) or not data:
             raise RuntimeError(f"no klines returned: {data!r}")
 
-        data.sort(key=lambda x: int(x[0]))  # [0]=openTime
+        data = sorted(data, key=lambda x: int(x[0]))  # [0]=openTime (copy: response may be shared)
         return [float(e[4]) for e in data]  # [4]=close
 
+    def get_klines(self, symbol: str, interval: str, start_ms: int, end_ms: Optional[int] = None) -> Klines:
+        """Candles with start_ms <= open time <= end_ms (default: now), any range length."""
+        sym = self.denormalize_symbol(symbol)
+        iv = _KLINE_INTERVALS.get(interval)
+        if iv is None:
+            raise ValueError(f"mexc: unsupported kline interval {interval!r}")
+        timeout = float(os.environ.get("MEXC_HTTP_TIMEOUT", "10"))
+
+        def page(a: int, b: int, limit: int) -> Klines:
+            qs = urlencode({"symbol": sym, "interval": iv, "startTime": a, "endTime": b, "limit": limit})
+            data: Any = self._get_json(f"/api/v3/klines?{qs}", timeout=timeout, priority=Priority.LOW)
+            if isinstance(data, dict) and "raw" in data:
+                data = data["raw"]
+            # [openTime, open, high, low, close, volume, closeTime, quoteVolume]
+            return Klines.from_raw(sym, interval, data or [])
+
+        return fetch_klines(sym, interval, start_ms, end_ms, page, limit=KLINE_LIMIT)
+
 
     def __init__(self, config: Optional[MexcTradingConfig] = None):
         self.config = config or MexcTradingConfig()
-        # Spot v3 base endpoint (env override 可)
-        self.base_url = os.environ.get("MEXC_BASE_URL", "https://api.mexc.com").rstrip("/")
+        # Spot v3 base endpoint: config.base_url > MEXC_BASE_URL (env) > 既定
+        base_url = (
+            self.config.base_url or os.environ.get("MEXC_BASE_URL") or "https://api.mexc.com"
+        ).strip().rstrip("/")
         self._exchange_info_cache: Optional[Dict[str, Any]] = None
+        self._clock: Optional[ClockSync] = None
+        self._clock_lock = threading.Lock()
+        self._signer: Optional[MexcSigner] = None
+        # weight budget is per IP -> one limiter shared by all mexc adapters
+        self._rest = RestClient(
+            "mexc",
+            base_url,
+            limiter=get_rate_limiter("mexc"),
+            no_cache=("/api/v3/time", "/api/v3/ping"),
+            alt_base_urls=_env_list("MEXC_ALT_BASE_URLS") or self.config.alt_base_urls,
+            probe_path="/api/v3/time",
+        )
 
+    @property
+    def base_url(self) -> str:
+        return self._rest.base_url
 
-    def _get_json(self, path: str, *, timeout: float = 10.0) -> dict:
-        url = f"{self.base_url}{path}"
-        req = Request(url, headers={"User-Agent": "UnivBot/1.0"})
-        try:
-            with urlopen(req, timeout=timeout) as resp:
-                raw = resp.read().decode("utf-8", errors="replace")
-        except HTTPError as e:
-            raise RuntimeError(f"mexc http error: {e.code} {e.reason} url={url}") from e
-        except URLError as e:
-            raise RuntimeError(f"mexc network error: {e.reason} url={url}") from e
-        except Exception as e:
-            raise RuntimeError(f"mexc request failed: {e!r} url={url}") from e
+    @base_url.setter
+    def base_url(self, value: str) -> None:
+        self._rest.base_url = value.rstrip("/")
 
-        try:
-            data = json.loads(raw)
-        except Exception as e:
-            raise RuntimeError(f"mexc invalid json: {raw[:200]} url={url}") from e
+    def endpoint_status(self) -> Dict[str, Any]:
+        """Active host + per-host RTT / failures."""
+        return self._rest.pool.status()
+
+    def start_endpoint_probe(self, interval_sec: float = 30.0) -> None:
+        """Background RTT probe of every configured host (no-op with a single host)."""
+        if len(self._rest.pool) > 1:
+            self._rest.pool.start(self._rest.probe, interval_sec=interval_sec)
+
+    def warm_up(self, connections: int = 2, *, keepalive_sec: float = 15.0) -> List[Dict[str, Any]]:
+        """Resolve DNS, open pooled connections and send one cheap request per host."""
+        return self._rest.warm_up(connections=connections, keepalive_sec=keepalive_sec)
+
+    def _get_json(self, path: str, *, timeout: float = 10.0, priority: Priority = Priority.NORMAL) -> dict:
+        return self._rest.get_json(path, timeout=timeout, priority=priority)
 
-        return data if isinstance(data, dict) else {"raw": data}
+    @property
+    def signer(self) -> Optional[MexcSigner]:
+        """HMAC signer from MEXC_API_KEY / MEXC_API_SECRET (None when unset)."""
+        if self._signer is None:
+            key = os.environ.get("MEXC_API_KEY", "")
+            secret = os.environ.get("MEXC_API_SECRET", "")
+            if key and secret:
+                self._signer = MexcSigner(
+                    key,
+                    secret,
+                    recv_window_ms=self.config.recv_window_ms,
+                    clock=lambda: self.clock.timestamp_ms(),
+                )
+        return self._signer
+
+    def _private_json(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        *,
+        timeout: float = 10.0,
+        priority: Priority = Priority.HIGH,
+    ) -> Dict[str, Any]:
+        signer = self.signer
+        if signer is None:
+            raise AdapterError(
+                "mexc private endpoint needs MEXC_API_KEY / MEXC_API_SECRET",
+                error_class=ErrorClass.STOP,
+                code="auth_missing",
+                details={"path": path},
+            )
+        return self._rest.signed_json(
+            lambda: signer.sign(method, path, params), timeout=timeout, priority=priority
+        )
 
     def _get_exchange_info(self) -> Dict[str, Any]:
         # Spot v3 exchange info: symbols & filters (public)
@@ -142,17 +247,41 @@ class MexcTradingAdapter(TradingAdapter):
         return None
 
     def get_server_time_ms(self) -> int:
+        return int(self._server_time_precise_ms())
+
+    def _server_time_precise_ms(self) -> float:
         # Spot v3 time: GET /api/v3/time -> {"serverTime": 1645539742000}
         timeout = float(os.environ.get("MEXC_HTTP_TIMEOUT", "10"))
-        js = self._get_json("/api/v3/time", timeout=timeout)
+        js = self._get_json("/api/v3/time", timeout=timeout, priority=Priority.HIGH)
         st = js.get("serverTime")
         if st is None:
             raise RuntimeError(f"mexc missing serverTime: {js}")
         try:
-            return int(st)
+            return float(st)
         except Exception as e:
             raise RuntimeError(f"mexc bad serverTime: {st!r}") from e
 
+    @property
+    def clock(self) -> ClockSync:
+        """Server clock estimator (lazy; background refresh every UNIVBOT_CLOCK_REFRESH_SEC)."""
+        clock = self._clock
+        if clock is None:
+            # first use may race (md thread + order thread): one estimator, one refresh thread
+            with self._clock_lock:
+                if self._clock is None:
+                    clock = ClockSync(
+                        self._server_time_precise_ms,
+                        refresh_sec=float(os.environ.get("UNIVBOT_CLOCK_REFRESH_SEC", "60")),
+                    )
+                    clock.start()
+                    self._clock = clock
+                clock = self._clock
+        return clock
+
+    def now_server_ms(self) -> int:
+        """Estimated MEXC time without a round trip (local wall clock until first sync)."""
+        return self.clock.timestamp_ms()
+
     # ---- helpers ----
     @staticmethod
     def _split_symbol(symbol: str) -> Tuple[str, str]:
@@ -291,5 +420,77 @@ class MexcTradingAdapter(TradingAdapter):
     def cancel_order(self, order_id: str, *, symbol: Optional[str] = None) -> None:
         raise NotImplementedError("Skeleton: cancel_order is not implemented yet.")
 
+    def get_open_orders(self, symbol: Optional[str] = None) -> List[OrderStatus]:
+        # /api/v3/openOrders needs a symbol on MEXC
+        if self.config.dry_run or not symbol:
+            return []
+        timeout = float(os.environ.get("MEXC_HTTP_TIMEOUT", "10"))
+        j = self._private_json(
+            "GET", "/api/v3/openOrders", {"symbol": self.denormalize_symbol(symbol)},
+            timeout=timeout, priority=Priority.CRITICAL,
+        )
+        return [_parse_order(r) for r in (j.get("raw") or []) if isinstance(r, dict)]
+
+    def cancel_all_orders(self, symbol: Optional[str] = None) -> List[OrderResult]:
+        """DELETE /api/v3/openOrders (MEXC cancels per symbol only)."""
+        if not symbol:
+            raise AdapterError(
+                "mexc cancel-all needs a symbol",
+                error_class=ErrorClass.STOP,
+                code="symbol_required",
+            )
+        sym = self.denormalize_symbol(symbol)
+        if self.config.dry_run:
+            dry = {"dry_run": True, "method": "DELETE", "path": "/api/v3/openOrders", "query": {"symbol": sym}}
+            return [OrderResult(ok=True, symbol=sym, raw=dry)]
+
+        timeout = float(os.environ.get("MEXC_HTTP_TIMEOUT", "10"))
+        j = self._private_json("DELETE", "/api/v3/openOrders", {"symbol": sym}, timeout=timeout, priority=Priority.CRITICAL)
+        return [
+            OrderResult(
+                ok=True,
+                symbol=str(r.get("symbol") or sym),
+                order_id=str(r.get("orderId") or "") or None,
+                client_order_id=r.get("clientOrderId") or None,
+                raw=r,
+            )
+            for r in (j.get("raw") or [])
+            if isinstance(r, dict)
+        ]
+
     def get_order(self, order_id: str, *, symbol: Optional[str] = None) -> OrderStatus:
         raise NotImplementedError("Skeleton: get_order is not implemented yet.")
+
+
+_MEXC_STATUS: Dict[str, str] = {
+    "NEW": "new",
+    "PARTIALLY_FILLED": "partially_filled",
+    "FILLED": "filled",
+    "CANCELED": "canceled",
+    "PARTIALLY_CANCELED": "canceled",
+    "REJECTED": "rejected",
+}
+
+
+def _parse_order(r: Dict[str, Any]) -> OrderStatus:
+    """MEXC v3 order row -> OrderStatus."""
+    qty = float(r.get("origQty") or 0.0)
+    filled = float(r.get("executedQty") or 0.0)
+    quote = float(r.get("cummulativeQuoteQty") or 0.0)
+    return OrderStatus(
+        order_id=str(r.get("orderId") or ""),
+        client_order_id=r.get("clientOrderId") or None,
+        symbol=str(r.get("symbol") or ""),
+        side="buy" if str(r.get("side") or "").upper() == "BUY" else "sell",
+        order_type="market" if str(r.get("type") or "").upper() == "MARKET" else "limit",
+        qty=qty,
+        filled_qty=filled,
+        avg_price=(quote / filled) if filled > 0 and quote > 0 else None,
+        status=cast(Any, _MEXC_STATUS.get(str(r.get("status") or ""), "new")),
+        raw=r,
+    )
+
+
+def _env_list(name: str) -> Tuple[str, ...]:
+    v = os.environ.get(name, "")
+    return tuple(x.strip() for x in v.split(",") if x.strip())
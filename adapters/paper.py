@@ -0,0 +1,533 @@
+# adapters/paper.py
+"""
+Paper trading: simulated execution against the live (or replayed) book.
+
+PaperEngine matches own orders against order book snapshots (and optional
+trade prints):
+- marketable orders sweep the displayed levels up to their limit (market:
+  any price); liquidity taken is remembered until the next snapshot so the
+  same size is not sold twice
+- remainders of GTC limits rest with price-time priority among own orders
+- queue-position model: a resting order starts behind the displayed size
+  at its price; size leaving that level (trades / cancels ahead) first
+  drains the queue ahead, then fills the order; a market that trades
+  through the price fills it outright at the limit
+- IOC / market remainders are cancelled, FOK fills completely or expires
+- every change is an OrderStatus (partial fills included), pushed to
+  listeners (e.g. utils.order_store.OrderStore.apply)
+- open orders are indexed per symbol; finished orders stay queryable until
+  more than `max_terminal` have finished (oldest dropped first) or
+  forget_terminal() ages them out
+
+PaperTradingAdapter wraps a real adapter: market data is delegated, orders
+go to the engine (book refreshed from get_order_book when older than
+`max_book_age_ms`). The factory uses it for profile=paper.
+"""
+from __future__ import annotations
+
+import bisect
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple, cast
+
+from adapters.base import (
+    AdapterError,
+    Balance,
+    Capabilities,
+    ErrorClass,
+    MarketInfo,
+    OrderRequest,
+    OrderResult,
+    OrderStatus,
+    TradingAdapter,
+)
+from adapters.klines import Klines
+
+Level = Tuple[float, float]
+Listener = Callable[[OrderStatus], None]
+
+_EPS = 1e-12
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+@dataclass(frozen=True)
+class PaperFill:
+    order_id: str
+    symbol: str
+    side: str
+    price: float
+    qty: float
+    maker: bool
+    fee: float
+    ts_ms: int
+
+
+class _SimOrder:
+    __slots__ = (
+        "order_id", "client_order_id", "symbol", "side", "order_type", "tif",
+        "qty", "price", "filled", "notional", "status", "queue_ahead", "reduce_only", "ts_ms",
+        "done_ms",
+    )
+
+    def __init__(self, order_id: str, req: OrderRequest, symbol: str) -> None:
+        self.order_id = order_id
+        self.client_order_id = req.client_order_id
+        self.symbol = symbol
+        self.side = "buy" if str(req.side).lower() == "buy" else "sell"
+        self.order_type = "market" if str(req.order_type).lower() == "market" else "limit"
+        self.tif = str(req.time_in_force or "GTC").upper()
+        self.qty = float(req.qty)
+        self.price = None if req.price is None else float(req.price)
+        self.filled = 0.0
+        self.notional = 0.0
+        self.status = "new"
+        self.queue_ahead = 0.0
+        self.reduce_only = bool(req.reduce_only)
+        self.ts_ms = _now_ms()
+        self.done_ms = 0    # set once the order is finished (eviction clock)
+
+    @property
+    def remaining(self) -> float:
+        return self.qty - self.filled
+
+    def fill(self, px: float, qty: float) -> None:
+        self.filled += qty
+        self.notional += px * qty
+        self.status = "filled" if self.remaining <= _EPS else "partially_filled"
+
+    def to_status(self) -> OrderStatus:
+        return OrderStatus(
+            order_id=self.order_id,
+            client_order_id=self.client_order_id,
+            symbol=self.symbol,
+            side=cast(Any, self.side),
+            order_type=cast(Any, self.order_type),
+            qty=self.qty,
+            filled_qty=self.filled,
+            avg_price=(self.notional / self.filled) if self.filled > 0 else None,
+            status=cast(Any, self.status),
+            raw={"paper": True, "price": self.price, "tif": self.tif, "queue_ahead": self.queue_ahead},
+        )
+
+
+class _Book:
+    """Market snapshot + own resting orders for one symbol."""
+
+    def __init__(self) -> None:
+        self.bids: List[Level] = []           # market, best first
+        self.asks: List[Level] = []
+        self.bid_size: Dict[float, float] = {}
+        self.ask_size: Dict[float, float] = {}
+        self.updated_ms = 0
+        self.taken: Dict[Tuple[str, float], float] = {}     # liquidity we consumed from this snapshot
+        # own resting orders: price -> FIFO, with sorted price lists
+        self.own_bids: Dict[float, Deque[_SimOrder]] = {}
+        self.own_asks: Dict[float, Deque[_SimOrder]] = {}
+        self.own_bid_px: List[float] = []     # ascending
+        self.own_ask_px: List[float] = []     # ascending
+
+    def rest(self, o: _SimOrder) -> None:
+        assert o.price is not None
+        levels, prices = (self.own_bids, self.own_bid_px) if o.side == "buy" else (self.own_asks, self.own_ask_px)
+        q = levels.get(o.price)
+        if q is None:
+            q = levels[o.price] = deque()
+            bisect.insort(prices, o.price)
+        q.append(o)
+
+    def unrest(self, o: _SimOrder) -> None:
+        levels, prices = (self.own_bids, self.own_bid_px) if o.side == "buy" else (self.own_asks, self.own_ask_px)
+        q = levels.get(cast(float, o.price))
+        if q is None:
+            return
+        try:
+            q.remove(o)
+        except ValueError:
+            return
+        if not q:
+            del levels[cast(float, o.price)]
+            i = bisect.bisect_left(prices, cast(float, o.price))
+            if i < len(prices) and prices[i] == o.price:
+                prices.pop(i)
+
+
+class PaperEngine:
+    def __init__(
+        self,
+        *,
+        maker_fee_bps: float = 1.0,
+        taker_fee_bps: float = 5.5,
+        max_fills: int = 10000,
+        max_terminal: int = 10000,
+    ) -> None:
+        self.maker_fee = maker_fee_bps / 1e4
+        self.taker_fee = taker_fee_bps / 1e4
+        self.max_terminal = max_terminal
+        self._lock = threading.RLock()
+        self._books: Dict[str, _Book] = {}
+        self._orders: Dict[str, _SimOrder] = {}
+        self._by_client: Dict[str, str] = {}
+        self._open: Dict[str, Dict[str, _SimOrder]] = {}    # symbol -> open orders, oldest first
+        self._terminal: Deque[Tuple[int, str]] = deque()    # (finished ms, order_id), oldest first
+        self._ids = itertools.count(1)
+        self.fills: Deque[PaperFill] = deque(maxlen=max_fills)
+        self.listeners: List[Listener] = []
+        self.stats: Dict[str, int] = {"orders": 0, "fills": 0, "canceled": 0, "rejected": 0}
+
+    def _book(self, symbol: str) -> _Book:
+        b = self._books.get(symbol)
+        if b is None:
+            b = self._books[symbol] = _Book()
+        return b
+
+    def _emit(self, o: _SimOrder) -> OrderStatus:
+        if self._orders.get(o.order_id) is o:
+            self._index(o)
+        st = o.to_status()
+        for fn in self.listeners:
+            try:
+                fn(st)
+            except Exception:
+                pass
+        return st
+
+    def _index(self, o: _SimOrder) -> None:
+        """Keep the open index in step with o.status; queue finished orders for eviction."""
+        if o.status in ("new", "partially_filled"):
+            self._open.setdefault(o.symbol, {})[o.order_id] = o
+            return
+        if o.done_ms:
+            return
+        live = self._open.get(o.symbol)
+        if live is not None and live.pop(o.order_id, None) is not None and not live:
+            del self._open[o.symbol]
+        o.done_ms = _now_ms()
+        self._terminal.append((o.done_ms, o.order_id))
+        while len(self._terminal) > self.max_terminal:
+            self._drop(self._terminal.popleft()[1])
+
+    def _drop(self, order_id: str) -> None:
+        o = self._orders.pop(order_id, None)
+        if o is not None and o.client_order_id and self._by_client.get(o.client_order_id) == order_id:
+            del self._by_client[o.client_order_id]
+
+    def forget_terminal(self, older_than_sec: float = 3600.0) -> int:
+        """Drop finished orders that finished more than `older_than_sec` ago (bounded memory)."""
+        cutoff = _now_ms() - int(older_than_sec * 1000)
+        n = 0
+        with self._lock:
+            while self._terminal and self._terminal[0][0] < cutoff:
+                self._drop(self._terminal.popleft()[1])
+                n += 1
+        return n
+
+    def _record(self, o: _SimOrder, px: float, qty: float, *, maker: bool) -> None:
+        o.fill(px, qty)
+        fee = px * qty * (self.maker_fee if maker else self.taker_fee)
+        self.fills.append(PaperFill(o.order_id, o.symbol, o.side, px, qty, maker, fee, _now_ms()))
+        self.stats["fills"] += 1
+
+    # -------------------------
+    # Market data in
+    # -------------------------
+    def book_age_ms(self, symbol: str) -> Optional[int]:
+        b = self._books.get(symbol)
+        return None if b is None or not b.updated_ms else _now_ms() - b.updated_ms
+
+    def on_book(self, symbol: str, bids: Sequence[Level], asks: Sequence[Level], *, ts_ms: Optional[int] = None) -> List[OrderStatus]:
+        """New L2 snapshot (best first). Returns statuses of own orders that changed."""
+        with self._lock:
+            b = self._book(symbol)
+            old_bid, old_ask = b.bid_size, b.ask_size
+            b.bids = [(float(p), float(q)) for p, q in bids]
+            b.asks = [(float(p), float(q)) for p, q in asks]
+            b.bid_size = dict(b.bids)
+            b.ask_size = dict(b.asks)
+            b.updated_ms = ts_ms if ts_ms is not None else _now_ms()
+            b.taken.clear()
+
+            changed: List[_SimOrder] = []
+            # 1) trade-through: the market crossed our resting price -> fill at our limit
+            if b.asks:
+                best_ask = b.asks[0][0]
+                while b.own_bid_px and b.own_bid_px[-1] >= best_ask:
+                    changed += self._fill_level(b, b.own_bids, b.own_bid_px, b.own_bid_px[-1], None)
+            if b.bids:
+                best_bid = b.bids[0][0]
+                while b.own_ask_px and b.own_ask_px[0] <= best_bid:
+                    changed += self._fill_level(b, b.own_asks, b.own_ask_px, b.own_ask_px[0], None)
+
+            # 2) queue progress: size that left our price level drains the queue ahead, then fills us
+            for px in list(b.own_bid_px):
+                gone = old_bid.get(px, 0.0) - b.bid_size.get(px, 0.0)
+                if gone > _EPS:
+                    changed += self._fill_level(b, b.own_bids, b.own_bid_px, px, gone)
+            for px in list(b.own_ask_px):
+                gone = old_ask.get(px, 0.0) - b.ask_size.get(px, 0.0)
+                if gone > _EPS:
+                    changed += self._fill_level(b, b.own_asks, b.own_ask_px, px, gone)
+            return [self._emit(o) for o in changed]
+
+    def on_trade(self, symbol: str, price: float, qty: float) -> List[OrderStatus]:
+        """Trade print at `price`: drains queue ahead of own orders at that price, then fills them."""
+        with self._lock:
+            b = self._book(symbol)
+            changed: List[_SimOrder] = []
+            px = float(price)
+            if px in b.own_bids:
+                changed += self._fill_level(b, b.own_bids, b.own_bid_px, px, float(qty))
+            if px in b.own_asks:
+                changed += self._fill_level(b, b.own_asks, b.own_ask_px, px, float(qty))
+            return [self._emit(o) for o in changed]
+
+    def _fill_level(
+        self,
+        b: _Book,
+        levels: Dict[float, Deque[_SimOrder]],
+        prices: List[float],
+        px: float,
+        volume: Optional[float],
+    ) -> List[_SimOrder]:
+        """Fill own orders at `px` in time priority; volume=None = traded through (fill all)."""
+        q = levels.get(px)
+        if not q:
+            return []
+        changed: List[_SimOrder] = []
+        left = float("inf") if volume is None else volume
+        for o in list(q):
+            if left <= _EPS:
+                break
+            if volume is not None and o.queue_ahead > 0:
+                eat = min(o.queue_ahead, left)
+                o.queue_ahead -= eat
+                left -= eat
+                # everyone behind in our FIFO also moved up by the same amount
+                for other in q:
+                    if other is not o and other.queue_ahead > 0:
+                        other.queue_ahead = max(0.0, other.queue_ahead - eat)
+                if left <= _EPS:
+                    break
+            take = min(o.remaining, left)
+            if take > _EPS:
+                self._record(o, px, take, maker=True)
+                left -= take
+                changed.append(o)
+            if o.status == "filled":
+                q.remove(o)
+        if not q:
+            del levels[px]
+            i = bisect.bisect_left(prices, px)
+            if i < len(prices) and prices[i] == px:
+                prices.pop(i)
+        return changed
+
+    # -------------------------
+    # Orders
+    # -------------------------
+    def place(self, req: OrderRequest, symbol: Optional[str] = None) -> OrderStatus:
+        sym = symbol or req.symbol
+        with self._lock:
+            o = _SimOrder(f"paper-{next(self._ids)}", req, sym)
+            self.stats["orders"] += 1
+            if o.client_order_id:
+                if o.client_order_id in self._by_client:
+                    o.status = "rejected"
+                    self.stats["rejected"] += 1
+                    return self._emit(o)
+                self._by_client[o.client_order_id] = o.order_id
+            self._orders[o.order_id] = o
+            if o.qty <= 0 or (o.order_type == "limit" and (o.price is None or o.price <= 0)):
+                o.status = "rejected"
+                self.stats["rejected"] += 1
+                return self._emit(o)
+
+            b = self._book(sym)
+            levels = b.asks if o.side == "buy" else b.bids
+            limit = o.price if o.order_type == "limit" else None
+            avail = self._available(b, levels, o.side, limit)
+            if o.tif == "FOK" and avail + _EPS < o.qty:
+                o.status = "expired"
+                return self._emit(o)
+
+            # take liquidity
+            for lpx, lqty in levels:
+                if o.remaining <= _EPS:
+                    break
+                if limit is not None and ((o.side == "buy" and lpx > limit) or (o.side == "sell" and lpx < limit)):
+                    break
+                k = ("ask" if o.side == "buy" else "bid", lpx)
+                free = lqty - b.taken.get(k, 0.0)
+                if free <= _EPS:
+                    continue
+                take = min(free, o.remaining)
+                b.taken[k] = b.taken.get(k, 0.0) + take
+                self._record(o, lpx, take, maker=False)
+
+            if o.remaining > _EPS:
+                if o.order_type == "market" or o.tif in ("IOC", "FOK"):
+                    o.status = "canceled"
+                else:
+                    same = b.bid_size if o.side == "buy" else b.ask_size
+                    o.queue_ahead = same.get(cast(float, o.price), 0.0)
+                    b.rest(o)
+            return self._emit(o)
+
+    @staticmethod
+    def _available(b: _Book, levels: List[Level], side: str, limit: Optional[float]) -> float:
+        tot = 0.0
+        key = "ask" if side == "buy" else "bid"
+        for lpx, lqty in levels:
+            if limit is not None and ((side == "buy" and lpx > limit) or (side == "sell" and lpx < limit)):
+                break
+            tot += max(0.0, lqty - b.taken.get((key, lpx), 0.0))
+        return tot
+
+    def _resolve(self, order_id: str) -> Optional[_SimOrder]:
+        o = self._orders.get(order_id)
+        if o is None:
+            oid = self._by_client.get(order_id)
+            o = self._orders.get(oid) if oid else None
+        return o
+
+    def cancel(self, order_id: str) -> OrderStatus:
+        with self._lock:
+            o = self._resolve(order_id)
+            if o is None:
+                raise AdapterError(f"paper order not found: {order_id}", error_class=ErrorClass.STOP, code="order_not_found")
+            if o.status in ("new", "partially_filled"):
+                self._book(o.symbol).unrest(o)
+                o.status = "canceled"
+                self.stats["canceled"] += 1
+            return self._emit(o)
+
+    def cancel_all(self, symbol: Optional[str] = None) -> List[OrderStatus]:
+        with self._lock:
+            if symbol is None:
+                live = [o for by_sym in self._open.values() for o in by_sym.values()]
+            else:
+                live = list(self._open.get(symbol, {}).values())
+            return [self.cancel(o.order_id) for o in live]
+
+    def get(self, order_id: str) -> OrderStatus:
+        with self._lock:
+            o = self._resolve(order_id)
+            if o is None:
+                raise AdapterError(f"paper order not found: {order_id}", error_class=ErrorClass.STOP, code="order_not_found")
+            return o.to_status()
+
+    def open_orders(self, symbol: Optional[str] = None) -> List[OrderStatus]:
+        with self._lock:
+            if symbol is not None:
+                return [o.to_status() for o in self._open.get(symbol, {}).values()]
+            return [o.to_status() for by_sym in self._open.values() for o in by_sym.values()]
+
+
+class PaperTradingAdapter(TradingAdapter):
+    """Real adapter for market data, PaperEngine for orders."""
+
+    def __init__(self, inner: TradingAdapter, *, engine: Optional[PaperEngine] = None, book_depth: int = 50, max_book_age_ms: int = 1000) -> None:
+        self.inner = inner
+        self.engine = engine or PaperEngine()
+        self.book_depth = book_depth
+        self.max_book_age_ms = max_book_age_ms
+
+    def __getattr__(self, item: str) -> Any:
+        # warm_up / clock / endpoint_status ... of the wrapped adapter
+        return getattr(self.inner, item)
+
+    @property
+    def name(self) -> str:
+        return self.inner.name
+
+    def get_capabilities(self) -> Capabilities:
+        return self.inner.get_capabilities()
+
+    def ping(self) -> None:
+        self.inner.ping()
+
+    def get_server_time_ms(self) -> int:
+        return self.inner.get_server_time_ms()
+
+    def normalize_symbol(self, symbol: str) -> str:
+        return self.inner.normalize_symbol(symbol)
+
+    def denormalize_symbol(self, symbol: str) -> str:
+        return self.inner.denormalize_symbol(symbol)
+
+    def get_market_info(self, symbol: str) -> MarketInfo:
+        return self.inner.get_market_info(symbol)
+
+    def get_best_bid_ask(self, symbol: str) -> Tuple[float, float]:
+        return self.inner.get_best_bid_ask(symbol)
+
+    def get_order_book(self, symbol: str, limit: int = 50) -> Tuple[List[Level], List[Level]]:
+        return self.inner.get_order_book(symbol, limit)
+
+    def get_daily_closes(self, symbol: str, n: int = 50) -> List[float]:
+        return self.inner.get_daily_closes(symbol, n)
+
+    def get_klines(self, symbol: str, interval: str, start_ms: int, end_ms: Optional[int] = None) -> Klines:
+        return self.inner.get_klines(symbol, interval, start_ms, end_ms)
+
+    def get_balances(self) -> List[Balance]:
+        return []
+
+    # -------------------------
+    # Orders -> engine
+    # -------------------------
+    def _key(self, symbol: str) -> str:
+        return self.inner.normalize_symbol(symbol)
+
+    def refresh(self, symbol: str) -> List[OrderStatus]:
+        """Pull a fresh book from the venue and run matching on it."""
+        bids, asks = self.inner.get_order_book(symbol, self.book_depth)
+        return self.engine.on_book(self._key(symbol), bids, asks)
+
+    def _ensure_book(self, symbol: str) -> None:
+        age = self.engine.book_age_ms(self._key(symbol))
+        if age is None or age > self.max_book_age_ms:
+            self.refresh(symbol)
+
+    def place_order(self, req: OrderRequest) -> OrderStatus:
+        self._ensure_book(req.symbol)
+        return self.engine.place(req, self._key(req.symbol))
+
+    def place_orders(self, reqs: List[OrderRequest]) -> List[OrderResult]:
+        out: List[OrderResult] = []
+        for r in reqs:
+            st = self.place_order(r)
+            ok = st.status != "rejected"
+            out.append(OrderResult(ok=ok, symbol=st.symbol, order_id=st.order_id, client_order_id=st.client_order_id,
+                                   code=None if ok else "rejected", raw=st.raw))
+        return out
+
+    def cancel_order(self, order_id: str, *, symbol: Optional[str] = None) -> None:
+        self.engine.cancel(order_id)
+
+    def cancel_orders(self, order_ids: List[str], *, symbol: Optional[str] = None) -> List[OrderResult]:
+        out: List[OrderResult] = []
+        for oid in order_ids:
+            try:
+                st = self.engine.cancel(oid)
+                out.append(OrderResult(ok=st.status == "canceled", symbol=st.symbol, order_id=st.order_id, client_order_id=st.client_order_id))
+            except AdapterError as e:
+                out.append(OrderResult(ok=False, symbol=symbol or "", order_id=oid, code=e.code, message=str(e)))
+        return out
+
+    def cancel_all_orders(self, symbol: Optional[str] = None) -> List[OrderResult]:
+        return [
+            OrderResult(ok=True, symbol=st.symbol, order_id=st.order_id, client_order_id=st.client_order_id)
+            for st in self.engine.cancel_all(self._key(symbol) if symbol else None)
+        ]
+
+    def get_order(self, order_id: str, *, symbol: Optional[str] = None) -> OrderStatus:
+        return self.engine.get(order_id)
+
+    def get_open_orders(self, symbol: Optional[str] = None) -> List[OrderStatus]:
+        return self.engine.open_orders(self._key(symbol) if symbol else None)
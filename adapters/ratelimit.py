@@ -0,0 +1,315 @@
+# adapters/ratelimit.py
+"""
+Weighted token-bucket rate limiter (per exchange, per endpoint group).
+
+- each endpoint group has its own bucket (capacity / refill per second)
+- requests carry a weight (MEXC-style weights, Bybit = 1)
+- waiters are served by priority; low priority can be shed instead of queued
+- buckets are re-synced from exchange headers after every response:
+    Bybit: X-Bapi-Limit / X-Bapi-Limit-Status / X-Bapi-Limit-Reset-Timestamp
+    MEXC : used-weight headers (X-MBX-USED-WEIGHT-* style)
+  and drained on 429 until the reset time (or a short penalty)
+
+The goal is to run at the real limit without ever hitting it.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from adapters.base import AdapterError, ErrorClass
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+    CRITICAL = 0    # kill switch / cancel
+    HIGH = 1        # reduce-only, time sync
+    NORMAL = 2      # market data used for decisions
+    LOW = 3         # scans / backfill (sheddable)
+
+
+# default max queueing time before a request is shed (None = queue)
+SHED_AFTER_SEC: Dict[Priority, Optional[float]] = {
+    Priority.CRITICAL: None,
+    Priority.HIGH: None,
+    Priority.NORMAL: None,
+    Priority.LOW: 2.0,
+}
+
+
+class RateLimitShed(AdapterError):
+    """Raised when a request would wait longer than its priority allows."""
+    def __init__(self, message: str, *, details: Optional[Dict[str, Any]] = None) -> None:
+        super().__init__(message, error_class=ErrorClass.RETRY, code="rate_limit_shed", details=details)
+
+
+@dataclass(frozen=True)
+class BucketSpec:
+    capacity: float        # burst (tokens)
+    per_sec: float         # refill rate (tokens / sec)
+
+
+class TokenBucket:
+    def __init__(self, spec: BucketSpec, headroom: float = 1.0) -> None:
+        self.capacity = spec.capacity * headroom
+        self.per_sec = spec.per_sec * headroom
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.waiters: List[Tuple[int, int, float]] = []   # heap of (priority, seq, weight)
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_sec)
+            self.updated = now
+
+    def wait_time(self, weight: float, now: float) -> float:
+        """Seconds until `weight` tokens are available (0 = now)."""
+        self._refill(now)
+        blocked = max(0.0, self.blocked_until - now)
+        missing = weight - self.tokens
+        if missing <= 0:
+            return blocked
+        if self.per_sec <= 0:
+            return float("inf")
+        return max(blocked, missing / self.per_sec)
+
+    def take(self, weight: float, now: float) -> None:
+        self._refill(now)
+        self.tokens -= weight
+
+    def sync_remaining(self, remaining: float, *, limit: Optional[float] = None, reset_in: Optional[float] = None) -> None:
+        """Trust the server if it thinks we have less budget than we do."""
+        now = time.monotonic()
+        self._refill(now)
+        if limit is not None and limit > 0 and limit < self.capacity:
+            self.capacity = float(limit)
+        if remaining < self.tokens:
+            self.tokens = max(0.0, float(remaining))
+        if remaining <= 0 and reset_in is not None and reset_in > 0:
+            self.blocked_until = max(self.blocked_until, now + reset_in)
+
+    def penalize(self, seconds: float) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+# -------------------------
+# Exchange profiles
+# -------------------------
+# (path prefix, group, weight); first match wins
+RouteTable = List[Tuple[str, str, float]]
+
+BYBIT_BUCKETS: Dict[str, BucketSpec] = {
+    "market": BucketSpec(capacity=600, per_sec=120),    # IP: 600 req / 5 s
+    "order": BucketSpec(capacity=10, per_sec=10),       # UID: 10 req / s (create/amend/cancel)
+    "order_batch": BucketSpec(capacity=10, per_sec=10),
+    "account": BucketSpec(capacity=10, per_sec=10),
+    "default": BucketSpec(capacity=120, per_sec=24),
+}
+BYBIT_ROUTES: RouteTable = [
+    ("/v5/market/", "market", 1),
+    ("/v5/order/create-batch", "order_batch", 1),
+    ("/v5/order/amend-batch", "order_batch", 1),
+    ("/v5/order/cancel-batch", "order_batch", 1),
+    ("/v5/order/", "order", 1),
+    ("/v5/position/", "account", 1),
+    ("/v5/account/", "account", 1),
+]
+
+MEXC_BUCKETS: Dict[str, BucketSpec] = {
+    "market": BucketSpec(capacity=500, per_sec=50),     # IP: 500 weight / 10 s
+    "order": BucketSpec(capacity=500, per_sec=50),
+    "default": BucketSpec(capacity=500, per_sec=50),
+}
+MEXC_ROUTES: RouteTable = [
+    ("/api/v3/exchangeInfo", "market", 10),
+    ("/api/v3/depth", "market", 1),
+    ("/api/v3/klines", "market", 1),
+    ("/api/v3/ticker/bookTicker", "market", 1),
+    ("/api/v3/time", "market", 1),
+    ("/api/v3/ping", "market", 1),
+    ("/api/v3/order", "order", 1),
+    ("/api/v3/openOrders", "order", 3),
+    ("/api/v3/batchOrders", "order", 1),
+    ("/api/v3/account", "order", 10),
+]
+
+# header names, lowercase
+_BYBIT_LIMIT = "x-bapi-limit"
+_BYBIT_STATUS = "x-bapi-limit-status"
+_BYBIT_RESET = "x-bapi-limit-reset-timestamp"
+_USED_WEIGHT_PREFIXES = ("x-mexc-used-weight", "x-mbx-used-weight")
+
+_PENALTY_429_SEC = 1.0
+
+
+def _headroom() -> float:
+    try:
+        v = float(os.environ.get("UNIVBOT_RL_HEADROOM", "0.9"))
+    except ValueError:
+        v = 0.9
+    return min(1.0, max(0.1, v))
+
+
+def _num(v: Any) -> Optional[float]:
+    try:
+        return float(str(v).strip())
+    except Exception:
+        return None
+
+
+class RateLimiter:
+    """
+    One limiter per exchange (shared by every adapter instance of that exchange).
+    acquire() before the request, observe() after it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        buckets: Mapping[str, BucketSpec],
+        routes: RouteTable,
+        *,
+        headroom: Optional[float] = None,
+        shed_after: Optional[Mapping[Priority, Optional[float]]] = None,
+    ) -> None:
+        self.name = name
+        hr = _headroom() if headroom is None else headroom
+        self._buckets: Dict[str, TokenBucket] = {g: TokenBucket(s, hr) for g, s in buckets.items()}
+        self._routes = list(routes)
+        self._shed_after = dict(shed_after or SHED_AFTER_SEC)
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self.stats: Dict[str, float] = {"acquired": 0, "shed": 0, "waited_sec": 0.0, "throttled_429": 0}
+
+    def route(self, path: str) -> Tuple[str, float]:
+        p = path.split("?", 1)[0]
+        for prefix, group, weight in self._routes:
+            if p.startswith(prefix):
+                return group, weight
+        return "default", 1.0
+
+    def _bucket(self, group: str) -> TokenBucket:
+        b = self._buckets.get(group)
+        if b is None:
+            b = self._buckets.get("default")
+        if b is None:
+            b = self._buckets[group] = TokenBucket(BucketSpec(capacity=10, per_sec=10))
+        return b
+
+    def acquire(
+        self,
+        group: str,
+        weight: float = 1.0,
+        *,
+        priority: Priority = Priority.NORMAL,
+        max_wait: Optional[float] = None,
+    ) -> float:
+        """
+        Block until `weight` tokens are granted; return seconds waited.
+        Raises RateLimitShed if the expected wait exceeds max_wait
+        (default: SHED_AFTER_SEC[priority]).
+        """
+        limit = self._shed_after.get(priority) if max_wait is None else max_wait
+        start = time.monotonic()
+        b = self._bucket(group)
+        ticket = (int(priority), next(self._seq), float(weight))
+
+        with self._cond:
+            heapq.heappush(b.waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    ahead = sum(w for (pr, sq, w) in b.waiters if (pr, sq) < ticket[:2])
+                    wait = b.wait_time(weight + ahead, now)
+                    if limit is not None and (now - start) + wait > limit:
+                        self.stats["shed"] += 1
+                        raise RateLimitShed(
+                            f"{self.name} rate limit: shed {group} (wait {wait:.2f}s > {limit}s)",
+                            details={"group": group, "weight": weight, "priority": int(priority)},
+                        )
+                    if b.waiters[0] is ticket and wait <= 0:
+                        b.take(weight, now)
+                        waited = now - start
+                        self.stats["acquired"] += 1
+                        self.stats["waited_sec"] += waited
+                        return waited
+                    self._cond.wait(timeout=max(0.001, min(wait, 0.25)) if wait > 0 else 0.01)
+            finally:
+                try:
+                    b.waiters.remove(ticket)
+                    heapq.heapify(b.waiters)
+                except ValueError:
+                    pass
+                self._cond.notify_all()
+
+    def acquire_path(self, path: str, *, priority: Priority = Priority.NORMAL, max_wait: Optional[float] = None) -> float:
+        group, weight = self.route(path)
+        return self.acquire(group, weight, priority=priority, max_wait=max_wait)
+
+    def observe(self, path: str, headers: Optional[Mapping[str, Any]], status: Optional[int] = None) -> None:
+        """Re-sync the path's bucket from response headers / status."""
+        group, _ = self.route(path)
+        h = {str(k).lower(): v for k, v in (headers or {}).items()}
+        now_wall = time.time()
+
+        with self._cond:
+            b = self._bucket(group)
+
+            remaining = _num(h.get(_BYBIT_STATUS))
+            if remaining is not None:
+                reset_ms = _num(h.get(_BYBIT_RESET))
+                reset_in = (reset_ms / 1000.0 - now_wall) if reset_ms else None
+                b.sync_remaining(remaining, limit=_num(h.get(_BYBIT_LIMIT)), reset_in=reset_in)
+
+            for k, v in h.items():
+                if k.startswith(_USED_WEIGHT_PREFIXES):
+                    used = _num(v)
+                    if used is not None:
+                        b.sync_remaining(b.capacity - used)
+
+            if status == 429:
+                self.stats["throttled_429"] += 1
+                reset_ms = _num(h.get(_BYBIT_RESET))
+                retry_after = _num(h.get("retry-after"))
+                if reset_ms:
+                    b.penalize(max(_PENALTY_429_SEC, reset_ms / 1000.0 - now_wall))
+                elif retry_after:
+                    b.penalize(retry_after)
+                else:
+                    b.penalize(_PENALTY_429_SEC)
+
+            self._cond.notify_all()
+
+
+# -------------------------
+# Shared per-exchange limiters
+# -------------------------
+_LIMITERS: Dict[str, RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+_PROFILES: Dict[str, Callable[[], RateLimiter]] = {
+    "bybit": lambda: RateLimiter("bybit", BYBIT_BUCKETS, BYBIT_ROUTES),
+    "mexc": lambda: RateLimiter("mexc", MEXC_BUCKETS, MEXC_ROUTES),
+}
+
+
+def get_rate_limiter(exchange: str) -> RateLimiter:
+    """Process-wide limiter for an exchange (budgets are per IP / UID, not per adapter)."""
+    ex = exchange.strip().lower()
+    with _LIMITERS_LOCK:
+        lim = _LIMITERS.get(ex)
+        if lim is None:
+            make = _PROFILES.get(ex)
+            lim = make() if make else RateLimiter(ex, {"default": BucketSpec(10, 10)}, [])
+            _LIMITERS[ex] = lim
+        return lim
@@ -0,0 +1,288 @@
+# adapters/resilience.py
+"""
+Request-layer survivability: ErrorClass mapping, retry and circuit breaking.
+
+- map HTTP status / exchange retCode / exception -> ErrorClass
+- RETRY: decorrelated-jitter backoff, bounded by a per-call deadline
+- STOP / KILL: fail fast (never retried)
+- per-endpoint circuit breaker: after sustained failures the endpoint is
+  refused immediately for `reset_after_sec`, then one probe is let through
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from adapters.base import AdapterError, ErrorClass, classify_exception
+
+T = TypeVar("T")
+
+
+# -------------------------
+# Classification
+# -------------------------
+def classify_http_status(status: int) -> ErrorClass:
+    if status in (408, 425, 429) or status >= 500:
+        return ErrorClass.RETRY
+    # 401/403 auth, 404 wrong path, 418 IP ban, other 4xx bad request
+    return ErrorClass.STOP
+
+
+# Bybit v5 retCode -> ErrorClass (unlisted non-zero codes fall back to the message)
+BYBIT_RET_CODES: Dict[int, ErrorClass] = {
+    10000: ErrorClass.RETRY,    # server timeout
+    10002: ErrorClass.RETRY,    # request time exceeds recv_window (clock drift)
+    10006: ErrorClass.RETRY,    # too many visits
+    10016: ErrorClass.RETRY,    # server error
+    10018: ErrorClass.RETRY,    # exceeded IP rate limit
+    10001: ErrorClass.STOP,     # params error
+    10003: ErrorClass.STOP,     # invalid api key
+    10004: ErrorClass.STOP,     # sign error
+    10005: ErrorClass.STOP,     # permission denied
+    10009: ErrorClass.STOP,     # IP banned
+    10010: ErrorClass.STOP,     # unmatched IP
+    10024: ErrorClass.STOP,     # compliance rules (region)
+    33004: ErrorClass.STOP,     # api key expired
+    10008: ErrorClass.KILL,     # account banned
+    10027: ErrorClass.KILL,     # trading banned
+    10029: ErrorClass.STOP,     # symbol not whitelisted
+    110001: ErrorClass.STOP,    # order does not exist
+    110007: ErrorClass.STOP,    # insufficient balance
+}
+
+# MEXC v3 error "code" -> ErrorClass
+MEXC_RET_CODES: Dict[int, ErrorClass] = {
+    429: ErrorClass.RETRY,
+    -1001: ErrorClass.RETRY,    # internal error / disconnected
+    -1003: ErrorClass.RETRY,    # too many requests
+    -1021: ErrorClass.RETRY,    # timestamp outside recvWindow
+    400: ErrorClass.STOP,
+    401: ErrorClass.STOP,
+    403: ErrorClass.STOP,
+    602: ErrorClass.STOP,       # signature verification failed
+    700002: ErrorClass.STOP,    # signature invalid
+    700003: ErrorClass.RETRY,   # timestamp outside recvWindow
+    700004: ErrorClass.STOP,    # param error
+    700005: ErrorClass.STOP,    # recvWindow too large
+    700006: ErrorClass.STOP,    # IP not in whitelist
+    700007: ErrorClass.STOP,    # no permission
+    10072: ErrorClass.STOP,     # invalid api key
+    30004: ErrorClass.STOP,     # insufficient position
+    30005: ErrorClass.STOP,     # oversold
+}
+
+_RET_CODES: Dict[str, Dict[int, ErrorClass]] = {
+    "bybit": BYBIT_RET_CODES,
+    "mexc": MEXC_RET_CODES,
+}
+
+
+def classify_ret_code(exchange: str, code: Any, message: str = "") -> ErrorClass:
+    try:
+        c = int(code)
+    except (TypeError, ValueError):
+        c = None
+    table = _RET_CODES.get(exchange.lower(), {})
+    if c is not None and c in table:
+        return table[c]
+    return classify_exception(Exception(message))
+
+
+def classify_error(e: BaseException) -> ErrorClass:
+    if isinstance(e, AdapterError):
+        return e.error_class
+    if isinstance(e, Exception):
+        return classify_exception(e)
+    return ErrorClass.STOP
+
+
+# -------------------------
+# Retry policy
+# -------------------------
+def _env_float(name: str, default: float) -> float:
+    v = os.environ.get(name)
+    if v is None or v.strip() == "":
+        return float(default)
+    try:
+        return float(v)
+    except ValueError:
+        return float(default)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    base_sec: float = 0.05          # first backoff floor
+    cap_sec: float = 1.0            # max single sleep
+    max_attempts: int = 4
+    deadline_sec: float = 4.0       # whole call (all attempts + sleeps)
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            base_sec=_env_float("UNIVBOT_RETRY_BASE_SEC", 0.05),
+            cap_sec=_env_float("UNIVBOT_RETRY_CAP_SEC", 1.0),
+            max_attempts=int(_env_float("UNIVBOT_RETRY_MAX_ATTEMPTS", 4)),
+            deadline_sec=_env_float("UNIVBOT_HTTP_DEADLINE_SEC", 4.0),
+        )
+
+    def next_sleep(self, prev: float) -> float:
+        """Decorrelated jitter: sleep = min(cap, U(base, prev * 3))."""
+        return min(self.cap_sec, random.uniform(self.base_sec, max(self.base_sec, prev * 3.0)))
+
+
+# -------------------------
+# Circuit breaker
+# -------------------------
+class CircuitOpen(AdapterError):
+    def __init__(self, message: str, *, details: Optional[Dict[str, Any]] = None) -> None:
+        super().__init__(message, error_class=ErrorClass.RETRY, code="circuit_open", details=details)
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive RETRY-class failures
+    open -> half-open after `reset_after_sec` (one probe allowed)
+    half-open -> closed on success, open again on failure
+    """
+
+    def __init__(self, key: str, *, failure_threshold: int = 5, reset_after_sec: float = 10.0) -> None:
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.reset_after_sec = reset_after_sec
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before(self) -> None:
+        with self._lock:
+            if self.state == "closed":
+                return
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.reset_after_sec:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            retry_in = max(0.0, self.reset_after_sec - (now - self.opened_at))
+            raise CircuitOpen(
+                f"circuit open: {self.key} (retry in {retry_in:.1f}s)",
+                details={"key": self.key, "failures": self.failures},
+            )
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def on_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """The call ended without an endpoint verdict (shed locally): let the next caller probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class BreakerRegistry:
+    """One breaker per endpoint key (exchange + path without query)."""
+
+    def __init__(self, *, failure_threshold: int = 5, reset_after_sec: float = 10.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_after_sec = reset_after_sec
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "BreakerRegistry":
+        return cls(
+            failure_threshold=int(_env_float("UNIVBOT_BREAKER_FAILURES", 5)),
+            reset_after_sec=_env_float("UNIVBOT_BREAKER_RESET_SEC", 10.0),
+        )
+
+    def get(self, key: str) -> CircuitBreaker:
+        with self._lock:
+            b = self._breakers.get(key)
+            if b is None:
+                b = self._breakers[key] = CircuitBreaker(
+                    key, failure_threshold=self.failure_threshold, reset_after_sec=self.reset_after_sec
+                )
+            return b
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            return {k: b.state for k, b in self._breakers.items()}
+
+
+# -------------------------
+# Runner
+# -------------------------
+# RETRY-class errors that retrying cannot fix within the same call
+_NO_RETRY_CODES = ("rate_limit_shed", "circuit_open")
+
+def call_with_retry(
+    fn: Callable[[float], T],
+    *,
+    timeout: float,
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    """
+    Run fn(attempt_timeout) with retries.
+    attempt_timeout = min(timeout, time left before the deadline).
+    STOP/KILL errors and an open breaker are raised immediately.
+    """
+    start = time.monotonic()
+    deadline = start + policy.deadline_sec
+    prev_sleep = policy.base_sec
+    attempt = 0
+
+    while True:
+        attempt += 1
+        if breaker is not None:
+            breaker.before()
+
+        left = deadline - time.monotonic()
+        attempt_timeout = max(0.05, min(timeout, left))
+        try:
+            out = fn(attempt_timeout)
+        except Exception as e:
+            ec = classify_error(e)
+            if getattr(e, "code", None) in _NO_RETRY_CODES:
+                # never reached the endpoint: no outcome, but free a half-open probe
+                if breaker is not None:
+                    breaker.release_probe()
+                raise
+            if ec is not ErrorClass.RETRY:
+                # structural / dangerous: the endpoint is fine, the request is not
+                if breaker is not None:
+                    breaker.on_success()
+                raise
+            if breaker is not None:
+                breaker.on_failure()
+
+            prev_sleep = policy.next_sleep(prev_sleep)
+            left = deadline - time.monotonic()
+            if attempt >= policy.max_attempts or left <= prev_sleep + 0.05:
+                if isinstance(e, AdapterError):
+                    e.details.setdefault("attempts", attempt)
+                raise
+            sleep(prev_sleep)
+            continue
+
+        if breaker is not None:
+            breaker.on_success()
+        return out
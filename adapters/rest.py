@@ -0,0 +1,353 @@
+# adapters/rest.py
+"""
+Shared REST layer for exchange adapters (public GET + JSON decode).
+
+Adapters keep their own `_get_json(path, timeout=...)` and delegate here so
+request budgeting and error handling live in one place.
+
+Every failure is raised as AdapterError with an ErrorClass:
+- HTTP status / exchange error code mapped via adapters.resilience
+- RETRY errors are retried inside the call deadline, STOP/KILL fail fast
+- each endpoint (path without query) has its own circuit breaker
+- identical concurrent GETs share one in-flight request (a caller never
+  waits on a less urgent one, nor past its own timeout); with
+  UNIVBOT_READ_MAX_AGE_MS > 0 repeat reads are served from a short cache
+  (paths in `no_cache`, e.g. server time, are neither cached nor
+  coalesced: a shared reply would skew ClockSync's RTT samples)
+- with alternate hosts configured (and hedging on), a GET that has not
+  answered within the endpoint's learned p95 is re-sent to an alternate
+  host; first reply wins (see adapters.hedging)
+- hosts live in an EndpointPool: traffic goes to the fastest healthy host
+  and a network / 5xx failure fails over to the next host in the same call
+- requests go over a shared keep-alive transport (adapters.transport);
+  warm_up() pays DNS / TCP / TLS before the first real request
+- signed_json() sends private requests built by adapters.signing
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from adapters.base import AdapterError, ErrorClass
+from adapters.coalesce import FlightTimeout, get_single_flight
+from adapters.endpoints import EndpointPool
+from adapters.hedging import Hedger
+from adapters.transport import HttpTransport, get_transport
+from adapters.ratelimit import Priority, RateLimiter
+from adapters.signing import SignedRequest
+from adapters.resilience import (
+    BreakerRegistry,
+    RetryPolicy,
+    call_with_retry,
+    classify_http_status,
+    classify_ret_code,
+)
+
+_MIN_FAILOVER_TIMEOUT = 0.5
+_PROBE_TIMEOUT = 2.0
+
+
+def _is_host_failure(e: AdapterError) -> bool:
+    """Failures that say something about the host, not about the request."""
+    if e.code in ("network", "invalid_json"):
+        return True
+    status = e.details.get("status") if isinstance(e.details, dict) else None
+    return isinstance(status, int) and status >= 500
+
+
+class RestClient:
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        *,
+        limiter: Optional[RateLimiter] = None,
+        retry: Optional[RetryPolicy] = None,
+        breakers: Optional[BreakerRegistry] = None,
+        ret_code_key: Optional[str] = None,
+        max_age_sec: Optional[float] = None,
+        no_cache: Sequence[str] = (),
+        alt_base_urls: Sequence[str] = (),
+        hedge: Optional[bool] = None,
+        probe_path: str = "/",
+        transport: Optional[HttpTransport] = None,
+        user_agent: str = "UnivBot/1.0",
+    ) -> None:
+        self.name = name
+        # base_url + alternates form one pool; `base_url` is whichever host is active
+        self.pool = EndpointPool(name, [base_url, *alt_base_urls])
+        self._origin = base_url.rstrip("/")
+        self.limiter = limiter
+        self.retry = retry or RetryPolicy.from_env()
+        self.breakers = breakers or BreakerRegistry.from_env()
+        # e.g. Bybit "retCode": HTTP 200 bodies can still carry an error
+        self.ret_code_key = ret_code_key
+        if max_age_sec is None:
+            try:
+                max_age_sec = float(os.environ.get("UNIVBOT_READ_MAX_AGE_MS", "0")) / 1000.0
+            except ValueError:
+                max_age_sec = 0.0
+        self.max_age_sec = max(0.0, max_age_sec)
+        self.no_cache = tuple(no_cache)
+        self.probe_path = probe_path
+        self.flight = get_single_flight(name)
+        if hedge is None:
+            hedge = os.environ.get("UNIVBOT_HEDGE", "0").strip() == "1"
+        self.hedger: Optional[Hedger] = Hedger() if (hedge and len(self.pool) > 1) else None
+        # keep-alive pool + DNS cache shared by every client in the process
+        self.transport = transport or get_transport()
+        self.user_agent = user_agent
+
+    @property
+    def base_url(self) -> str:
+        return self.pool.active
+
+    @base_url.setter
+    def base_url(self, value: str) -> None:
+        self.pool.set_primary(value)
+
+    def get_json(
+        self,
+        path: str,
+        *,
+        timeout: float = 10.0,
+        priority: Priority = Priority.NORMAL,
+    ) -> Dict[str, Any]:
+        endpoint = path.split("?", 1)[0]
+        breaker = self.breakers.get(f"{self.name}:{endpoint}")
+
+        def _call() -> Dict[str, Any]:
+            return call_with_retry(
+                lambda t: self._get_once(path, timeout=t, priority=priority),
+                timeout=timeout,
+                policy=self.retry,
+                breaker=breaker,
+            )
+
+        if endpoint.startswith(self.no_cache):
+            return _call()
+        try:
+            return self.flight.do(
+                f"{self._origin}{path}",
+                _call,
+                max_age=self.max_age_sec,
+                priority=int(priority),
+                timeout=timeout,
+            )
+        except FlightTimeout as e:
+            raise AdapterError(
+                f"{self.name} timeout waiting for shared request: {path}",
+                error_class=ErrorClass.RETRY,
+                code="timeout",
+            ) from e
+
+    def signed_json(
+        self,
+        sign: Callable[[], SignedRequest],
+        *,
+        timeout: float = 10.0,
+        priority: Priority = Priority.HIGH,
+    ) -> Dict[str, Any]:
+        """
+        Private request. `sign()` is called per attempt so every retry carries
+        a fresh timestamp. Never coalesced / cached / hedged; only GETs are
+        retried (a POST that timed out may already have been applied).
+        Sent to the active host only.
+        """
+        first = sign()
+        endpoint = first.path.split("?", 1)[0]
+        breaker = self.breakers.get(f"{self.name}:{endpoint}")
+        policy = self.retry if first.method == "GET" else replace(self.retry, max_attempts=1)
+        pending = [first]
+
+        def _once(t: float) -> Dict[str, Any]:
+            req = pending.pop() if pending else sign()
+            return self._send(
+                req.method,
+                self.base_url,
+                req.path,
+                timeout=t,
+                priority=priority,
+                headers=req.headers,
+                body=req.body,
+            )
+
+        return call_with_retry(_once, timeout=timeout, policy=policy, breaker=breaker)
+
+    def _get_once(self, path: str, *, timeout: float, priority: Priority) -> Dict[str, Any]:
+        hosts = self.pool.ordered()
+        end = time.monotonic() + timeout
+        if self.hedger is not None:
+            tried: List[str] = []
+
+            def _attempt(h: str) -> Dict[str, Any]:
+                tried.append(h)
+                return self._fetch_tracked(h, path, timeout=timeout, priority=priority)
+
+            attempts: List[Callable[[], Dict[str, Any]]] = [(lambda h=h: _attempt(h)) for h in hosts]
+            try:
+                return self.hedger.call(f"{self.name}:{path.split('?', 1)[0]}", attempts)
+            except AdapterError as e:
+                # primary (and hedge) failed at host level: fail over to the hosts not tried yet
+                hosts = [h for h in hosts if h not in tried]
+                if not hosts or not _is_host_failure(e):
+                    raise
+
+        # failover inside one request: a host-level failure moves on to the next host
+        for i, h in enumerate(hosts):
+            left = max(_MIN_FAILOVER_TIMEOUT, end - time.monotonic())
+            try:
+                return self._fetch_tracked(h, path, timeout=min(timeout, left), priority=priority)
+            except AdapterError as e:
+                if i + 1 >= len(hosts) or not _is_host_failure(e):
+                    raise
+        raise AssertionError("unreachable")
+
+    def _fetch_tracked(self, base_url: str, path: str, *, timeout: float, priority: Priority) -> Dict[str, Any]:
+        try:
+            out = self._fetch(base_url, path, timeout=timeout, priority=priority)
+        except AdapterError as e:
+            if _is_host_failure(e):
+                self.pool.report_failure(base_url, str(e))
+            raise
+        self.pool.report_success(base_url)
+        return out
+
+    def probe(self, base_url: str) -> float:
+        """Time one server-time GET against a specific host (for EndpointPool.start)."""
+        t0 = time.monotonic()
+        self._fetch(base_url, self.probe_path, timeout=_PROBE_TIMEOUT, priority=Priority.HIGH)
+        return time.monotonic() - t0
+
+    def _fetch(self, base_url: str, path: str, *, timeout: float, priority: Priority) -> Dict[str, Any]:
+        return self._send("GET", base_url, path, timeout=timeout, priority=priority)
+
+    def _send(
+        self,
+        method: str,
+        base_url: str,
+        path: str,
+        *,
+        timeout: float,
+        priority: Priority,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[bytes] = None,
+    ) -> Dict[str, Any]:
+        if self.limiter is not None:
+            self.limiter.acquire_path(path, priority=priority)
+
+        url = f"{base_url}{path}"
+        hdrs = {"User-Agent": self.user_agent}
+        if headers:
+            hdrs.update(headers)
+        try:
+            resp = self.transport.request(method, url, headers=hdrs, body=body, timeout=timeout)
+        except OSError as e:
+            # same text as the old urllib path: URLError.reason, i.e. the socket error
+            raise AdapterError(
+                f"{self.name} network error: {getattr(e, 'reason', e)} url={url}",
+                error_class=ErrorClass.RETRY,
+                code="network",
+                details={"url": url},
+            ) from e
+        except Exception as e:
+            raise AdapterError(
+                f"{self.name} request failed: {e!r} url={url}",
+                error_class=ErrorClass.RETRY,
+                code="network",
+                details={"url": url},
+            ) from e
+
+        if self.limiter is not None:
+            self.limiter.observe(path, resp.headers, resp.status)
+        raw = resp.body.decode("utf-8", errors="replace")
+        if resp.status >= 400:
+            raise self._http_error(resp.status, resp.reason, raw, url)
+
+        try:
+            data = json.loads(raw)
+        except Exception as e:
+            raise AdapterError(
+                f"{self.name} invalid json: {raw[:200]} url={url}",
+                error_class=ErrorClass.RETRY,
+                code="invalid_json",
+                details={"url": url},
+            ) from e
+
+        if self.ret_code_key and isinstance(data, dict):
+            rc = data.get(self.ret_code_key)
+            if rc not in (None, 0, "0"):
+                msg = str(data.get("retMsg") or data.get("msg") or "")
+                raise AdapterError(
+                    f"{self.name} api error: {rc} {msg} url={url}",
+                    error_class=classify_ret_code(self.name, rc, msg),
+                    code=str(rc),
+                    details={"url": url, "body": data},
+                )
+
+        # exchanges normally return dict; wrap lists (klines etc.)
+        return data if isinstance(data, dict) else {"raw": data}
+
+    def _http_error(self, status: int, reason: str, raw: str, url: str) -> AdapterError:
+        body: Any = None
+        try:
+            body = json.loads(raw)
+        except Exception:
+            body = None
+
+        code: Any = status
+        msg = str(reason)
+        error_class = classify_http_status(status)
+        if isinstance(body, dict):
+            # MEXC: {"code": 700002, "msg": "..."} / Bybit: {"retCode": .., "retMsg": ..}
+            rc = body.get("code", body.get("retCode"))
+            if rc is not None and status not in (429,) and status < 500:
+                code = rc
+                msg = str(body.get("msg") or body.get("retMsg") or msg)
+                error_class = classify_ret_code(self.name, rc, msg)
+
+        return AdapterError(
+            f"{self.name} http error: {status} {reason} url={url}",
+            error_class=error_class,
+            code=str(code),
+            details={"url": url, "status": status, "message": msg, "body": body},
+        )
+
+    # -------------------------
+    # Warm-up
+    # -------------------------
+    def warm_up(self, *, connections: int = 2, keepalive_sec: float = 15.0) -> List[Dict[str, Any]]:
+        """
+        Pre-resolve DNS and open pooled connections to every host (N to the
+        active one, 1 to each alternate), each primed with the probe request.
+        keepalive_sec > 0 keeps idle connections warm with the same request.
+        """
+        limiter = self.limiter
+
+        def _budget() -> None:
+            # warm-up / keepalive pings spend the same budget (LOW: shed under pressure)
+            if limiter is not None:
+                limiter.acquire_path(self.probe_path, priority=Priority.LOW)
+
+        hdrs = {"User-Agent": self.user_agent}
+        out: List[Dict[str, Any]] = []
+        for i, host in enumerate(self.pool.ordered()):
+            try:
+                out.append(
+                    self.transport.warm(
+                        host,
+                        connections=connections if i == 0 else 1,
+                        path=self.probe_path,
+                        headers=hdrs,
+                        before_request=_budget,
+                    )
+                )
+            except Exception as e:
+                self.pool.report_failure(host, repr(e))
+                out.append({"host": host, "error": repr(e)[:200]})
+        if keepalive_sec > 0:
+            self.transport.start_keepalive(interval_sec=keepalive_sec)
+        return out
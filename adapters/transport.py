@@ -0,0 +1,431 @@
+# adapters/transport.py
+"""
+Keep-alive HTTP transport with a DNS cache (stdlib http.client).
+
+urlopen() opens a new TCP + TLS connection per request, so every call pays
+DNS + handshake. This transport keeps a small LIFO pool of connections per
+(scheme, host, port) and resolves hosts through a TTL cache.
+
+- warm(): resolve DNS, open N connections and send one cheap request
+  before the first real decision needs them
+- keepalive: a background loop sends a light GET on idle connections so
+  they are not dropped by the server / NAT
+- proxies: HTTP(S)_PROXY / NO_PROXY are honoured as urlopen() did. An
+  http:// proxy keeps pooled connections (CONNECT tunnel for https,
+  absolute-form requests for http); any other proxy scheme goes through
+  urlopen() unpooled
+"""
+from __future__ import annotations
+
+import atexit
+import base64
+import http.client
+import os
+import socket
+import ssl
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, cast
+from urllib.error import HTTPError
+from urllib.parse import unquote, urlsplit
+from urllib.request import Request, getproxies, proxy_bypass, urlopen
+
+PoolKey = Tuple[str, str, int]   # (scheme, host, port)
+Proxy = Tuple[str, str, int, Dict[str, str]]   # (proxy scheme, host, port, proxy headers)
+
+# errors that mean "the reused connection was closed under us"
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, http.client.CannotSendRequest)
+
+
+class DnsCache:
+    """getaddrinfo() results cached for `ttl_sec` (failed lookups are not cached)."""
+
+    def __init__(self, *, ttl_sec: float = 60.0) -> None:
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, int], Tuple[float, List[Tuple[Any, ...]]]] = {}
+
+    def resolve(self, host: str, port: int) -> List[Tuple[Any, ...]]:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get((host, port))
+            if hit is not None and now - hit[0] < self.ttl_sec:
+                return hit[1]
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        with self._lock:
+            self._entries[(host, port)] = (now, infos)
+        return infos
+
+    def connect(self, host: str, port: int, timeout: Optional[float]) -> socket.socket:
+        last: Optional[BaseException] = None
+        for family, stype, proto, _, addr in self.resolve(host, port):
+            s = socket.socket(family, stype, proto)
+            try:
+                if timeout is not None:
+                    s.settimeout(timeout)
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                s.connect(addr)
+                return s
+            except OSError as e:
+                last = e
+                s.close()
+        # cached address may be dead: drop it so the next call re-resolves
+        with self._lock:
+            self._entries.pop((host, port), None)
+        raise last or OSError(f"cannot connect to {host}:{port}")
+
+
+class _HTTPConnection(http.client.HTTPConnection):
+    def __init__(self, host: str, port: int, *, dns: DnsCache, timeout: Optional[float]) -> None:
+        super().__init__(host, port, timeout=timeout)
+        self._dns = dns
+
+    def connect(self) -> None:
+        self.sock = self._dns.connect(self.host, self.port, self.timeout)
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, host: str, port: int, *, dns: DnsCache, timeout: Optional[float], context: ssl.SSLContext) -> None:
+        super().__init__(host, port, timeout=timeout, context=context)
+        self._dns = dns
+        self._ctx = context
+
+    def connect(self) -> None:
+        raw = self._dns.connect(self.host, self.port, self.timeout)
+        self.sock = self._ctx.wrap_socket(raw, server_hostname=self.host)
+
+
+class HttpResponse:
+    __slots__ = ("status", "reason", "headers", "body")
+
+    def __init__(self, status: int, reason: str, headers: Mapping[str, str], body: bytes) -> None:
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+
+def _parse_proxy(url: str) -> Proxy:
+    u = urlsplit(url if "://" in url else f"http://{url}")
+    scheme = (u.scheme or "http").lower()
+    headers: Dict[str, str] = {}
+    if u.username is not None:
+        cred = f"{unquote(u.username)}:{unquote(u.password or '')}".encode("utf-8")
+        headers["Proxy-Authorization"] = "Basic " + base64.b64encode(cred).decode("ascii")
+    return scheme, u.hostname or "", u.port or (443 if scheme == "https" else 8080 if scheme == "http" else 1080), headers
+
+
+class HttpTransport:
+    def __init__(
+        self,
+        *,
+        max_idle_per_host: int = 8,
+        dns_ttl_sec: float = 60.0,
+        proxies: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        """proxies: {scheme: proxy url}; None = environment (urllib.request.getproxies())."""
+        self.max_idle_per_host = max_idle_per_host
+        self.proxies = dict(getproxies() if proxies is None else proxies)
+        self._proxy_cache: Dict[PoolKey, Optional[Proxy]] = {}
+        self.dns = DnsCache(ttl_sec=dns_ttl_sec)
+        self._ctx = ssl.create_default_context()
+        self._lock = threading.Lock()
+        self._idle: Dict[PoolKey, List[http.client.HTTPConnection]] = {}
+        self._pings: Dict[PoolKey, Tuple[str, Dict[str, str], Optional[Callable[[], None]]]] = {}
+        self._ka_stop = threading.Event()
+        self._ka_thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {"new_conn": 0, "reused": 0, "stale_retry": 0, "keepalive": 0}
+
+    # -------------------------
+    # Pool
+    # -------------------------
+    @staticmethod
+    def _key(url: str) -> Tuple[PoolKey, str]:
+        u = urlsplit(url)
+        scheme = (u.scheme or "https").lower()
+        port = u.port or (443 if scheme == "https" else 80)
+        target = u.path or "/"
+        if u.query:
+            target = f"{target}?{u.query}"
+        return (scheme, u.hostname or "", port), target
+
+    def _proxy_for(self, key: PoolKey) -> Optional[Proxy]:
+        if key in self._proxy_cache:
+            return self._proxy_cache[key]
+        scheme, host, _ = key
+        url = self.proxies.get(scheme)
+        proxy = _parse_proxy(url) if url and not proxy_bypass(host) else None
+        self._proxy_cache[key] = proxy
+        return proxy
+
+    def _target(self, key: PoolKey, target: str, headers: Dict[str, str]) -> str:
+        """Request target (absolute-form through an http proxy); adds proxy auth to `headers`."""
+        proxy = self._proxy_for(key)
+        scheme, host, port = key
+        if proxy is None or scheme != "http":
+            return target
+        headers.update(proxy[3])
+        return f"http://{host}:{port}{target}"
+
+    def _new_conn(self, key: PoolKey, timeout: Optional[float]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        self.stats["new_conn"] += 1
+        proxy = self._proxy_for(key)
+        if proxy is not None:
+            # the proxy resolves the target host: no DNS cache here
+            _, phost, pport, phdrs = proxy
+            if scheme == "https":
+                conn: http.client.HTTPConnection = http.client.HTTPSConnection(
+                    phost, pport, timeout=timeout, context=self._ctx
+                )
+                conn.set_tunnel(host, port, headers=phdrs)
+                return conn
+            return http.client.HTTPConnection(phost, pport, timeout=timeout)
+        if scheme == "https":
+            return _HTTPSConnection(host, port, dns=self.dns, timeout=timeout, context=self._ctx)
+        return _HTTPConnection(host, port, dns=self.dns, timeout=timeout)
+
+    def _checkout(self, key: PoolKey, timeout: Optional[float]) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                self.stats["reused"] += 1
+                reused = True
+            else:
+                conn = None
+                reused = False
+        if conn is None:
+            conn = self._new_conn(key, timeout)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, reused
+
+    def _checkin(self, key: PoolKey, conn: http.client.HTTPConnection) -> None:
+        if conn.sock is None:
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def idle_count(self, url: str) -> int:
+        key, _ = self._key(url)
+        with self._lock:
+            return len(self._idle.get(key) or [])
+
+    # -------------------------
+    # Requests
+    # -------------------------
+    def _send(
+        self,
+        conn: http.client.HTTPConnection,
+        method: str,
+        target: str,
+        headers: Mapping[str, str],
+        body: Optional[bytes],
+    ) -> HttpResponse:
+        conn.request(method, target, body=body, headers=dict(headers))
+        resp = conn.getresponse()
+        data = resp.read()
+        hdrs = {k: v for k, v in resp.getheaders()}
+        if resp.will_close:
+            conn.close()
+        return HttpResponse(resp.status, resp.reason, hdrs, data)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: Optional[Mapping[str, str]] = None,
+        body: Optional[bytes] = None,
+        timeout: Optional[float] = 10.0,
+    ) -> HttpResponse:
+        key, target = self._key(url)
+        hdrs = dict(headers or {})
+        proxy = self._proxy_for(key)
+        if proxy is not None and proxy[0] != "http":
+            return self._urlopen(method, url, hdrs, body, timeout)
+        target = self._target(key, target, hdrs)
+        conn, reused = self._checkout(key, timeout)
+        try:
+            out = self._send(conn, method, target, hdrs, body)
+        except _STALE_ERRORS:
+            conn.close()
+            if not reused or method.upper() != "GET":
+                raise
+            # idle connection was closed by the server: one retry on a fresh one
+            self.stats["stale_retry"] += 1
+            conn = self._new_conn(key, timeout)
+            try:
+                out = self._send(conn, method, target, hdrs, body)
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+        self._checkin(key, conn)
+        return out
+
+    def _urlopen(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Optional[bytes],
+        timeout: Optional[float],
+    ) -> HttpResponse:
+        """Unpooled path for proxy schemes http.client cannot tunnel through (urllib handles them)."""
+        self.stats["new_conn"] += 1
+        req = Request(url, data=body, headers=headers, method=method)
+        try:
+            with urlopen(req, timeout=timeout) as resp:
+                return HttpResponse(resp.status, resp.reason, dict(resp.headers.items()), resp.read())
+        except HTTPError as e:
+            return HttpResponse(e.code, str(e.reason), dict((e.headers or {}).items()), e.read() or b"")
+
+    # -------------------------
+    # Warm-up / keepalive
+    # -------------------------
+    def warm(
+        self,
+        base_url: str,
+        *,
+        connections: int = 2,
+        path: str = "/",
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: float = 5.0,
+        before_request: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Resolve + connect `connections` sockets (TCP/TLS done up front) and send
+        one cheap GET on each so the server has seen the connection.
+        Returns timings in ms.
+        """
+        key, _ = self._key(base_url)
+        scheme, host, port = key
+        proxy = self._proxy_for(key)
+        if proxy is not None and proxy[0] != "http":
+            return {"host": host, "proxy": proxy[0], "connections": 0, "ok": 0}
+        t0 = time.monotonic()
+        if proxy is None:
+            self.dns.resolve(host, port)
+        t_dns = time.monotonic()
+
+        conns: List[http.client.HTTPConnection] = []
+        try:
+            for _ in range(max(1, connections)):
+                c = self._new_conn(key, timeout)
+                conns.append(c)
+                c.connect()
+        except BaseException:
+            # a later connect failed: do not leak the sockets already open
+            for c in conns:
+                c.close()
+            raise
+        t_conn = time.monotonic()
+
+        ok = 0
+        hdrs = dict(headers or {})
+        target = self._target(key, self._key(base_url.rstrip("/") + path)[1], hdrs)
+        for c in conns:
+            try:
+                if before_request is not None:
+                    before_request()
+                self._send(c, "GET", target, hdrs, None)
+                ok += 1
+            except Exception:
+                c.close()
+        t_req = time.monotonic()
+        for c in conns:
+            self._checkin(key, c)
+
+        self._pings[key] = (target, hdrs, before_request)
+        return {
+            "host": host,
+            "dns_ms": round((t_dns - t0) * 1000, 2),
+            "connect_ms": round((t_conn - t_dns) * 1000, 2),
+            "first_request_ms": round((t_req - t_conn) * 1000, 2),
+            "connections": len(conns),
+            "ok": ok,
+        }
+
+    def keepalive_once(self) -> None:
+        for key, (target, headers, before) in list(self._pings.items()):
+            with self._lock:
+                idle = self._idle.get(key) or []
+                conns, self._idle[key] = list(idle), []
+            for c in conns:
+                try:
+                    if before is not None:
+                        before()
+                    self._send(c, "GET", target, headers, None)
+                    self.stats["keepalive"] += 1
+                except Exception:
+                    c.close()
+                    continue
+                self._checkin(key, c)
+            # refresh DNS in the background too (keeps resolve() off the hot path)
+            if self._proxy_for(key) is not None:
+                continue
+            try:
+                self.dns.resolve(key[1], key[2])
+            except OSError:
+                pass
+
+    def start_keepalive(self, *, interval_sec: float = 15.0) -> None:
+        if self._ka_thread is not None and self._ka_thread.is_alive():
+            return
+        self._ka_stop.clear()
+
+        def _loop() -> None:
+            while not self._ka_stop.wait(interval_sec):
+                self.keepalive_once()
+
+        self._ka_thread = threading.Thread(target=_loop, name="http-keepalive", daemon=True)
+        self._ka_thread.start()
+
+    def stop_keepalive(self) -> None:
+        self._ka_stop.set()
+
+
+# -------------------------
+# Shared transport
+# -------------------------
+_TRANSPORT: Optional[HttpTransport] = None
+_TRANSPORT_LOCK = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """
+    Process-wide transport: every adapter shares DNS cache and idle connections.
+    UNIVBOT_REPLAY_DIR serves recorded responses instead (adapters.capture);
+    UNIVBOT_CAPTURE_DIR records every live response.
+    """
+    global _TRANSPORT
+    with _TRANSPORT_LOCK:
+        if _TRANSPORT is None:
+            replay = os.environ.get("UNIVBOT_REPLAY_DIR", "").strip()
+            capture = os.environ.get("UNIVBOT_CAPTURE_DIR", "").strip()
+            if replay:
+                from adapters.capture import ReplayTransport
+                from adapters.clock import set_clock
+
+                pace = os.environ.get("UNIVBOT_REPLAY_PACE", "asap").strip() or "asap"
+                replay_tr = ReplayTransport(replay, pace=pace)
+                set_clock(replay_tr.clock)
+                _TRANSPORT = cast(HttpTransport, replay_tr)
+            elif capture:
+                from adapters.capture import Recorder, RecordingTransport
+
+                rec = Recorder(capture)
+                atexit.register(rec.close)
+                _TRANSPORT = cast(HttpTransport, RecordingTransport(HttpTransport(), rec))
+            else:
+                _TRANSPORT = HttpTransport()
+        return _TRANSPORT
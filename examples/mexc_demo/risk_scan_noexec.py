@@ -1,13 +1,25 @@
 """
 Risk Scan Demo (NO EXECUTION)
-Spread + liquidity check only.
+Spread + liquidity check only (THIN = slippage to sweep THIN_NOTIONAL).
 """
 
+import sys
+from pathlib import Path
+
 from marketdata_stream import fetch_orderbook
 
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from utils.liquidity import classify_liquidity, estimate_book  # noqa: E402
+
+THIN_NOTIONAL = 10_000.0   # quote amount (USDT) to sweep
+THIN_BPS = 10.0            # slippage vs mid above this -> THIN
+
 
 def scan(symbol="BTCUSDT"):
-    ob = fetch_orderbook(symbol, limit=5)
+    ob = fetch_orderbook(symbol, limit=100)
 
     best_bid = float(ob["bids"][0][0])
     best_ask = float(ob["asks"][0][0])
@@ -19,7 +31,8 @@ def scan(symbol="BTCUSDT"):
     status = "OK"
     if spread > 5:
         status = "WIDE"
-    if bid_liq < 1 or ask_liq < 1:
+    est = estimate_book(ob["bids"], ob["asks"], notionals=[THIN_NOTIONAL], venue="MEXC", symbol=symbol)
+    if classify_liquidity(est, notional=THIN_NOTIONAL, max_slippage_bps=THIN_BPS) == "THIN":
         status = "THIN"
 
     return {
@@ -28,6 +41,8 @@ def scan(symbol="BTCUSDT"):
         "spread": spread,
         "bid_liquidity": bid_liq,
         "ask_liquidity": ask_liq,
+        "buy_slippage_bps": est.buy[0].slippage_bps,
+        "sell_slippage_bps": est.sell[0].slippage_bps,
         "status": status,
         "execution": "DISABLED"
     }
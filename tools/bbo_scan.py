@@ -0,0 +1,65 @@
+# tools/bbo_scan.py
+# Consolidated cross-venue BBO (read-only).
+#   PYTHONPATH=. python tools/bbo_scan.py --exchanges bybit,mexc --symbols BTCUSDT,ETHUSDT
+#   ... --interval 1 --archive out/ticks      # also persist every quote (utils/tick_archive.py)
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from adapters.factory import get_trading_adapter  # noqa: E402
+from utils.bbo_aggregator import BboAggregator, sources_from_adapters  # noqa: E402
+from utils.tick_archive import TickArchiveWriter  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--exchanges", default=os.environ.get("UNIVBOT_EXCHANGES", "bybit,mexc"))
+    ap.add_argument("--symbols", default="BTCUSDT")
+    ap.add_argument("--stale-ms", type=int, default=3000)
+    ap.add_argument("--interval", type=float, default=0.0, help="0 = one shot, else poll every N sec")
+    ap.add_argument("--archive", default="", help="tick archive root; empty = do not persist")
+    args = ap.parse_args()
+
+    exchanges = [x.strip() for x in args.exchanges.split(",") if x.strip()]
+    symbols = [x.strip().upper() for x in args.symbols.split(",") if x.strip()]
+
+    adapters = [get_trading_adapter(ex) for ex in exchanges]
+    agg = BboAggregator(stale_ms=args.stale_ms)
+    sources = sources_from_adapters(adapters)
+    writers = {a.name: TickArchiveWriter(args.archive, a.name) for a in adapters} if args.archive else {}
+    archived: Dict[Tuple[str, str], int] = {}     # (venue, symbol) -> recv_ms last written
+
+    try:
+        while True:
+            errors = agg.poll(sources, symbols)
+            snap = agg.snapshot()
+            out = {sym: c.to_dict() for sym, c in snap.items()}
+            print(json.dumps({"bbo": out, "errors": errors}, ensure_ascii=False))
+            for sym in snap:
+                for q in agg.quotes(sym):
+                    # stamped with the venue's receive time; a quote not refreshed since the last poll is not re-archived
+                    w = writers.get(q["venue"])
+                    if w is None or q["recv_ms"] <= archived.get((q["venue"], sym), 0):
+                        continue
+                    archived[(q["venue"], sym)] = q["recv_ms"]
+                    w.append_bbo(sym, q["recv_ms"], q["bid"], q["ask"])
+            if args.interval <= 0:
+                break
+            time.sleep(args.interval)
+    finally:
+        for w in writers.values():
+            w.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# tools/capture_replay.py
+# Inspect capture segments (adapters/capture.py) and benchmark parsing on real payloads.
+#   UNIVBOT_CAPTURE_DIR=out/capture PYTHONPATH=. python tools/risk_scan.py            # record
+#   UNIVBOT_REPLAY_DIR=out/capture PYTHONPATH=. python tools/risk_scan.py             # replay, as fast as possible
+#   UNIVBOT_REPLAY_DIR=out/capture UNIVBOT_REPLAY_PACE=recorded ...                   # replay at recorded pace
+#   PYTHONPATH=. python tools/capture_replay.py stats out/capture
+#   PYTHONPATH=. python tools/capture_replay.py bench out/capture --repeat 5
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from adapters.capture import read_records, segment_files  # noqa: E402
+
+
+def stats(directory: str) -> Dict[str, Any]:
+    files = segment_files(directory)
+    n = 0
+    body_bytes = 0
+    first = last = None
+    paths: Counter = Counter()
+    for r in read_records(directory):
+        n += 1
+        body_bytes += len(r.body)
+        first = r.recv_ns if first is None else min(first, r.recv_ns)
+        last = r.recv_ns if last is None else max(last, r.recv_ns)
+        paths[f"{r.kind} {r.key.split('?', 1)[0]}"] += 1
+    disk = sum(f.stat().st_size for f in files)
+    return {
+        "segments": len(files),
+        "records": n,
+        "body_bytes": body_bytes,
+        "disk_bytes": disk,
+        "ratio": round(body_bytes / disk, 2) if disk else None,
+        "span_sec": round((last - first) / 1e9, 3) if n else 0.0,
+        "by_endpoint": dict(paths.most_common(20)),
+    }
+
+
+def bench(directory: str, repeat: int) -> Dict[str, Any]:
+    """Decode + json-parse every recorded body `repeat` times (records held in memory)."""
+    t0 = time.perf_counter()
+    records = list(read_records(directory))
+    read_sec = time.perf_counter() - t0
+    bodies = [r.body for r in records if r.body]
+    total = sum(len(b) for b in bodies)
+
+    errors = 0
+    t0 = time.perf_counter()
+    for _ in range(max(1, repeat)):
+        for b in bodies:
+            try:
+                json.loads(b)
+            except ValueError:
+                errors += 1
+    parse_sec = time.perf_counter() - t0
+    n = len(bodies) * max(1, repeat)
+    return {
+        "records": len(records),
+        "read_sec": round(read_sec, 4),
+        "parse": {
+            "payloads": n,
+            "sec": round(parse_sec, 4),
+            "payloads_per_sec": round(n / parse_sec, 1) if parse_sec else None,
+            "mb_per_sec": round(total * max(1, repeat) / parse_sec / 1e6, 2) if parse_sec else None,
+            "errors": errors,
+        },
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("cmd", choices=["stats", "bench"])
+    ap.add_argument("dir")
+    ap.add_argument("--repeat", type=int, default=3, help="bench only")
+    args = ap.parse_args()
+
+    out = stats(args.dir) if args.cmd == "stats" else bench(args.dir, args.repeat)
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
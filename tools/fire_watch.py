@@ -0,0 +1,133 @@
+# tools/fire_watch.py
+# Fire (BCH) anomaly watch: BBO (+ optional book depth) off the market bus -> Fire gate for risk_scan.
+#   PYTHONPATH=. python tools/fire_watch.py --exchanges bybit,mexc --symbols BTCUSDT,ETHUSDT --interval 1
+#   ... --depth 20                 # also track top-20 book notional (one order book call per symbol)
+#   PYTHONPATH=. python tools/fire_watch.py --bench 5000 --seconds 5    # synthetic throughput, no network
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from utils.anomaly import FireDetector  # noqa: E402
+
+DEFAULT_STATE = os.environ.get("FIRE_STATE_PATH", str(REPO_ROOT / "out" / "fire_state.json"))
+
+
+def _book_notional(bids: Sequence[Tuple[float, float]], asks: Sequence[Tuple[float, float]], levels: int) -> float:
+    return sum(float(p) * float(q) for p, q in bids[:levels]) + sum(float(p) * float(q) for p, q in asks[:levels])
+
+
+def _write_state(path: Path, state: Dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def bench(n_symbols: int, seconds: float, rate_hz: float) -> None:
+    """n_symbols x rate_hz synthetic ticks through update_batch(), a few symbols ignite."""
+    det = FireDetector()
+    rng = random.Random(7)
+    names = [f"SYM{i}USDT" for i in range(n_symbols)]
+    idx = det.slots(names)
+    mids = [100.0 * (1 + rng.random()) for _ in names]
+    t0 = time.perf_counter()
+    ts = int(time.time() * 1000)
+    rounds = 0
+    lag = 0.0
+    while time.perf_counter() - t0 < seconds:
+        start = time.perf_counter()
+        ts += int(1000 / rate_hz)
+        for i in range(n_symbols):
+            mids[i] *= 1.0 + rng.gauss(0.0, 1e-4)
+        if rounds == 200:
+            for i in range(0, n_symbols, 997):
+                mids[i] *= 1.05
+        bid = [m * 0.9999 for m in mids]
+        ask = [m * 1.0001 for m in mids]
+        depth = [1e5] * n_symbols
+        det.update_batch(idx, bid, ask, depth=depth, ts_ms=ts)
+        rounds += 1
+        lag += time.perf_counter() - start
+    wall = time.perf_counter() - t0
+    updates = det.stats["updates"]
+    print(json.dumps({
+        "symbols": n_symbols,
+        "rounds": rounds,
+        "updates": updates,
+        "updates_per_sec": round(updates / wall),
+        "ms_per_round": round(lag / max(rounds, 1) * 1000, 3),
+        "max_symbol_hz": round(rounds / wall, 1),
+        "signals": det.stats["signals"],
+        "gate": {k: v for k, v in det.gate(ts).items() if k != "firing"},
+    }))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--exchanges", default=os.environ.get("UNIVBOT_EXCHANGES", "bybit"))
+    ap.add_argument("--symbols", default="BTCUSDT")
+    ap.add_argument("--interval", type=float, default=1.0)
+    ap.add_argument("--depth", type=int, default=0, help="book levels to sum for depth collapse (0 = off)")
+    ap.add_argument("--state", default=DEFAULT_STATE)
+    ap.add_argument("--bench", type=int, default=0, help="N synthetic symbols; no network")
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--rate", type=float, default=10.0, help="bench: updates per symbol per second")
+    args = ap.parse_args()
+
+    if args.bench > 0:
+        bench(args.bench, args.seconds, args.rate)
+        return
+
+    from adapters.factory import get_trading_adapter
+    from utils.market_bus import BusPoller, MarketBus
+
+    exchanges = [x.strip() for x in args.exchanges.split(",") if x.strip()]
+    symbols = [x.strip().upper() for x in args.symbols.split(",") if x.strip()]
+    bus = MarketBus()
+    quotes = bus.subscribe("quote", "fire")
+    books = bus.subscribe("book", "fire")
+    poller = BusPoller(bus, [get_trading_adapter(ex) for ex in exchanges], symbols, book_depth=args.depth)
+    det = FireDetector()
+    state_path = Path(args.state)
+    depth_by_key: Dict[str, float] = {}
+
+    while True:
+        errors = poller.poll_once()
+        for ev in books.poll(latest_only=True):
+            bids, asks = ev.data
+            depth_by_key[ev.key] = _book_notional(bids, asks, args.depth)
+        keys: List[str] = []
+        bid: List[float] = []
+        ask: List[float] = []
+        depth: List[float] = []
+        # one poll round = one batch; conflate so a symbol appears once per batch
+        for ev in quotes.poll(latest_only=True):
+            keys.append(ev.key)
+            bid.append(ev.data[0])
+            ask.append(ev.data[1])
+            depth.append(depth_by_key.get(ev.key, float("nan")))
+        sigs = det.update_batch(keys, bid, ask, depth=depth if args.depth > 0 else None) if keys else []
+        state = det.state()
+        state["errors"] = errors
+        _write_state(state_path, state)
+        for s in sigs:
+            print("[fire]", json.dumps(s.to_dict(), ensure_ascii=False))
+        if args.interval <= 0:
+            print("[fire]", json.dumps(state["gate"], ensure_ascii=False))
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# tools/md_publisher.py
+# Market-data publisher: one process polls the venues and fans quotes out over shared memory (utils/shm_ring.py).
+#   PYTHONPATH=. python tools/md_publisher.py --exchanges bybit,mexc --symbols BTCUSDT,ETHUSDT --interval 0.5
+#   worker side:  r = ShmQuoteReader(); r.best_bid_ask("bybit", "BTCUSDT")  /  r.poll()
+#   PYTHONPATH=. python tools/md_publisher.py --bench 200000 --readers 4    # no network
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from utils.shm_ring import DEFAULT_NAME, ShmQuoteReader, ShmQuoteWriter  # noqa: E402
+
+
+def _bench_reader(name: str, n_total: int, out: "mp.Queue") -> None:
+    r = ShmQuoteReader(name, from_start=True, untrack=False)     # child: shares the publisher's tracker
+    got = 0
+    last = 0
+    ordered = True
+    t0 = time.perf_counter()
+    while last < n_total and time.perf_counter() - t0 < 30:
+        for q in r.poll():
+            if q.seq <= last:
+                ordered = False
+            last = q.seq
+            got += 1
+    out.put({"pid": os.getpid(), "read": got, "ordered": ordered, **r.stats, "sec": round(time.perf_counter() - t0, 3)})
+    r.close()
+
+
+def bench(name: str, n: int, readers: int, capacity: int) -> None:
+    w = ShmQuoteWriter(name, capacity=capacity, max_symbols=1024)
+    keys = [f"bench:SYM{i}USDT" for i in range(500)]
+    for k in keys:
+        w.symbol_id(k)
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_bench_reader, args=(w.name, n, out)) for _ in range(readers)]
+    for p in procs:
+        p.start()
+    time.sleep(1.0)                 # let the readers attach
+    t0 = time.perf_counter()
+    for i in range(n):
+        w.write(keys[i % len(keys)], 100.0 + i * 1e-6, 100.01 + i * 1e-6)
+    wall = time.perf_counter() - t0
+    results = [out.get(timeout=60) for _ in procs]
+    for p in procs:
+        p.join()
+    print(json.dumps({"writes": n, "writes_per_sec": round(n / wall), "capacity": capacity, "readers": results}))
+    w.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--exchanges", default=os.environ.get("UNIVBOT_EXCHANGES", "bybit"))
+    ap.add_argument("--symbols", default="BTCUSDT")
+    ap.add_argument("--interval", type=float, default=1.0)
+    ap.add_argument("--name", default=DEFAULT_NAME, help="shared memory segment name (UNIVBOT_SHM_NAME)")
+    ap.add_argument("--capacity", type=int, default=65_536)
+    ap.add_argument("--max-symbols", type=int, default=4096)
+    ap.add_argument("--bench", type=int, default=0, help="N synthetic quotes; no network")
+    ap.add_argument("--readers", type=int, default=4)
+    args = ap.parse_args()
+
+    if args.bench > 0:
+        bench(args.name, args.bench, args.readers, args.capacity)
+        return
+
+    from adapters.base import AdapterError
+    from adapters.factory import get_trading_adapter
+    from utils.market_bus import BusPoller, MarketBus
+
+    exchanges = [x.strip() for x in args.exchanges.split(",") if x.strip()]
+    symbols = [x.strip().upper() for x in args.symbols.split(",") if x.strip()]
+    bus = MarketBus()
+    sub = bus.subscribe("quote", "shm")
+    poller = BusPoller(bus, [get_trading_adapter(ex) for ex in exchanges], symbols, interval_sec=args.interval)
+    try:
+        w = ShmQuoteWriter(args.name, capacity=args.capacity, max_symbols=args.max_symbols)
+    except AdapterError as e:
+        raise SystemExit(f"[md] {e}")       # another publisher owns the segment
+    print(f"[md] publishing {len(exchanges)}x{len(symbols)} quotes to shm:{w.name}")
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))     # run the finally: unlink the segment
+    poller.start()
+    last_errors: Dict[str, str] = {}
+    try:
+        while True:
+            for ev in sub.poll(timeout=args.interval):
+                bid, ask = ev.data
+                w.write(ev.key, bid, ask, ts_ms=ev.ts_ms)
+            w.heartbeat()
+            if poller.errors and poller.errors != last_errors:
+                print("[md] errors:", poller.errors)
+            last_errors = poller.errors
+    except KeyboardInterrupt:
+        pass
+    finally:
+        poller.stop()
+        w.close()
+
+
+if __name__ == "__main__":
+    main()
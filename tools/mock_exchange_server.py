@@ -0,0 +1,453 @@
+# tools/mock_exchange_server.py
+"""
+Local stand-in for the Bybit v5 / MEXC v3 REST endpoints the adapters use.
+
+- public: server time, order book, instruments-info, kline (synthetic data,
+  start / end / interval honoured)
+- private: order create / cancel / create-batch / cancel-batch / cancel-all /
+  realtime (live orders only) / history, wallet-balance, MEXC openOrders (GET / DELETE); HMAC signature + recv_window are checked exactly like the venue
+  (retCode 10004 / 10002 on Bybit, 700002 / 700003 on MEXC)
+- orders live in memory; nothing is matched (MockExchange.fill() simulates one)
+- --check runs drills against the adapters (exit 1 on failure)
+
+Point an adapter at it with BYBIT_BASE_URL / MEXC_BASE_URL and
+BYBIT_API_KEY=mock BYBIT_API_SECRET=mock (same for MEXC_*).
+
+Usage:
+  python tools/mock_exchange_server.py --port 18080 [--latency-ms 2]
+  PYTHONPATH=. python tools/mock_exchange_server.py --check
+"""
+from __future__ import annotations
+
+import argparse
+import hmac
+import json
+import sys
+import threading
+import time
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+MOCK_KEY = "mock"
+MOCK_SECRET = "mock"
+
+JsonDict = Dict[str, Any]
+
+
+class MockExchange:
+    """In-memory venue state (thread-safe)."""
+
+    def __init__(self, *, api_key: str = MOCK_KEY, api_secret: str = MOCK_SECRET, mid: float = 50000.0) -> None:
+        self.api_key = api_key
+        self._secret = api_secret.encode("utf-8")
+        self.mid = mid
+        self.lock = threading.Lock()
+        self.orders: Dict[str, JsonDict] = {}        # orderId -> order
+        self._seq = 0
+        self.stats: Dict[str, int] = {"requests": 0, "signed_ok": 0, "signed_bad": 0}
+
+    def sign(self, payload: str) -> str:
+        return hmac.new(self._secret, payload.encode("utf-8"), sha256).hexdigest()
+
+    def next_order_id(self) -> str:
+        with self.lock:
+            self._seq += 1
+            return f"mock-{self._seq:08d}"
+
+    # -------------------------
+    # Bybit order book (in memory, unmatched)
+    # -------------------------
+    def new_order(self, body: JsonDict) -> Tuple[int, str, JsonDict]:
+        sym = str(body.get("symbol") or "")
+        # Bybit v5 enums are case sensitive
+        if not sym or body.get("side") not in ("Buy", "Sell"):
+            return 10001, "params error: symbol/side", {}
+        if body.get("orderType") not in ("Limit", "Market"):
+            return 10001, "params error: orderType", {}
+        link = str(body.get("orderLinkId") or "")
+        with self.lock:
+            if link and any(o["orderLinkId"] == link for o in self.orders.values()):
+                return 110072, "OrderLinkedID is duplicate", {}
+        oid = self.next_order_id()
+        order = {
+            "orderId": oid,
+            "orderLinkId": link,
+            "category": body.get("category", "linear"),
+            "symbol": sym,
+            "side": body["side"],
+            "orderType": body["orderType"],
+            "qty": str(body.get("qty", "0")),
+            "price": str(body.get("price", "0")),
+            "cumExecQty": "0",
+            "avgPrice": "",
+            "orderStatus": "New",
+            "reduceOnly": bool(body.get("reduceOnly", False)),
+            "createdTime": str(int(time.time() * 1000)),
+        }
+        with self.lock:
+            self.orders[oid] = order
+        return 0, "OK", {"orderId": oid, "orderLinkId": link}
+
+    def find(self, body: JsonDict) -> Optional[JsonDict]:
+        oid = body.get("orderId")
+        link = body.get("orderLinkId")
+        with self.lock:
+            if oid:
+                return self.orders.get(str(oid))
+            if link:
+                for o in self.orders.values():
+                    if o["orderLinkId"] == link:
+                        return o
+        return None
+
+    def cancel(self, body: JsonDict) -> Tuple[int, str, JsonDict]:
+        o = self.find(body)
+        with self.lock:
+            if o is None or o["orderStatus"] not in ("New", "PartiallyFilled"):
+                return 110001, "order not exists or too late to cancel", {}
+            o["orderStatus"] = "Cancelled"
+        return 0, "OK", {"orderId": o["orderId"], "orderLinkId": o["orderLinkId"]}
+
+    def cancel_all(self, symbol: Optional[str] = None) -> List[JsonDict]:
+        with self.lock:
+            done = []
+            for o in self.orders.values():
+                if o["orderStatus"] in ("New", "PartiallyFilled") and (not symbol or o["symbol"] == symbol):
+                    o["orderStatus"] = "Cancelled"
+                    done.append(o)
+            return [{"orderId": o["orderId"], "orderLinkId": o["orderLinkId"], "symbol": o["symbol"]} for o in done]
+
+    def seed(self, symbol: str, n: int, *, side: str = "Buy") -> List[str]:
+        """Rest `n` limit orders directly (bench / kill-switch drills)."""
+        ids = []
+        for i in range(n):
+            _, _, res = self.new_order({"symbol": symbol, "side": side, "orderType": "Limit", "qty": "0.001", "price": str(self.mid * 0.9 - i)})
+            ids.append(res["orderId"])
+        return ids
+
+    def fill(self, order_id: str) -> Optional[JsonDict]:
+        """Fill a resting order completely (drills: the order leaves realtime, stays in history)."""
+        with self.lock:
+            o = self.orders.get(order_id)
+            if o is None or o["orderStatus"] not in ("New", "PartiallyFilled"):
+                return None
+            o.update(orderStatus="Filled", cumExecQty=o["qty"], avgPrice=o["price"])
+            return dict(o)
+
+    def open_orders(self, symbol: Optional[str] = None) -> List[JsonDict]:
+        with self.lock:
+            return [
+                dict(o)
+                for o in self.orders.values()
+                if o["orderStatus"] in ("New", "PartiallyFilled") and (not symbol or o["symbol"] == symbol)
+            ]
+
+
+def _book(mid: float, depth: int) -> Tuple[List[List[str]], List[List[str]]]:
+    tick = max(mid * 1e-5, 1e-8)
+    bids = [[f"{mid - tick * (i + 1):.8g}", f"{1.0 + i * 0.5:.4f}"] for i in range(depth)]
+    asks = [[f"{mid + tick * (i + 1):.8g}", f"{1.0 + i * 0.5:.4f}"] for i in range(depth)]
+    return bids, asks
+
+
+_KLINE_STEP_MS = {
+    "1": 60_000, "3": 180_000, "5": 300_000, "15": 900_000, "30": 1_800_000, "60": 3_600_000,
+    "120": 7_200_000, "240": 14_400_000, "360": 21_600_000, "720": 43_200_000, "D": 86_400_000, "W": 604_800_000,
+    "1m": 60_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000, "60m": 3_600_000, "4h": 14_400_000,
+    "1d": 86_400_000, "1W": 604_800_000,
+}
+
+
+def _klines(mid: float, step_ms: int, start_ms: Optional[int], end_ms: Optional[int], limit: int) -> List[List[str]]:
+    """Synthetic candles, newest first; with start/end: the newest `limit` inside [start, end]."""
+    now = int(time.time() * 1000)
+    end = min(end_ms if end_ms is not None else now, now)
+    last = end - end % step_ms
+    first = last - (limit - 1) * step_ms
+    if start_ms is not None:
+        first = max(first, start_ms + (-start_ms) % step_ms)
+    rows = []
+    for t in range(last, first - 1, -step_ms):
+        c = mid * (1.0 + 0.01 * ((t // step_ms) % 17 - 8) / 8.0)
+        rows.append([str(t), f"{c * 0.999:.2f}", f"{c * 1.002:.2f}", f"{c * 0.997:.2f}", f"{c:.2f}", "1.5", "1"])
+    return rows
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True     # headers + body are separate writes
+    server_version = "MockExchange/1.0"
+    ex: MockExchange
+    latency_sec: float = 0.0
+
+    def log_message(self, fmt: str, *args: Any) -> None:   # quiet
+        return
+
+    # -------------------------
+    # plumbing
+    # -------------------------
+    def _reply(self, status: int, obj: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _bybit(self, ret_code: int, msg: str, result: Any) -> None:
+        now = int(time.time() * 1000)
+        self._reply(
+            200,
+            {"retCode": ret_code, "retMsg": msg, "result": result, "retExtInfo": {}, "time": now},
+            {"X-Bapi-Limit-Status": "99", "X-Bapi-Limit": "100", "X-Bapi-Limit-Reset-Timestamp": str(now + 1000)},
+        )
+
+    def _body(self) -> str:
+        n = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(n).decode("utf-8") if n else ""
+
+    def do_GET(self) -> None:
+        self._dispatch("GET", "")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST", self._body())
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE", self._body())
+
+    def _dispatch(self, method: str, body: str) -> None:
+        if self.latency_sec > 0:
+            time.sleep(self.latency_sec)
+        self.ex.stats["requests"] += 1
+        u = urlsplit(self.path)
+        try:
+            if u.path.startswith("/v5/"):
+                self._route_bybit(method, u.path, u.query, body)
+            elif u.path.startswith("/api/v3/"):
+                self._route_mexc(method, u.path, u.query)
+            else:
+                self._reply(404, {"error": "not found", "path": u.path})
+        except Exception as e:   # keep the server alive; report like a venue 500
+            self._reply(500, {"error": repr(e)})
+
+    # -------------------------
+    # Bybit v5
+    # -------------------------
+    def _bybit_auth(self, payload: str) -> Optional[Tuple[int, str]]:
+        key = self.headers.get("X-BAPI-API-KEY") or ""
+        ts = self.headers.get("X-BAPI-TIMESTAMP") or ""
+        rw = self.headers.get("X-BAPI-RECV-WINDOW") or "5000"
+        sig = self.headers.get("X-BAPI-SIGN") or ""
+        if key != self.ex.api_key:
+            return 10003, "API key is invalid."
+        if not ts.isdigit():
+            return 10002, "invalid timestamp"
+        now = int(time.time() * 1000)
+        if not (int(ts) - 1000 <= now <= int(ts) + int(rw)):
+            return 10002, f"invalid request, please check your server timestamp or recv_window param. req_timestamp[{ts}],server_timestamp[{now}],recv_window[{rw}]"
+        if not hmac.compare_digest(self.ex.sign(ts + key + rw + payload), sig):
+            return 10004, "error sign! origin_string[" + ts + key + rw + payload + "]"
+        return None
+
+    def _route_bybit(self, method: str, path: str, query: str, body: str) -> None:
+        q = dict(parse_qsl(query))
+        if path == "/v5/market/time":
+            now_ns = time.time_ns()
+            return self._bybit(0, "OK", {"timeSecond": str(now_ns // 10**9), "timeNano": str(now_ns)})
+        if path == "/v5/market/orderbook":
+            bids, asks = _book(self.ex.mid, max(1, min(200, int(q.get("limit") or 1))))
+            return self._bybit(0, "OK", {"s": q.get("symbol", ""), "b": bids, "a": asks, "ts": int(time.time() * 1000)})
+        if path == "/v5/market/instruments-info":
+            return self._bybit(0, "OK", {"category": q.get("category", "linear"), "list": [{
+                "symbol": q.get("symbol", "BTCUSDT"),
+                "priceFilter": {"tickSize": "0.1"},
+                "lotSizeFilter": {"qtyStep": "0.001", "minOrderQty": "0.001"},
+            }]})
+        if path == "/v5/market/kline":
+            n = max(1, min(1000, int(q.get("limit") or 200)))
+            step = _KLINE_STEP_MS.get(q.get("interval", "D"), 86_400_000)
+            start, end = q.get("start"), q.get("end")
+            rows = _klines(self.ex.mid, step, int(start) if start else None, int(end) if end else None, n)
+            return self._bybit(0, "OK", {"symbol": q.get("symbol", ""), "list": rows})
+
+        # --- private ---
+        payload = query if method == "GET" else body
+        err = self._bybit_auth(payload)
+        if err is not None:
+            self.ex.stats["signed_bad"] += 1
+            return self._bybit(err[0], err[1], {})
+        self.ex.stats["signed_ok"] += 1
+        data: JsonDict = q if method == "GET" else (json.loads(body) if body else {})
+
+        if path == "/v5/order/create" and method == "POST":
+            rc, msg, res = self.ex.new_order(data)
+            return self._bybit(rc, msg, res)
+        if path == "/v5/order/cancel" and method == "POST":
+            rc, msg, res = self.ex.cancel(data)
+            return self._bybit(rc, msg, res)
+        if path in ("/v5/order/create-batch", "/v5/order/cancel-batch") and method == "POST":
+            reqs = data.get("request") or []
+            limit = 10 if data.get("category") == "spot" else 20
+            if len(reqs) > limit:
+                return self._bybit(10001, f"batch size exceeds {limit}", {})
+            fn = self.ex.new_order if path.endswith("create-batch") else self.ex.cancel
+            rows, infos = [], []
+            for it in reqs:
+                rc, msg, res = fn(it)
+                rows.append({"category": data.get("category", "linear"), "symbol": it.get("symbol", ""), **res})
+                infos.append({"code": rc, "msg": msg})
+            return self._reply(200, {
+                "retCode": 0, "retMsg": "OK", "result": {"list": rows},
+                "retExtInfo": {"list": infos}, "time": int(time.time() * 1000),
+            })
+        if path == "/v5/order/cancel-all" and method == "POST":
+            rows = self.ex.cancel_all(data.get("symbol"))
+            return self._bybit(0, "OK", {"list": rows, "success": "1"})
+        if path in ("/v5/order/realtime", "/v5/order/history") and method == "GET":
+            # realtime (openOnly=0): live orders only; history: any status
+            live_only = path.endswith("realtime")
+            if data.get("orderId") or data.get("orderLinkId"):
+                o = self.ex.find(data)
+                ok = o is not None and (not live_only or o["orderStatus"] in ("New", "PartiallyFilled"))
+                rows = [dict(o)] if ok else []       # type: ignore[arg-type]
+            elif live_only:
+                rows = self.ex.open_orders(data.get("symbol"))
+            else:
+                with self.ex.lock:
+                    rows = [dict(o) for o in self.ex.orders.values() if not data.get("symbol") or o["symbol"] == data.get("symbol")]
+            return self._bybit(0, "OK", {"list": rows, "nextPageCursor": ""})
+        if path == "/v5/account/wallet-balance" and method == "GET":
+            return self._bybit(0, "OK", {"list": [{"accountType": data.get("accountType", "UNIFIED"), "coin": [
+                {"coin": "USDT", "walletBalance": "10000", "locked": "0"},
+            ]}]})
+        return self._bybit(10001, f"mock: unsupported {method} {path}", {})
+
+    # -------------------------
+    # MEXC v3
+    # -------------------------
+    def _route_mexc(self, method: str, path: str, query: str) -> None:
+        q = dict(parse_qsl(query))
+        if path == "/api/v3/time":
+            return self._reply(200, {"serverTime": int(time.time() * 1000)})
+        if path == "/api/v3/ping":
+            return self._reply(200, {})
+        if path == "/api/v3/depth":
+            bids, asks = _book(self.ex.mid, max(1, min(5000, int(q.get("limit") or 100))))
+            return self._reply(200, {"lastUpdateId": 1, "bids": bids, "asks": asks})
+        if path == "/api/v3/klines":
+            n = max(1, min(1000, int(q.get("limit") or 500)))
+            step = _KLINE_STEP_MS.get(q.get("interval", "1d"), 86_400_000)
+            start, end = q.get("startTime"), q.get("endTime")
+            rows = _klines(self.ex.mid, step, int(start) if start else None, int(end) if end else None, n)
+            # ascending; [openTime, o, h, l, c, v, closeTime, quoteVolume]
+            return self._reply(200, [[int(r[0]), *r[1:6], int(r[0]) + step - 1, r[6]] for r in reversed(rows)])
+
+        # --- private: signature over the query string without &signature= ---
+        if self.headers.get("X-MEXC-APIKEY") != self.ex.api_key:
+            return self._reply(400, {"code": 700001, "msg": "API-key format invalid."})
+        unsigned, _, sig = query.rpartition("&signature=")
+        ts = int(q.get("timestamp") or 0)
+        rw = int(q.get("recvWindow") or 5000)
+        now = int(time.time() * 1000)
+        if not (ts - 1000 <= now <= ts + rw):
+            return self._reply(400, {"code": 700003, "msg": "Timestamp for this request is outside of the recvWindow."})
+        if not hmac.compare_digest(self.ex.sign(unsigned), sig):
+            self.ex.stats["signed_bad"] += 1
+            return self._reply(400, {"code": 700002, "msg": "Signature for this request is not valid."})
+        self.ex.stats["signed_ok"] += 1
+        if path == "/api/v3/openOrders" and method == "DELETE":
+            rows = self.ex.cancel_all(q.get("symbol"))
+            return self._reply(200, [{"symbol": r["symbol"], "orderId": r["orderId"], "clientOrderId": r["orderLinkId"], "status": "CANCELED"} for r in rows])
+        if path == "/api/v3/openOrders" and method == "GET":
+            return self._reply(200, [
+                {"symbol": o["symbol"], "orderId": o["orderId"], "clientOrderId": o["orderLinkId"], "side": o["side"].upper(),
+                 "type": "LIMIT", "origQty": o["qty"], "executedQty": "0", "price": o["price"], "status": "NEW"}
+                for o in self.ex.open_orders(q.get("symbol"))
+            ])
+        if path == "/api/v3/account" and method == "GET":
+            return self._reply(200, {"balances": [{"asset": "USDT", "free": "10000", "locked": "0"}]})
+        return self._reply(400, {"code": 700007, "msg": f"mock: unsupported {method} {path}"})
+
+
+def serve(
+    port: int = 0,
+    *,
+    host: str = "127.0.0.1",
+    latency_ms: float = 0.0,
+    exchange: Optional[MockExchange] = None,
+) -> Tuple[ThreadingHTTPServer, MockExchange]:
+    """Start in a daemon thread; returns (server, state). base url: http://host:server.server_port"""
+    ex = exchange or MockExchange()
+    handler = type("BoundHandler", (Handler,), {"ex": ex, "latency_sec": latency_ms / 1000.0})
+    srv = ThreadingHTTPServer((host, port), handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, name="mock-exchange", daemon=True).start()
+    return srv, ex
+
+
+# -------------------------
+# Drills (--check)
+# -------------------------
+def check_reconcile_fill() -> JsonDict:
+    """An order filled between two reconciles must end `filled`, never `expired`."""
+    import os
+
+    from adapters.base import OrderRequest
+    from adapters.factory import get_trading_adapter
+    from utils.order_store import OrderStore
+
+    srv, ex = serve(0)
+    os.environ.update({
+        "BYBIT_BASE_URL": f"http://127.0.0.1:{srv.server_port}", "BYBIT_API_KEY": MOCK_KEY, "BYBIT_API_SECRET": MOCK_SECRET,
+        "UNIVBOT_ENDPOINT_PROBE_SEC": "0",
+    })
+    try:
+        a = get_trading_adapter("bybit", profile="live")
+        store = OrderStore(a.name)
+        req = OrderRequest("BTC/USDT", "buy", "limit", 0.001, price=45000.0, client_order_id="check-fill-1")
+        res = a.place_orders([req])[0]
+        store.apply_result(req, res)
+        store.reconcile(a, ["BTCUSDT"])
+        ex.fill(str(res.order_id))
+        rep = store.reconcile(a, ["BTCUSDT"])
+        st = store.get(str(res.order_id))
+        status = st.status if st is not None else None
+        return {"check": "reconcile_fill", "ok": status == "filled", "status": status, "reconcile": rep}
+    finally:
+        srv.shutdown()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=18080)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="added per request (simulated RTT)")
+    ap.add_argument("--check", action="store_true", help="run the adapter drills against an in-process mock and exit")
+    args = ap.parse_args()
+
+    if args.check:
+        results = [check_reconcile_fill()]
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0 if all(r["ok"] for r in results) else 1
+
+    srv, _ = serve(args.port, host=args.host, latency_ms=args.latency_ms)
+    print(f"[mock] listening on http://{args.host}:{srv.server_port} (key={MOCK_KEY} secret={MOCK_SECRET})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,12 +5,12 @@ import argparse
 import json
 import os
 import sys
-import time
 import statistics as st
 from pathlib import Path
-from typing import Any, Dict, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
 import requests
 from adapters.base import TradingAdapter 
+from adapters.clock import get_clock
 
 # =========================
 # Paths (repo / runtime)
@@ -55,39 +55,148 @@ SIZE_NORMAL  = _env_float("RISK_SIZE_NORMAL", 1.0)
 SIZE_CAUTION = _env_float("RISK_SIZE_CAUTION", 0.5)
 SIZE_PANIC   = _env_float("RISK_SIZE_PANIC", 0.0)
 
+LIQ_NOTIONAL  = _env_float("RISK_LIQ_NOTIONAL", 10_000.0)  # この金額(quote)を一撃で約定させるコストで THIN を判定
+LIQ_THIN_BPS  = _env_float("RISK_LIQ_THIN_BPS", 10.0)      # mid 比スリッページ(bps)がこれを超えたら THIN
+LIQ_DEPTH     = int(_env_float("RISK_LIQ_DEPTH", 200))     # 取得する板の段数
+LIQ_SYMBOLS   = ["BTCUSDT"]
+INPUT_REFRESH_SEC = _env_float("RISK_INPUT_REFRESH_SEC", 30.0)  # --watch 中に板(流動性)と breadth を取り直す間隔
+
 
 # =========================
 # Helpers
 # =========================
+def _now_ms() -> int:
+    """プロセス時計（live は壁時計、UNIVBOT_REPLAY_DIR 再生中は記録時刻）。"""
+    return get_clock().time_ms()
+
+
+
+BB_WINDOW = int(_env_float("RISK_BB_WINDOW", 20))     # 日足 BB の本数
+RV_WINDOW = int(_env_float("RISK_RV_WINDOW", 30))     # realized vol の本数
+
+# BTC 日足レジーム統計（プロセス内で 1 回だけ seed し、以降は mid を流すだけ）
+_BTC_STATS: Optional[Any] = None
+
+
+def btc_regime_stats(adapter: TradingAdapter) -> Any:
+    """utils.regime_stats.RegimeStats seeded from one get_daily_closes() call."""
+    global _BTC_STATS
+    if _BTC_STATS is not None:
+        return _BTC_STATS
+    from utils.regime_stats import RegimeStats
+
+    stats = RegimeStats(bb_window=BB_WINDOW, rv_window=RV_WINDOW)
+    try:
+        closes = adapter.get_daily_closes("BTCUSDT", n=max(BB_WINDOW, RV_WINDOW) + 1)
+    except Exception:
+        closes = []
+    # 最後の 1 本は当日の未確定足 -> live mid で置き換える
+    stats.seed_closes(closes[:-1], bar_t=_now_ms())
+    if closes:
+        _BTC_STATS = stats          # 取得失敗時は次回また seed を試す
+    return stats
 
 
 def btc_metrics(adapter: TradingAdapter) -> Tuple[float, float]:
+    """
+    (abs_ret, bb_width_pct) from the streaming stats:
+    abs_ret = |mid - 前日終値| / 前日終値 (ratio), bb_width_pct = 日足 Bollinger 幅 (%).
+    """
     bid, ask = adapter.get_best_bid_ask("BTCUSDT")
 
     mid = (bid + ask) / 2.0
     if mid <= 0:
         raise RuntimeError(f"bad mid computed: bid={bid}, ask={ask}")
 
-    bb_width_pct = (ask - bid) / mid * 100.0
+    stats = btc_regime_stats(adapter)
+    stats.on_price(_now_ms(), mid)
+    snap = stats.snapshot()
+    return snap.abs_ret, snap.bb_width_pct
 
-    # --- daily close return (restore abs_ret) ---
-        # --- daily close return (abs_ret) ---
-    abs_ret = 0.0
-    try:
-        closes = adapter.get_daily_closes("BTCUSDT", n=2)
-        if len(closes) >= 2:
-            prev_close = closes[-2]
-            abs_ret = abs(mid - prev_close) / prev_close * 100.0
 
-            try:
-                    closes = adapter.get_daily_closes("BTCUSDT", n=2)
-            except Exception as e:
-                    abs_ret = 0.0
+def classify_market(abs_ret: float, bb_width_pct: float, breadth_ratio: float) -> Tuple[str, float]:
+    if (abs_ret >= PANIC_RET) or (bb_width_pct >= PANIC_BB) or (breadth_ratio >= PANIC_BREADTH):
+        return "panic", SIZE_PANIC
+    if (abs_ret >= CAUTION_RET) or (bb_width_pct >= CAUTION_BB) or (breadth_ratio >= CAUTION_BREADTH):
+        return "caution", SIZE_CAUTION
+    return "normal", SIZE_NORMAL
 
-    except Exception:
-        abs_ret = 0.0 
 
-    return abs_ret, bb_width_pct
+def refresh_inputs(adapter: TradingAdapter, venue: str) -> Dict[str, Any]:
+    """流動性ゲートと breadth を取り直す（起動時と --watch 中の定期更新で共通）。"""
+    n_os, tot = breadth_oversold()
+    liquidity, liq_gate = scan_liquidity(adapter, venue, LIQ_SYMBOLS)
+    return {
+        "breadth_oversold": n_os,
+        "breadth_total": tot,
+        "breadth_ratio": round((n_os / tot) if tot else 0.0, 4),
+        "liquidity": liquidity,
+        "liquidity_gate": liq_gate,
+    }
+
+
+def watch_regime(
+    adapter: TradingAdapter,
+    venue: str,
+    rs: Dict[str, Any],
+    out_path: Path,
+    *,
+    interval_sec: float,
+    mountain: Any,
+    files: Dict[str, Any],
+) -> None:
+    """
+    Tick BTC every interval_sec and feed Mountain (state files are re-read only
+    when they change); liquidity and breadth are re-measured every
+    INPUT_REFRESH_SEC, so a startup THIN book cannot block forever and a later
+    collapse is seen. risk_state.json is rewritten when market or exec_gate
+    changes, or when the inputs were re-measured.
+    """
+    clock = get_clock()      # 再生中は記録時刻で刻む（asap なら sleep は待たずに時計を進める）
+    next_refresh = clock.monotonic() + INPUT_REFRESH_SEC
+    while True:
+        clock.sleep(interval_sec)
+        values: Dict[str, Any] = {}
+        try:
+            abs_ret, bb_width_pct = btc_metrics(adapter)
+            values["btc"] = (abs_ret, bb_width_pct)
+            rs.update({
+                "btc_abs_daily_ret_pct": round(abs_ret, 6),
+                "btc_bb_width_pct": bb_width_pct,
+            })
+        except Exception as e:
+            print("[risk] tick failed:", repr(e)[:200])
+
+        refreshed = clock.monotonic() >= next_refresh
+        if refreshed:
+            next_refresh = clock.monotonic() + INPUT_REFRESH_SEC
+            inputs = refresh_inputs(adapter, venue)
+            values["breadth"] = inputs["breadth_ratio"]
+            values["liquidity_gate"] = inputs["liquidity_gate"]
+            rs.update(inputs)
+        if not values:
+            continue
+
+        decisions = feed_mountain(mountain, files, **values)
+        changed = {d.name for d in decisions}
+        if not refreshed and not changed & {"market", "exec_gate"}:
+            continue
+        market, size_mult = mountain.value("market")
+        rs.update({
+            "ts": _now_ms(),
+            "btc_stats": btc_regime_stats(adapter).snapshot().to_dict(),
+            "market": market,
+            "size_mult": size_mult,
+            "exec_gate": mountain.value("exec_gate"),
+            "fire_gate": mountain.value("fire_gate"),
+            "guard_gate": mountain.value("guard_gate"),
+            "smoke": files["smoke"].value,
+            "mountain": mountain.audit(),
+        })
+        out_path.write_text(json.dumps(rs, ensure_ascii=False, indent=2), encoding="utf-8")
+        write_exec_gate(out_path.parent, rs)
+        if decisions:
+            print("[risk] mountain ->", [d.to_dict() for d in decisions])
 
 
 def _safe_load_json(path: Path, encoding: str = "utf-8") -> Optional[Dict[str, Any]]:
@@ -158,7 +267,11 @@ def load_order_smoke_state() -> Optional[Dict[str, Any]]:
     return d if isinstance(d, dict) else None
 
 
-def classify_smoke_gate(smoke: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+def classify_smoke_gate(smoke: Optional[Dict[str, Any]], now_ms: Optional[int] = None) -> Dict[str, Any]:
+    """
+    now_ms: clock to judge the TTL with (e.g. adapter.now_server_ms() when the
+    smoke state was stamped with server time); default is the local clock.
+    """
     # ★ここ重要：Optionalを確実に潰す
     if smoke is None:
         return {
@@ -170,7 +283,8 @@ def classify_smoke_gate(smoke: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     
     # ---- TTL: smoke freshness gate ----
     ttl_sec = int(os.environ.get("RISK_SMOKE_TTL_SEC", "300"))  # default 5min
-    now_ms = int(time.time() * 1000)
+    if now_ms is None:
+        now_ms = _now_ms()
     ts = smoke.get("ts") if isinstance(smoke, dict) else 0
     ts_ms = int(ts) if isinstance(ts, (int, float, str)) and str(ts).strip() != "" else 0
 
@@ -251,6 +365,148 @@ def classify_smoke_gate(smoke: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     }
 
 
+# =========================
+# Liquidity gate (depth walk)
+# =========================
+def scan_liquidity(adapter: TradingAdapter, venue: str, symbols: List[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Fetch depth for each symbol and measure THIN by slippage at LIQ_NOTIONAL.
+    Fetch errors are left out of the batch (the gate STOPs when nothing is measured).
+    """
+    from utils.liquidity import DEFAULT_NOTIONALS, estimate_many, liquidity_gate
+
+    books: Dict[Tuple[str, str], Any] = {}
+    for sym in symbols:
+        try:
+            books[(venue, sym)] = adapter.get_order_book(sym, limit=LIQ_DEPTH)
+        except Exception:
+            continue
+
+    notionals = sorted(set(DEFAULT_NOTIONALS) | {LIQ_NOTIONAL})
+    estimates = estimate_many(books, notionals=notionals)
+    gate = liquidity_gate(estimates, notional=LIQ_NOTIONAL, max_slippage_bps=LIQ_THIN_BPS)
+    detail = {f"{v}:{s}": est.to_dict() for (v, s), est in estimates.items()}
+    return detail, gate
+
+
+# =========================
+# Fire gate (anomaly ignition, tools/fire_watch.py)
+# =========================
+FIRE_STATE_PATH = Path(os.environ.get("FIRE_STATE_PATH", str(REPO_ROOT / "out" / "fire_state.json")))
+
+
+def load_fire_state() -> Optional[Dict[str, Any]]:
+    d = _safe_load_json(FIRE_STATE_PATH, encoding="utf-8")
+    return d if isinstance(d, dict) else None
+
+
+def classify_fire_gate(fire: Optional[Dict[str, Any]], now_ms: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Fire は補助シグナル：未稼働 / 古い state では止めない（smoke / liquidity が本線）。
+    PROCEED でも "firing" の銘柄は新規エントリー不可。
+    """
+    ttl_sec = int(os.environ.get("RISK_FIRE_TTL_SEC", "120"))
+    if now_ms is None:
+        now_ms = _now_ms()
+    gate = (fire or {}).get("gate")
+    ts = (fire or {}).get("ts") or 0
+    if not isinstance(gate, dict):
+        return {"action": "PROCEED", "allow_orders": True, "reason": "fire_off", "retry_after_sec": 0, "firing": []}
+    if not isinstance(ts, (int, float)) or (now_ms - int(ts)) > ttl_sec * 1000:
+        return {"action": "PROCEED", "allow_orders": True, "reason": f"fire_stale(ttl={ttl_sec}s)", "retry_after_sec": 0, "firing": []}
+    return {
+        "action": str(gate.get("action") or "PROCEED"),
+        "allow_orders": bool(gate.get("allow_orders", True)),
+        "reason": str(gate.get("reason") or ""),
+        "retry_after_sec": int(gate.get("retry_after_sec") or 0),
+        "firing": list(gate.get("firing") or []),
+    }
+
+
+# =========================
+# Guard latch (tools/kill_switch.py / guard_smoke_test.py が書く)
+# =========================
+GUARD_STATE_PATH = Path(os.environ.get("GUARD_STATE_PATH", "out/guard_state.json"))
+
+
+def classify_guard_gate(guard: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # latch ファイルが無い = 一時停止していない
+    if isinstance(guard, dict) and guard.get("paused"):
+        return {
+            "action": "STOP",
+            "allow_orders": False,
+            "reason": f"guard_paused:{str(guard.get('pause_reason') or '')[:120]}",
+            "retry_after_sec": 0,
+        }
+    return {"action": "PROCEED", "allow_orders": True, "reason": "guard_clear", "retry_after_sec": 0}
+
+
+def combine_exec_gates(*gates: Dict[str, Any]) -> Dict[str, Any]:
+    """最初に発注不可を返したゲートが exec_gate（順序 = 優先度）。"""
+    for g in gates:
+        if not g.get("allow_orders"):
+            return g
+    return gates[0]
+
+
+# =========================
+# Mountain (utils/supervisor.py): 入力が変わった判定だけ再計算
+# =========================
+CLOCK_SEC = max(_env_float("RISK_CLOCK_SEC", 1.0), 0.001)   # TTL 判定用の時計の刻み
+
+
+def _clock_ms(now_ms: Optional[int] = None) -> int:
+    step = int(CLOCK_SEC * 1000)
+    now = _now_ms() if now_ms is None else int(now_ms)
+    return now - now % step
+
+
+def build_mountain() -> Tuple[Any, Dict[str, Any]]:
+    """
+    sources: btc (abs_ret, bb_width_pct) / breadth / smoke / fire / guard / liquidity_gate / clock
+    derived: market, smoke_gate, fire_gate, guard_gate -> exec_gate
+    """
+    from utils.supervisor import FileSource, Supervisor
+
+    sup = Supervisor()
+    for name in ("btc", "breadth", "smoke", "fire", "guard", "liquidity_gate", "clock"):
+        sup.source(name)
+    sup.derive("market", ["btc", "breadth"], lambda btc, br: classify_market(btc[0], btc[1], br))
+    sup.derive("smoke_gate", ["smoke", "clock"], classify_smoke_gate)
+    sup.derive("fire_gate", ["fire", "clock"], classify_fire_gate)
+    sup.derive("guard_gate", ["guard"], classify_guard_gate)
+    sup.derive(
+        "exec_gate",
+        ["smoke_gate", "guard_gate", "liquidity_gate", "fire_gate"],
+        combine_exec_gates,
+    )
+    files = {
+        "smoke": FileSource(OUTDIR / "order_smoke_state.json"),
+        "fire": FileSource(FIRE_STATE_PATH),
+        "guard": FileSource(GUARD_STATE_PATH),
+    }
+    return sup, files
+
+
+def feed_mountain(sup: Any, files: Dict[str, Any], **values: Any) -> List[Any]:
+    """状態ファイルを (変わっていれば) 読み直し、時計と values を流して run()。"""
+    for name, fs in files.items():
+        reread, v = fs.poll()
+        if reread:
+            sup.set(name, v)
+    sup.set("clock", _clock_ms())
+    sup.update(values)
+    return sup.run()
+
+
+def write_exec_gate(out_dir: Path, rs: Dict[str, Any]) -> Path:
+    """exec_gate の固定長バイナリ版（utils/wire.py）。JSON の risk_state.json はデバッグ用に残す。"""
+    from utils.wire import write_record
+
+    gate = dict(rs.get("exec_gate") or {}, ts=rs.get("ts"), source="risk_scan")
+    return write_record(out_dir / "exec_gate.ubw", gate)
+
+
 # =========================
 # Main
 # =========================
@@ -265,6 +521,7 @@ def main() -> None:
             str(REPO_ROOT / "config" / "private" / "bybit_api_config.json")
         ),
     )
+    ap.add_argument("--watch", type=float, default=0.0, help="N sec: keep ticking BTC and rewrite on regime change")
     args = ap.parse_args()
 
     ex = (args.exchange or "bybit").strip().lower()
@@ -314,50 +571,55 @@ def main() -> None:
 
     abs_ret, bb_width_pct = btc_metrics(adapter)
 
-    n_os, tot = breadth_oversold()
-
-    breadth_ratio = (n_os / tot) if tot else 0.0
-
-    # regime 判定
-    if (abs_ret >= PANIC_RET) or (bb_width_pct >= PANIC_BB) or (breadth_ratio >= PANIC_BREADTH):
-        market = "panic"
-        size_mult = SIZE_PANIC
-    elif (abs_ret >= CAUTION_RET) or (bb_width_pct >= CAUTION_BB) or (breadth_ratio >= CAUTION_BREADTH):
-        market = "caution"
-        size_mult = SIZE_CAUTION
-    else:
-        market = "normal"
-        size_mult = SIZE_NORMAL
+    # breadth + 板の約定コストで流動性ゲート（THIN なら発注不可）
+    inputs = refresh_inputs(adapter, ex)
 
-    # ---- NEW: order smoke の結果を取り込んで exec gate を決める
-    smoke = load_order_smoke_state()
-    exec_gate = classify_smoke_gate(smoke)
+    # regime 判定 + exec gate（smoke / guard latch / 流動性 / Fire）は Mountain で導出
+    mountain, files = build_mountain()
+    feed_mountain(
+        mountain, files,
+        btc=(abs_ret, bb_width_pct),
+        breadth=inputs["breadth_ratio"],
+        liquidity_gate=inputs["liquidity_gate"],
+    )
+    market, size_mult = mountain.value("market")
+    exec_gate = mountain.value("exec_gate")
+    smoke = files["smoke"].value
 
     rs = {
-        "ts": int(time.time() * 1000),
+        "ts": _now_ms(),
         # abs_ret は比率なので「pct」という名前は誤解を生むが、既存互換のためキー名は維持
         "btc_abs_daily_ret_pct": round(abs_ret, 6),
         "btc_bb_width_pct": bb_width_pct,
-        "breadth_oversold": n_os,
-        "breadth_total": tot,
-        "breadth_ratio": round(breadth_ratio, 4),
+        "btc_stats": btc_regime_stats(adapter).snapshot().to_dict(),
+        "breadth_oversold": inputs["breadth_oversold"],
+        "breadth_total": inputs["breadth_total"],
+        "breadth_ratio": inputs["breadth_ratio"],
         "market": market,
         "size_mult": size_mult,
-        "exec_gate": exec_gate,
-        "smoke": smoke,
-
+        "liquidity": inputs["liquidity"],
+        "liquidity_gate": inputs["liquidity_gate"],
+        "fire_gate": mountain.value("fire_gate"),
+        "guard_gate": mountain.value("guard_gate"),
 
         # ---- NEW: 実行可否ゲート（STOP/KILL/RETRY/PROCEED）
         "exec_gate": exec_gate,
 
         # ---- NEW: スモーク原文（不要なら消してOK。summaryだけにしても良い）
         "smoke": smoke,
+
+        # ---- 各判定がどの入力バージョンから出たか（監査用）
+        "mountain": mountain.audit(),
     }
 
     out_path = OUTDIR / "risk_state.json"
     out_path.write_text(json.dumps(rs, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_exec_gate(OUTDIR, rs)
     print("[risk]", rs)
 
+    if args.watch > 0:
+        watch_regime(adapter, ex, rs, out_path, interval_sec=args.watch, mountain=mountain, files=files)
+
 
 if __name__ == "__main__":
     main()
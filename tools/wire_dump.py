@@ -0,0 +1,89 @@
+# tools/wire_dump.py
+# Binary signal records (utils/wire.py): JSON debug view + codec benchmark.
+#   PYTHONPATH=. python tools/wire_dump.py dump out/exec_gate.ubw
+#   PYTHONPATH=. python tools/wire_dump.py schemas
+#   PYTHONPATH=. python tools/wire_dump.py bench --n 20000
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from adapters.base import OrderRequest  # noqa: E402
+from adapters.paper import PaperFill  # noqa: E402
+from utils import wire  # noqa: E402
+
+
+def _best_us(fns: Dict[str, Callable[[], Any]], n: int, rounds: int = 30) -> Dict[str, float]:
+    """Best-of-rounds per call, rounds interleaved: a noisy host slows every codec alike."""
+    batch = max(1, n // rounds)
+    best = {k: float("inf") for k in fns}
+    for _ in range(rounds):
+        for k, fn in fns.items():
+            best[k] = min(best[k], timeit.timeit(fn, number=batch) / batch * 1e6)
+    return best
+
+
+def bench(n: int) -> None:
+    samples: Dict[str, Any] = {
+        "quote": wire.Quote("bybit", "BTCUSDT", 50000.5, 50001.0, 1_792_381_646_838, 1.5, 2.0),
+        "gate": {"action": "STOP", "allow_orders": False, "reason": "guard_paused:kill_switch: manual", "retry_after_sec": 0},
+        "order": OrderRequest("BTC/USDT", "buy", "limit", 0.001, price=87500.0, time_in_force="IOC",
+                              reduce_only=True, client_order_id="univbot-123456789-abc"),
+        "fill": PaperFill("paper-000123", "BTC/USDT", "sell", 50000.5, 0.01, True, 0.05, 1_792_381_646_838),
+    }
+    out = {}
+    for name, obj in samples.items():
+        d = wire.as_dict(obj)
+        b = wire.encode(obj)
+        text = json.dumps(d, indent=2)
+        t = _best_us({
+            "je": lambda: json.dumps(d, indent=2),
+            "jd": lambda: json.loads(text),
+            "we": lambda: wire.encode(obj),
+            "wd": lambda: wire.decode(b),
+            "wu": lambda: wire.header(b).unpack(b),
+        }, n)
+        je, jd, we, wd, wu = t["je"], t["jd"], t["we"], t["wd"], t["wu"]
+        out[name] = {
+            "json_bytes": len(text),
+            "wire_bytes": len(b),
+            "json_dumps_us": round(je, 2),
+            "json_loads_us": round(jd, 2),
+            "wire_encode_us": round(we, 2),
+            "wire_decode_us": round(wd, 2),
+            "wire_unpack_us": round(wu, 2),
+            "encode_x": round(je / we, 1),
+            "decode_x": round(je / wd, 1),
+        }
+    print(json.dumps(out, indent=2))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    d = sub.add_parser("dump")
+    d.add_argument("path")
+    sub.add_parser("schemas")
+    b = sub.add_parser("bench")
+    b.add_argument("--n", type=int, default=20000)
+    args = ap.parse_args()
+
+    if args.cmd == "dump":
+        print(wire.to_json(Path(args.path).read_bytes()))
+    elif args.cmd == "schemas":
+        for (type_id, version), s in sorted(wire.schemas().items()):
+            print(f"{type_id:3d} v{version}  {s.name:6s} {s.py_type.__name__:13s} {s.layout.size} B  {s.layout.format}")
+    else:
+        bench(args.n)
+
+
+if __name__ == "__main__":
+    main()
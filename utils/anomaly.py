@@ -0,0 +1,356 @@
+# utils/anomaly.py
+"""
+Fire: streaming anomaly (ignition) detector over many symbols (NO-EXEC).
+
+Per symbol O(1) state, kept in flat columns (one slot per symbol):
+- return z-score: log return of mid vs EWMA mean / EWMA variance of returns
+- spread blowout: spread (bps) vs its EWMA baseline
+- depth collapse: top-of-book depth (quote notional) vs its EWMA baseline
+- volume spike: traded volume per update vs its EWMA baseline
+Each update is judged against the baseline *before* it is folded in; the
+return EWMAs start at zero and are bias-corrected, so z is usable right
+after the `min_obs` warm-up.
+
+update() handles one tick; update_batch() takes whole columns (e.g. one
+poll of every symbol) and, with NumPy installed, runs as array operations on
+zero-copy views of the same state (pure-Python loop otherwise).
+
+Output: AnomalySignal objects (listeners + recent list) and gate(), which
+has the same shape as risk_scan.classify_smoke_gate() / liquidity_gate():
+symbols firing within `hold_ms` are blocked for new entries, and a
+market-wide ignition (share of firing symbols >= stop_breadth) STOPs.
+"""
+from __future__ import annotations
+
+import math
+import time
+from array import array
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # optional: batch updates fall back to the scalar path
+    np = None  # type: ignore[assignment]
+
+_EPS = 1e-12
+_COLUMNS = ("last_mid", "ret_m", "ret_v", "spread_m", "depth_m", "vol_m", "n", "fired_ms")
+
+
+def _alpha(halflife: float) -> float:
+    return 1.0 - 0.5 ** (1.0 / max(halflife, 1e-9))
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+@dataclass(frozen=True)
+class AnomalySignal:
+    symbol: str
+    ts: int
+    kind: str               # return_z | spread_blowout | depth_collapse | volume_spike
+    value: float            # z-score, or ratio to baseline
+    threshold: float
+    detail: Dict[str, float]
+
+    @property
+    def severity(self) -> float:
+        """How far past the threshold (>= 1.0); depth_collapse is inverted."""
+        if self.kind == "depth_collapse":
+            return self.threshold / max(self.value, _EPS)
+        return abs(self.value) / self.threshold
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d["severity"] = round(self.severity, 3)
+        return d
+
+
+@dataclass
+class FireConfig:
+    z_threshold: float = 6.0
+    spread_mult: float = 4.0
+    min_spread_bps: float = 5.0         # ignore "blowouts" that stay tighter than this
+    depth_frac: float = 0.2
+    volume_mult: float = 8.0
+    ret_halflife: float = 200.0         # in updates
+    base_halflife: float = 100.0        # spread / depth / volume baselines
+    min_obs: int = 30                   # warm-up before anything fires
+    hold_ms: int = 60_000               # a symbol stays "firing" this long
+    stop_breadth: float = 0.05          # share of symbols firing -> market-wide STOP
+    min_ret_std: float = 1e-5           # floor for the return std (flat-priced symbols)
+
+
+class FireDetector:
+    def __init__(self, config: Optional[FireConfig] = None, *, max_signals: int = 1000) -> None:
+        self.config = config or FireConfig()
+        self.a_ret = _alpha(self.config.ret_halflife)
+        self.a_base = _alpha(self.config.base_halflife)
+        self._slots: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._cols: Dict[str, "array[float]"] = {c: array("d") for c in _COLUMNS}
+        self.recent: Deque[AnomalySignal] = deque(maxlen=max_signals)
+        self.listeners: List[Callable[[AnomalySignal], None]] = []
+        self.stats: Dict[str, int] = {"updates": 0, "signals": 0}
+
+    # -------------------------
+    # Slots
+    # -------------------------
+    def slot(self, symbol: str) -> int:
+        i = self._slots.get(symbol)
+        if i is None:
+            # grow every column first (BufferError while a batch view is alive),
+            # register the name only once the state row exists
+            grown = []
+            try:
+                for col in self._cols.values():
+                    col.append(0.0)
+                    grown.append(col)
+            except BufferError:
+                for col in grown:
+                    col.pop()
+                raise
+            i = self._slots[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+        return i
+
+    def slots(self, symbols: Sequence[str]) -> Any:
+        """Slot index per symbol (reuse across batches to skip the dict lookups)."""
+        idx = [self.slot(s) for s in symbols]
+        return np.asarray(idx, dtype=np.intp) if np is not None else idx
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    # -------------------------
+    # Scalar
+    # -------------------------
+    def update(
+        self,
+        symbol: str,
+        bid: float,
+        ask: float,
+        *,
+        depth: Optional[float] = None,
+        volume: Optional[float] = None,
+        ts_ms: Optional[int] = None,
+    ) -> List[AnomalySignal]:
+        if bid <= 0 or ask <= 0 or ask < bid:
+            return []
+        ts = _now_ms() if ts_ms is None else int(ts_ms)
+        cfg = self.config
+        c = self._cols
+        i = self.slot(symbol)
+        mid = (bid + ask) * 0.5
+        spread = (ask - bid) / mid * 1e4
+        n = c["n"][i]
+        warm = n >= cfg.min_obs
+        out: List[AnomalySignal] = []
+
+        last = c["last_mid"][i]
+        if last > 0:
+            r = math.log(mid / last)
+            m, v = c["ret_m"][i], c["ret_v"][i]
+            if warm:
+                w = 1.0 - (1.0 - self.a_ret) ** (n - 1)         # EWMA bias (state starts at 0)
+                z = (r - m / w) / max(math.sqrt(v / w), cfg.min_ret_std)
+                if abs(z) >= cfg.z_threshold:
+                    out.append(AnomalySignal(symbol, ts, "return_z", z, cfg.z_threshold, {"ret": r, "mid": mid}))
+            d = r - m
+            c["ret_m"][i] = m + self.a_ret * d
+            c["ret_v"][i] = (1.0 - self.a_ret) * (v + self.a_ret * d * d)
+        c["last_mid"][i] = mid
+
+        sm = c["spread_m"][i]
+        if warm and sm > 0 and spread >= cfg.min_spread_bps and spread >= cfg.spread_mult * sm:
+            out.append(AnomalySignal(symbol, ts, "spread_blowout", spread / sm, cfg.spread_mult, {"spread_bps": spread, "base_bps": sm}))
+        c["spread_m"][i] = spread if n == 0 else sm + self.a_base * (spread - sm)
+
+        if depth is not None and depth == depth:
+            dm = c["depth_m"][i]
+            if warm and dm > 0 and depth <= cfg.depth_frac * dm:
+                out.append(AnomalySignal(symbol, ts, "depth_collapse", depth / dm, cfg.depth_frac, {"depth": depth, "base": dm}))
+            c["depth_m"][i] = depth if dm <= 0 else dm + self.a_base * (depth - dm)
+
+        if volume is not None and volume == volume:
+            vm = c["vol_m"][i]
+            if warm and vm > 0 and volume >= cfg.volume_mult * vm:
+                out.append(AnomalySignal(symbol, ts, "volume_spike", volume / vm, cfg.volume_mult, {"volume": volume, "base": vm}))
+            c["vol_m"][i] = volume if vm <= 0 else vm + self.a_base * (volume - vm)
+
+        c["n"][i] = n + 1
+        self.stats["updates"] += 1
+        if out:
+            c["fired_ms"][i] = ts
+            self._emit(out)
+        return out
+
+    # -------------------------
+    # Batch
+    # -------------------------
+    def update_batch(
+        self,
+        symbols: Any,
+        bid: Sequence[float],
+        ask: Sequence[float],
+        *,
+        depth: Optional[Sequence[float]] = None,
+        volume: Optional[Sequence[float]] = None,
+        ts_ms: Optional[int] = None,
+    ) -> List[AnomalySignal]:
+        """
+        One tick for many symbols. `symbols` may be names or slots() output;
+        depth / volume may hold NaN for "not observed".
+        """
+        ts = _now_ms() if ts_ms is None else int(ts_ms)
+        if np is None:
+            names = [self._symbols[s] if isinstance(s, int) else s for s in symbols]
+            out: List[AnomalySignal] = []
+            for k, sym in enumerate(names):
+                out += self.update(
+                    sym, bid[k], ask[k],
+                    depth=None if depth is None else depth[k],
+                    volume=None if volume is None else volume[k],
+                    ts_ms=ts,
+                )
+            return out
+
+        idx = symbols if isinstance(symbols, np.ndarray) else self.slots(symbols)
+        if len(np.unique(idx)) != len(idx):
+            # the same symbol twice in one batch must be applied in order
+            out = []
+            for k, i in enumerate(idx.tolist()):
+                out += self.update(
+                    self._symbols[i], float(bid[k]), float(ask[k]),
+                    depth=None if depth is None else float(depth[k]),
+                    volume=None if volume is None else float(volume[k]),
+                    ts_ms=ts,
+                )
+            return out
+        return self._update_vec(idx, np.asarray(bid, dtype=np.float64), np.asarray(ask, dtype=np.float64),
+                                None if depth is None else np.asarray(depth, dtype=np.float64),
+                                None if volume is None else np.asarray(volume, dtype=np.float64), ts)
+
+    def _update_vec(self, idx: Any, bid: Any, ask: Any, depth: Any, volume: Any, ts: int) -> List[AnomalySignal]:
+        cfg = self.config
+        # zero-copy views of the state columns (released before any slot is added)
+        col = {k: np.frombuffer(v, dtype=np.float64) for k, v in self._cols.items()}
+        ok = (bid > 0) & (ask > 0) & (ask >= bid)
+        idx, bid, ask = idx[ok], bid[ok], ask[ok]
+        if depth is not None:
+            depth = depth[ok]
+        if volume is not None:
+            volume = volume[ok]
+
+        mid = (bid + ask) * 0.5
+        spread = (ask - bid) / mid * 1e4
+        n = col["n"][idx]
+        warm = n >= cfg.min_obs
+        fired: List[tuple] = []
+
+        last = col["last_mid"][idx]
+        has_last = last > 0
+        r = np.where(has_last, np.log(mid / np.where(has_last, last, mid)), 0.0)
+        m, v = col["ret_m"][idx], col["ret_v"][idx]
+        w = 1.0 - (1.0 - self.a_ret) ** np.maximum(n - 1, 1)
+        z = (r - m / w) / np.maximum(np.sqrt(v / w), cfg.min_ret_std)
+        for k in np.flatnonzero(warm & has_last & (np.abs(z) >= cfg.z_threshold)):
+            fired.append((k, "return_z", float(z[k]), cfg.z_threshold, {"ret": float(r[k]), "mid": float(mid[k])}))
+        d = r - m
+        col["ret_m"][idx] = np.where(has_last, m + self.a_ret * d, m)
+        col["ret_v"][idx] = np.where(has_last, (1.0 - self.a_ret) * (v + self.a_ret * d * d), v)
+        col["last_mid"][idx] = mid
+
+        sm = col["spread_m"][idx]
+        hit = warm & (sm > 0) & (spread >= cfg.min_spread_bps) & (spread >= cfg.spread_mult * sm)
+        for k in np.flatnonzero(hit):
+            fired.append((k, "spread_blowout", float(spread[k] / sm[k]), cfg.spread_mult,
+                          {"spread_bps": float(spread[k]), "base_bps": float(sm[k])}))
+        col["spread_m"][idx] = np.where(n == 0, spread, sm + self.a_base * (spread - sm))
+
+        if depth is not None:
+            dm = col["depth_m"][idx]
+            seen = ~np.isnan(depth)
+            hit = seen & warm & (dm > 0) & (depth <= cfg.depth_frac * dm)
+            for k in np.flatnonzero(hit):
+                fired.append((k, "depth_collapse", float(depth[k] / dm[k]), cfg.depth_frac,
+                              {"depth": float(depth[k]), "base": float(dm[k])}))
+            col["depth_m"][idx] = np.where(seen, np.where(dm <= 0, depth, dm + self.a_base * (depth - dm)), dm)
+
+        if volume is not None:
+            vm = col["vol_m"][idx]
+            seen = ~np.isnan(volume)
+            hit = seen & warm & (vm > 0) & (volume >= cfg.volume_mult * vm)
+            for k in np.flatnonzero(hit):
+                fired.append((k, "volume_spike", float(volume[k] / vm[k]), cfg.volume_mult,
+                              {"volume": float(volume[k]), "base": float(vm[k])}))
+            col["vol_m"][idx] = np.where(seen, np.where(vm <= 0, volume, vm + self.a_base * (volume - vm)), vm)
+
+        col["n"][idx] = n + 1
+        self.stats["updates"] += int(len(idx))
+        out = [AnomalySignal(self._symbols[int(idx[k])], ts, kind, val, thr, det) for k, kind, val, thr, det in fired]
+        if out:
+            col["fired_ms"][idx[[f[0] for f in fired]]] = ts
+        # listeners may add symbols: no view of the columns may outlive this point
+        del col
+        if out:
+            self._emit(out)
+        return out
+
+    def _emit(self, sigs: List[AnomalySignal]) -> None:
+        self.stats["signals"] += len(sigs)
+        self.recent.extend(sigs)
+        for s in sigs:
+            for fn in self.listeners:
+                try:
+                    fn(s)
+                except Exception:
+                    pass
+
+    # -------------------------
+    # Risk gate
+    # -------------------------
+    def firing(self, now_ms: Optional[int] = None) -> List[str]:
+        now = _now_ms() if now_ms is None else int(now_ms)
+        cutoff = now - self.config.hold_ms
+        fired = self._cols["fired_ms"]
+        return [s for i, s in enumerate(self._symbols) if fired[i] > 0 and fired[i] >= cutoff]
+
+    def gate(self, now_ms: Optional[int] = None) -> Dict[str, Any]:
+        """
+        {"action", "allow_orders", "reason", "retry_after_sec", "firing", "breadth"}
+        PROCEED with `firing` symbols blocked, STOP when the ignition is market-wide.
+        """
+        now = _now_ms() if now_ms is None else int(now_ms)
+        firing = self.firing(now)
+        breadth = len(firing) / len(self._symbols) if self._symbols else 0.0
+        if firing and breadth >= self.config.stop_breadth:
+            return {
+                "action": "STOP",
+                "allow_orders": False,
+                "reason": f"fire_market_wide({len(firing)}/{len(self._symbols)}):{','.join(sorted(firing))[:120]}",
+                "retry_after_sec": int(self.config.hold_ms / 1000),
+                "firing": sorted(firing),
+                "breadth": round(breadth, 4),
+            }
+        return {
+            "action": "PROCEED",
+            "allow_orders": True,
+            "reason": f"fire_symbols({len(firing)})" if firing else "fire_quiet",
+            "retry_after_sec": 0,
+            "firing": sorted(firing),
+            "breadth": round(breadth, 4),
+        }
+
+    def state(self, now_ms: Optional[int] = None, *, signals: int = 50) -> Dict[str, Any]:
+        """JSON-able snapshot for the risk scan (FIRE_STATE_PATH)."""
+        now = _now_ms() if now_ms is None else int(now_ms)
+        return {
+            "ts": now,
+            "symbols": len(self._symbols),
+            "gate": self.gate(now),
+            "signals": [s.to_dict() for s in list(self.recent)[-signals:]],
+            "stats": dict(self.stats),
+        }
@@ -0,0 +1,242 @@
+# utils/bbo_aggregator.py
+"""
+Consolidated cross-venue BBO (NO-EXEC).
+
+- keeps the latest top-of-book per (symbol, venue) with its receive timestamp
+- flags stale quotes (age > stale_ms) and crossed quotes (bid >= ask)
+- publishes best bid / best ask across venues + a venue x venue spread matrix
+
+update() is O(1) per quote (one dict lookup + in-place write), so a stream
+feed can push thousands of symbol x venue pairs. Consolidation is lazy and
+only walks the venues of the symbol that is read.
+
+Sources are any callable ``symbol -> (bid, ask)``; adapters plug in via
+``adapter.get_best_bid_ask`` (see sources_from_adapters()).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from adapters.base import TradingAdapter
+
+BboSource = Callable[[str], Tuple[float, float]]
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class VenueQuote:
+    """Latest quote for one (symbol, venue). Mutated in place on update."""
+    __slots__ = ("venue", "symbol", "bid", "ask", "recv_ms", "updates")
+
+    def __init__(self, venue: str, symbol: str) -> None:
+        self.venue = venue
+        self.symbol = symbol
+        self.bid = 0.0
+        self.ask = 0.0
+        self.recv_ms = 0
+        self.updates = 0
+
+    @property
+    def crossed(self) -> bool:
+        return self.bid > 0 and self.ask > 0 and self.bid >= self.ask
+
+    def age_ms(self, now_ms: int) -> int:
+        return now_ms - self.recv_ms
+
+    def to_dict(self, now_ms: int) -> Dict[str, Any]:
+        return {
+            "venue": self.venue,
+            "bid": self.bid,
+            "ask": self.ask,
+            "recv_ms": self.recv_ms,
+            "age_ms": self.age_ms(now_ms),
+            "crossed": self.crossed,
+        }
+
+
+@dataclass(frozen=True)
+class ConsolidatedBbo:
+    symbol: str
+    ts_ms: int
+    best_bid: Optional[float]
+    bid_venue: Optional[str]
+    best_ask: Optional[float]
+    ask_venue: Optional[str]
+    crossed: bool                       # best_bid >= best_ask across venues (arb or bad data)
+    stale: Tuple[str, ...]              # venues excluded for age
+    bad: Tuple[str, ...]                # venues excluded for a self-crossed quote
+    quotes: Tuple[Tuple[str, float, float], ...]   # (venue, bid, ask) used for consolidation
+
+    @property
+    def mid(self) -> Optional[float]:
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return (self.best_bid + self.best_ask) / 2.0
+
+    def spread_matrix_bps(self) -> Dict[str, Dict[str, float]]:
+        """
+        m[a][b] = (bid_a - ask_b) / mid * 1e4
+        > 0 means selling on `a` and buying on `b` is in the money (before fees).
+        """
+        mid = self.mid
+        if not mid:
+            return {}
+        m: Dict[str, Dict[str, float]] = {}
+        for va, bid_a, _ in self.quotes:
+            row: Dict[str, float] = {}
+            for vb, _, ask_b in self.quotes:
+                row[vb] = (bid_a - ask_b) / mid * 10_000.0
+            m[va] = row
+        return m
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "ts": self.ts_ms,
+            "best_bid": self.best_bid,
+            "bid_venue": self.bid_venue,
+            "best_ask": self.best_ask,
+            "ask_venue": self.ask_venue,
+            "crossed": self.crossed,
+            "stale": list(self.stale),
+            "bad": list(self.bad),
+            "spread_matrix_bps": self.spread_matrix_bps(),
+        }
+
+
+class BboAggregator:
+    """
+    Thread-safe latest-quote store + lazy consolidation.
+    stale_ms: quotes older than this are flagged and excluded from best bid/ask.
+    """
+
+    def __init__(self, *, stale_ms: int = 3_000) -> None:
+        self.stale_ms = int(stale_ms)
+        self._lock = threading.Lock()
+        self._book: Dict[str, Dict[str, VenueQuote]] = {}
+
+    # -------------------------
+    # Ingest
+    # -------------------------
+    def update(self, venue: str, symbol: str, bid: float, ask: float, *, recv_ms: Optional[int] = None) -> None:
+        ts = _now_ms() if recv_ms is None else int(recv_ms)
+        with self._lock:
+            per = self._book.get(symbol)
+            if per is None:
+                per = self._book[symbol] = {}
+            q = per.get(venue)
+            if q is None:
+                q = per[venue] = VenueQuote(venue, symbol)
+            q.bid = float(bid)
+            q.ask = float(ask)
+            q.recv_ms = ts
+            q.updates += 1
+
+    def poll(
+        self,
+        sources: Mapping[str, BboSource],
+        symbols: Sequence[str],
+        *,
+        symbol_map: Optional[Mapping[str, Mapping[str, str]]] = None,
+        max_workers: int = 16,
+    ) -> Dict[str, str]:
+        """
+        Fetch every (venue, symbol) concurrently and update.
+        symbol_map: {venue: {symbol: venue_symbol}} when a venue spells it differently.
+        Returns {"venue:symbol": error} for failed fetches (failures never abort the poll).
+        """
+        smap = symbol_map or {}
+        jobs = [(v, s) for v in sources for s in symbols]
+        errors: Dict[str, str] = {}
+
+        def _one(job: Tuple[str, str]) -> None:
+            venue, sym = job
+            vsym = (smap.get(venue) or {}).get(sym, sym)
+            try:
+                bid, ask = sources[venue](vsym)
+            except Exception as e:
+                errors[f"{venue}:{sym}"] = repr(e)[:200]
+                return
+            self.update(venue, sym, bid, ask)
+
+        if not jobs:
+            return errors
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+            list(pool.map(_one, jobs))
+        return errors
+
+    # -------------------------
+    # Read / publish
+    # -------------------------
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return sorted(self._book)
+
+    def quotes(self, symbol: str, *, now_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+        now = _now_ms() if now_ms is None else int(now_ms)
+        with self._lock:
+            per = self._book.get(symbol) or {}
+            return [q.to_dict(now) for q in per.values()]
+
+    def consolidated(self, symbol: str, *, now_ms: Optional[int] = None) -> Optional[ConsolidatedBbo]:
+        now = _now_ms() if now_ms is None else int(now_ms)
+        with self._lock:
+            per = self._book.get(symbol)
+            if not per:
+                return None
+            rows = [(q.venue, q.bid, q.ask, q.recv_ms) for q in per.values()]
+
+        best_bid: Optional[float] = None
+        best_ask: Optional[float] = None
+        bid_venue: Optional[str] = None
+        ask_venue: Optional[str] = None
+        stale: List[str] = []
+        bad: List[str] = []
+        used: List[Tuple[str, float, float]] = []
+
+        for venue, bid, ask, recv in rows:
+            if now - recv > self.stale_ms:
+                stale.append(venue)
+                continue
+            if bid <= 0 or ask <= 0 or bid >= ask:
+                bad.append(venue)
+                continue
+            used.append((venue, bid, ask))
+            if best_bid is None or bid > best_bid:
+                best_bid, bid_venue = bid, venue
+            if best_ask is None or ask < best_ask:
+                best_ask, ask_venue = ask, venue
+
+        crossed = best_bid is not None and best_ask is not None and best_bid >= best_ask
+        return ConsolidatedBbo(
+            symbol=symbol,
+            ts_ms=now,
+            best_bid=best_bid,
+            bid_venue=bid_venue,
+            best_ask=best_ask,
+            ask_venue=ask_venue,
+            crossed=crossed,
+            stale=tuple(sorted(stale)),
+            bad=tuple(sorted(bad)),
+            quotes=tuple(used),
+        )
+
+    def snapshot(self, *, now_ms: Optional[int] = None) -> Dict[str, ConsolidatedBbo]:
+        now = _now_ms() if now_ms is None else int(now_ms)
+        out: Dict[str, ConsolidatedBbo] = {}
+        for sym in self.symbols():
+            c = self.consolidated(sym, now_ms=now)
+            if c is not None:
+                out[sym] = c
+        return out
+
+
+def sources_from_adapters(adapters: Sequence[TradingAdapter]) -> Dict[str, BboSource]:
+    """{adapter.name: adapter.get_best_bid_ask} for every configured adapter."""
+    return {a.name: a.get_best_bid_ask for a in adapters}
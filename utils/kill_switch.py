@@ -0,0 +1,211 @@
+# utils/kill_switch.py
+"""
+Kill switch: flatten every venue's resting orders under a hard deadline.
+
+"If you cannot shut it down safely, you do not own it."
+
+fire():
+- every venue runs in its own thread, at the same time
+- per venue: cancel-all per configured symbol (concurrently), or one
+  category-wide cancel-all when the venue has no symbol list
+- verify with get_open_orders() (per symbol, concurrently); leftovers (orders that raced the cancel)
+  are cancelled by id and verified again, until flat or out of time
+- a venue is flat only after a round with no errors: every cancel-all was
+  accepted (a failed one is retried) and get_open_orders() came back empty
+- the whole routine returns at the deadline whatever happened; a venue that
+  did not confirm flat is reported as not flat
+
+The report carries time-to-flat (ms from fire() to the last venue confirmed
+flat) so drills can track it.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from adapters.base import TradingAdapter
+
+DEFAULT_DEADLINE_SEC = 1.0
+_RETRY_PAUSE_SEC = 0.02
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+@dataclass
+class VenueFlatten:
+    venue: str
+    flat: bool = False
+    canceled: int = 0
+    remaining: int = -1            # open orders at last verification (-1 = never verified)
+    rounds: int = 0
+    elapsed_ms: Optional[float] = None
+    errors: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "venue": self.venue,
+            "flat": self.flat,
+            "canceled": self.canceled,
+            "remaining": self.remaining,
+            "rounds": self.rounds,
+            "elapsed_ms": None if self.elapsed_ms is None else round(self.elapsed_ms, 2),
+            "errors": self.errors[:10],
+        }
+
+
+@dataclass
+class KillReport:
+    fired_ms: int
+    deadline_ms: float
+    reason: str
+    venues: List[VenueFlatten]
+    elapsed_ms: float = 0.0
+
+    @property
+    def flat(self) -> bool:
+        return bool(self.venues) and all(v.flat for v in self.venues)
+
+    @property
+    def time_to_flat_ms(self) -> Optional[float]:
+        """Slowest venue's confirmation time; None when any venue is not confirmed flat."""
+        if not self.flat:
+            return None
+        return max((v.elapsed_ms or 0.0) for v in self.venues)
+
+    def to_dict(self) -> Dict[str, Any]:
+        ttf = self.time_to_flat_ms
+        return {
+            "fired_ms": self.fired_ms,
+            "reason": self.reason,
+            "deadline_ms": self.deadline_ms,
+            "flat": self.flat,
+            "time_to_flat_ms": None if ttf is None else round(ttf, 2),
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "venues": [v.to_dict() for v in self.venues],
+        }
+
+
+class KillSwitch:
+    def __init__(
+        self,
+        adapters: Sequence[TradingAdapter],
+        *,
+        symbols: Optional[Mapping[str, Sequence[str]]] = None,
+        deadline_sec: float = DEFAULT_DEADLINE_SEC,
+        verify: bool = True,
+    ) -> None:
+        """
+        symbols: {venue name: [symbol, ...]}. A venue without an entry gets one
+        category-wide cancel-all (Bybit: settle coin); venues that need a
+        symbol (MEXC) must be listed.
+        """
+        self.adapters = list(adapters)
+        self.symbols = {k: list(v) for k, v in (symbols or {}).items()}
+        self.deadline_sec = deadline_sec
+        self.verify = verify
+        self.last: Optional[KillReport] = None
+        self._lock = threading.Lock()
+
+    def fire(self, reason: str = "") -> KillReport:
+        with self._lock:
+            t0 = time.monotonic()
+            deadline = t0 + self.deadline_sec
+            results = [VenueFlatten(venue=a.name) for a in self.adapters]
+
+            # symbol-level cancels are issued from inside each venue thread
+            n_jobs = sum(max(1, len(self.symbols.get(a.name) or ())) for a in self.adapters)
+            pool = ThreadPoolExecutor(max_workers=max(1, n_jobs + len(self.adapters)), thread_name_prefix="kill")
+            try:
+                futs = [
+                    pool.submit(self._flatten, a, r, t0, deadline, pool)
+                    for a, r in zip(self.adapters, results)
+                ]
+                wait(futs, timeout=max(0.0, deadline - time.monotonic()))
+            finally:
+                # never block past the deadline on a hung venue
+                pool.shutdown(wait=False)
+
+            # snapshot: a venue thread still running past the deadline must not edit the report
+            venues = [replace(r, errors=list(r.errors)) for r in results]
+            for v in venues:
+                if not v.flat and not v.errors:
+                    v.errors.append("deadline exceeded")
+            rep = KillReport(
+                fired_ms=_now_ms(),
+                deadline_ms=self.deadline_sec * 1000.0,
+                reason=reason,
+                venues=venues,
+                elapsed_ms=(time.monotonic() - t0) * 1000.0,
+            )
+            self.last = rep
+            return rep
+
+    # -------------------------
+    # Per venue
+    # -------------------------
+    def _flatten(
+        self,
+        adapter: TradingAdapter,
+        res: VenueFlatten,
+        t0: float,
+        deadline: float,
+        pool: ThreadPoolExecutor,
+    ) -> None:
+        syms: List[Optional[str]] = list(self.symbols.get(adapter.name) or []) or [None]
+
+        def _cancel_all(sym: Optional[str]) -> int:
+            return len(adapter.cancel_all_orders(sym) or [])
+
+        pending = list(syms)                # cancel-all not yet accepted by the venue
+        while time.monotonic() < deadline:
+            res.rounds += 1
+            n_err = len(res.errors)
+            if pending:
+                # venue-side cancel-all, all symbols at once; a failed one is retried next round
+                futs = [(s, pool.submit(_cancel_all, s)) for s in pending]
+                pending = []
+                for s, f in futs:
+                    try:
+                        res.canceled += f.result(timeout=max(0.0, deadline - time.monotonic()))
+                    except Exception as e:
+                        res.errors.append(repr(e)[:200])
+                        pending.append(s)
+            if not self.verify:
+                # accepted by the venue, not confirmed
+                if not pending:
+                    res.elapsed_ms = (time.monotonic() - t0) * 1000.0
+                    res.flat = True
+                    return
+                time.sleep(_RETRY_PAUSE_SEC)
+                continue
+
+            try:
+                checks = [pool.submit(adapter.get_open_orders, s) for s in syms]
+                left = [o for f in checks for o in (f.result(timeout=max(0.0, deadline - time.monotonic())) or [])]
+            except Exception as e:
+                # cannot list the open orders: not confirmed flat
+                res.errors.append(repr(e)[:200])
+                time.sleep(_RETRY_PAUSE_SEC)
+                continue
+            res.remaining = len(left)
+            if not left and not pending and len(res.errors) == n_err:
+                res.elapsed_ms = (time.monotonic() - t0) * 1000.0
+                res.flat = True
+                return
+
+            # leftovers raced the cancel-all: cancel them by id, then verify again
+            by_sym: Dict[str, List[str]] = {}
+            for o in left:
+                by_sym.setdefault(o.symbol, []).append(o.order_id)
+            for sym, ids in by_sym.items():
+                try:
+                    res.canceled += sum(1 for x in adapter.cancel_orders(ids, symbol=sym) if x.ok)
+                except Exception as e:
+                    res.errors.append(repr(e)[:200])
+            if not left:
+                time.sleep(_RETRY_PAUSE_SEC)
@@ -0,0 +1,266 @@
+# utils/liquidity.py
+"""
+Depth-based liquidity / slippage estimator (NO-EXEC).
+
+"THIN" is measured by what it costs to trade, not by how many coins sit
+in the top levels:
+
+- walk the book once with cumulative sums (notional / qty per side)
+- for each target notional: expected average fill price + slippage (bps vs mid)
+- depth (quote notional) within +/- x% of mid
+
+Levels must be best-first (bids descending, asks ascending), which is what
+every venue's depth endpoint returns. Rows may be ``[price, size, ...]``
+(strings or floats) or ``{"price": .., "size": ..}`` (bitFlyer style).
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from itertools import accumulate
+from operator import mul
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# (venue, symbol) -> (bids, asks)
+BookKey = Tuple[str, str]
+
+DEFAULT_NOTIONALS: Tuple[float, ...] = (1_000.0, 10_000.0, 100_000.0)
+DEFAULT_BANDS_PCT: Tuple[float, ...] = (0.1, 0.5, 1.0)
+
+INF = float("inf")
+
+
+@dataclass(frozen=True)
+class FillEstimate:
+    """Expected cost of sweeping `notional` (quote currency) from one side."""
+    notional: float
+    avg_price: Optional[float]      # None if the side is empty
+    slippage_bps: float             # vs mid, includes half spread; inf if book too shallow
+    filled_notional: float          # < notional when the book runs out
+
+
+@dataclass(frozen=True)
+class LiquidityEstimate:
+    venue: str
+    symbol: str
+    mid: float
+    spread_bps: float
+    buy: Tuple[FillEstimate, ...]           # walks asks
+    sell: Tuple[FillEstimate, ...]          # walks bids
+    bands_pct: Tuple[float, ...]
+    bid_depth: Tuple[float, ...]            # notional within -band% of mid
+    ask_depth: Tuple[float, ...]            # notional within +band% of mid
+
+    def worst_slippage_bps(self, notional: float) -> float:
+        """Worse side's slippage for the first target >= notional (inf if none)."""
+        worst = INF
+        for b, s in zip(self.buy, self.sell):
+            if b.notional >= notional:
+                worst = max(b.slippage_bps, s.slippage_bps)
+                break
+        return worst
+
+    def to_dict(self) -> Dict[str, Any]:
+        def _fills(fs: Tuple[FillEstimate, ...]) -> List[Dict[str, Any]]:
+            return [
+                {
+                    "notional": f.notional,
+                    "avg_price": f.avg_price,
+                    "slippage_bps": (None if f.slippage_bps == INF else round(f.slippage_bps, 3)),
+                    "filled_notional": round(f.filled_notional, 2),
+                }
+                for f in fs
+            ]
+
+        return {
+            "venue": self.venue,
+            "symbol": self.symbol,
+            "mid": self.mid,
+            "spread_bps": round(self.spread_bps, 3),
+            "buy": _fills(self.buy),
+            "sell": _fills(self.sell),
+            "bands_pct": list(self.bands_pct),
+            "bid_depth": [round(x, 2) for x in self.bid_depth],
+            "ask_depth": [round(x, 2) for x in self.ask_depth],
+        }
+
+
+# -------------------------
+# Parsing
+# -------------------------
+def _levels(rows: Iterable[Any]) -> Tuple[List[float], List[float]]:
+    prices: List[float] = []
+    sizes: List[float] = []
+    for r in rows:
+        if isinstance(r, dict):
+            p, s = r.get("price"), r.get("size")
+        else:
+            p, s = r[0], r[1]
+        prices.append(float(p))
+        sizes.append(float(s))
+    return prices, sizes
+
+
+# -------------------------
+# Core walk
+# -------------------------
+def _walk(
+    prices: List[float],
+    sizes: List[float],
+    targets: Sequence[float],
+    mid: float,
+    sign: float,
+) -> Tuple[Tuple[FillEstimate, ...], List[float]]:
+    """
+    Sweep one side for every target with a single pass of cumulative sums.
+    sign=+1 for asks (buy), -1 for bids (sell).
+    Returns (fills, cumulative notional).
+    """
+    cum_notional = list(accumulate(map(mul, prices, sizes)))
+    cum_qty = list(accumulate(sizes))
+    n = len(prices)
+
+    out: List[FillEstimate] = []
+    for t in targets:
+        if n == 0 or mid <= 0:
+            out.append(FillEstimate(notional=t, avg_price=None, slippage_bps=INF, filled_notional=0.0))
+            continue
+
+        k = bisect_left(cum_notional, t)
+        if k >= n:
+            # book too shallow: report what we could get, cost is unbounded
+            filled = cum_notional[-1]
+            qty = cum_qty[-1]
+            avg = filled / qty if qty > 0 else None
+            out.append(FillEstimate(notional=t, avg_price=avg, slippage_bps=INF, filled_notional=filled))
+            continue
+
+        prev_n = cum_notional[k - 1] if k else 0.0
+        prev_q = cum_qty[k - 1] if k else 0.0
+        qty = prev_q + (t - prev_n) / prices[k]
+        avg = t / qty if qty > 0 else prices[k]
+        slip = sign * (avg - mid) / mid * 10_000.0
+        out.append(FillEstimate(notional=t, avg_price=avg, slippage_bps=slip, filled_notional=t))
+
+    return tuple(out), cum_notional
+
+
+def estimate_book(
+    bids: Iterable[Any],
+    asks: Iterable[Any],
+    *,
+    notionals: Sequence[float] = DEFAULT_NOTIONALS,
+    bands_pct: Sequence[float] = DEFAULT_BANDS_PCT,
+    venue: str = "",
+    symbol: str = "",
+) -> LiquidityEstimate:
+    """Estimate fill cost and banded depth for one order book."""
+    bid_px, bid_sz = _levels(bids)
+    ask_px, ask_sz = _levels(asks)
+
+    if bid_px and ask_px:
+        mid = (bid_px[0] + ask_px[0]) / 2.0
+        spread_bps = (ask_px[0] - bid_px[0]) / mid * 10_000.0 if mid > 0 else INF
+    else:
+        mid = 0.0
+        spread_bps = INF
+
+    targets = sorted(float(x) for x in notionals)
+    buy, ask_cum = _walk(ask_px, ask_sz, targets, mid, +1.0)
+    sell, bid_cum = _walk(bid_px, bid_sz, targets, mid, -1.0)
+
+    # banded depth: asks ascending -> bisect directly; bids descending -> bisect on negated prices
+    neg_bid_px = [-p for p in bid_px]
+    bid_depth: List[float] = []
+    ask_depth: List[float] = []
+    for x in bands_pct:
+        if mid <= 0:
+            bid_depth.append(0.0)
+            ask_depth.append(0.0)
+            continue
+        ia = bisect_right(ask_px, mid * (1.0 + x / 100.0))
+        ib = bisect_right(neg_bid_px, -mid * (1.0 - x / 100.0))
+        ask_depth.append(ask_cum[ia - 1] if ia else 0.0)
+        bid_depth.append(bid_cum[ib - 1] if ib else 0.0)
+
+    return LiquidityEstimate(
+        venue=venue,
+        symbol=symbol,
+        mid=mid,
+        spread_bps=spread_bps,
+        buy=buy,
+        sell=sell,
+        bands_pct=tuple(float(x) for x in bands_pct),
+        bid_depth=tuple(bid_depth),
+        ask_depth=tuple(ask_depth),
+    )
+
+
+def estimate_many(
+    books: Mapping[BookKey, Tuple[Iterable[Any], Iterable[Any]]],
+    *,
+    notionals: Sequence[float] = DEFAULT_NOTIONALS,
+    bands_pct: Sequence[float] = DEFAULT_BANDS_PCT,
+) -> Dict[BookKey, LiquidityEstimate]:
+    """
+    Batch call for a whole universe: {(venue, symbol): (bids, asks)} -> estimates.
+    Each book is walked once (O(levels + targets * log(levels))).
+    """
+    targets = sorted(float(x) for x in notionals)
+    out: Dict[BookKey, LiquidityEstimate] = {}
+    for (venue, symbol), (bids, asks) in books.items():
+        out[(venue, symbol)] = estimate_book(
+            bids, asks, notionals=targets, bands_pct=bands_pct, venue=venue, symbol=symbol
+        )
+    return out
+
+
+# -------------------------
+# Risk gate
+# -------------------------
+def classify_liquidity(est: LiquidityEstimate, *, notional: float, max_slippage_bps: float) -> str:
+    """'THIN' if trading `notional` on either side costs more than max_slippage_bps."""
+    return "THIN" if est.worst_slippage_bps(notional) > max_slippage_bps else "OK"
+
+
+def liquidity_gate(
+    estimates: Mapping[BookKey, LiquidityEstimate],
+    *,
+    notional: float,
+    max_slippage_bps: float,
+) -> Dict[str, Any]:
+    """
+    Same shape as risk_scan.classify_smoke_gate():
+    {"action", "allow_orders", "reason", "retry_after_sec", ...}
+    STOP if any (venue, symbol) is THIN at the given notional.
+    """
+    thin: List[str] = []
+    for (venue, symbol), est in estimates.items():
+        if classify_liquidity(est, notional=notional, max_slippage_bps=max_slippage_bps) == "THIN":
+            thin.append(f"{venue}:{symbol}")
+
+    if not estimates:
+        return {
+            "action": "STOP",
+            "allow_orders": False,
+            "reason": "no_liquidity_data",
+            "retry_after_sec": 0,
+            "thin": [],
+        }
+
+    if thin:
+        return {
+            "action": "STOP",
+            "allow_orders": False,
+            "reason": f"liquidity_thin(>{max_slippage_bps}bps@{notional:g}):{','.join(sorted(thin))[:120]}",
+            "retry_after_sec": 0,
+            "thin": sorted(thin),
+        }
+
+    return {
+        "action": "PROCEED",
+        "allow_orders": True,
+        "reason": "liquidity_ok",
+        "retry_after_sec": 0,
+        "thin": [],
+    }
@@ -0,0 +1,263 @@
+# utils/market_bus.py
+"""
+In-process market-data bus (NO-EXEC): one fetch, many consumers.
+
+- topics ("quote", "book", "kline", ...) each own a fixed-size ring of
+  events; every event gets the topic's next sequence number
+- events carry a conflation key ("venue:symbol[:interval]") and the bus
+  keeps the latest event per key next to the ring
+- a Subscription is just a cursor (next seq to read): consumers read at
+  their own pace and never block the publisher
+- a consumer that falls more than `capacity` events behind is conflated:
+  it gets the latest event of every key that changed since its cursor
+  (old intermediate values are dropped and counted), never an unbounded
+  backlog; with conflate=False it skips to the oldest retained event and
+  the gap is counted instead
+- poll(latest_only=True) always conflates (e.g. risk_scan only wants "now")
+
+Memory is capacity x topics + one event per key. BusPoller is the single
+fetch loop: it pulls quotes (and optionally books) from every adapter and
+publishes them.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from adapters.base import TradingAdapter
+from adapters.klines import Klines
+
+DEFAULT_CAPACITY = 4096
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class BusEvent(NamedTuple):
+    topic: str
+    seq: int
+    ts_ms: int
+    key: str
+    data: Any       # quote: (bid, ask) / book: (bids, asks) / kline: Klines
+
+
+class _Topic:
+    __slots__ = ("name", "capacity", "buf", "next_seq", "latest", "cond")
+
+    def __init__(self, name: str, capacity: int) -> None:
+        self.name = name
+        self.capacity = capacity
+        self.buf: List[Optional[BusEvent]] = [None] * capacity
+        self.next_seq = 1
+        self.latest: Dict[str, BusEvent] = {}
+        self.cond = threading.Condition(threading.Lock())
+
+
+class Subscription:
+    def __init__(self, bus: "MarketBus", topic: _Topic, name: str, *, conflate: bool, cursor: int) -> None:
+        self.bus = bus
+        self.name = name
+        self.conflate = conflate
+        self._t = topic
+        self.cursor = cursor
+        self.stats: Dict[str, int] = {"events": 0, "conflated": 0, "gaps": 0, "lagged": 0}
+
+    @property
+    def topic(self) -> str:
+        return self._t.name
+
+    def lag(self) -> int:
+        """Events published but not yet read."""
+        return self._t.next_seq - self.cursor
+
+    def poll(
+        self,
+        max_n: Optional[int] = None,
+        *,
+        timeout: float = 0.0,
+        latest_only: bool = False,
+    ) -> List[BusEvent]:
+        """
+        Next events in sequence order (waits up to `timeout` sec when none).
+        Fallen behind -> conflated (or gap-skipped); see module doc.
+        """
+        t = self._t
+        with t.cond:
+            if t.next_seq == self.cursor and timeout > 0:
+                t.cond.wait_for(lambda: t.next_seq != self.cursor, timeout)
+            head = t.next_seq
+            if head == self.cursor:
+                return []
+            oldest = max(1, head - t.capacity)
+            if latest_only or self.cursor < oldest:
+                if self.cursor < oldest:
+                    self.stats["lagged"] += 1
+                if latest_only or self.conflate:
+                    out = sorted((e for e in t.latest.values() if e.seq >= self.cursor), key=lambda e: e.seq)
+                    self.stats["conflated"] += (head - self.cursor) - len(out)
+                    self.stats["events"] += len(out)
+                    self.cursor = head
+                    return out
+                self.stats["gaps"] += oldest - self.cursor
+                self.cursor = oldest
+            end = head if max_n is None else min(head, self.cursor + max_n)
+            cap, buf = t.capacity, t.buf
+            out = [buf[s % cap] for s in range(self.cursor, end)]  # type: ignore[misc]
+            self.cursor = end
+        self.stats["events"] += len(out)
+        return out
+
+    def close(self) -> None:
+        self.bus._unsubscribe(self)
+
+
+class MarketBus:
+    def __init__(self, *, capacity: int = DEFAULT_CAPACITY) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.capacity = capacity
+        self._topics: Dict[str, _Topic] = {}
+        self._lock = threading.Lock()
+        self._subs: List[Subscription] = []
+
+    def _topic(self, name: str) -> _Topic:
+        t = self._topics.get(name)
+        if t is None:
+            with self._lock:
+                t = self._topics.get(name)
+                if t is None:
+                    t = self._topics[name] = _Topic(name, self.capacity)
+        return t
+
+    # -------------------------
+    # Publish
+    # -------------------------
+    def publish(self, topic: str, key: str, data: Any, *, ts_ms: Optional[int] = None) -> int:
+        t = self._topic(topic)
+        ts = _now_ms() if ts_ms is None else int(ts_ms)
+        with t.cond:
+            seq = t.next_seq
+            ev = BusEvent(topic, seq, ts, key, data)
+            t.buf[seq % t.capacity] = ev
+            t.latest[key] = ev
+            t.next_seq = seq + 1
+            t.cond.notify_all()
+        return seq
+
+    def publish_quote(self, venue: str, symbol: str, bid: float, ask: float, *, ts_ms: Optional[int] = None) -> int:
+        return self.publish("quote", f"{venue}:{symbol}", (float(bid), float(ask)), ts_ms=ts_ms)
+
+    def publish_book(
+        self,
+        venue: str,
+        symbol: str,
+        bids: Sequence[Tuple[float, float]],
+        asks: Sequence[Tuple[float, float]],
+        *,
+        ts_ms: Optional[int] = None,
+    ) -> int:
+        return self.publish("book", f"{venue}:{symbol}", (bids, asks), ts_ms=ts_ms)
+
+    def publish_klines(self, venue: str, k: Klines, *, ts_ms: Optional[int] = None) -> int:
+        return self.publish("kline", f"{venue}:{k.symbol}:{k.interval}", k, ts_ms=ts_ms)
+
+    # -------------------------
+    # Consume
+    # -------------------------
+    def subscribe(self, topic: str, name: str = "", *, conflate: bool = True, from_start: bool = False) -> Subscription:
+        """New cursor at the head (or the oldest retained event with from_start)."""
+        t = self._topic(topic)
+        with t.cond:
+            cursor = max(1, t.next_seq - t.capacity) if from_start else t.next_seq
+        sub = Subscription(self, t, name or f"{topic}#{len(self._subs)}", conflate=conflate, cursor=cursor)
+        with self._lock:
+            self._subs.append(sub)
+        return sub
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+
+    def latest(self, topic: str, key: str) -> Optional[BusEvent]:
+        t = self._topics.get(topic)
+        return t.latest.get(key) if t is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subs = list(self._subs)
+        return {
+            "topics": {n: {"seq": t.next_seq - 1, "keys": len(t.latest)} for n, t in self._topics.items()},
+            "subscribers": {s.name: dict(s.stats, lag=s.lag(), topic=s.topic) for s in subs},
+        }
+
+
+class BusPoller:
+    """
+    The one fetch loop: quotes (and books with book_depth > 0) for every
+    adapter x symbol every interval_sec, published on the bus.
+    """
+
+    def __init__(
+        self,
+        bus: MarketBus,
+        adapters: Sequence[TradingAdapter],
+        symbols: Sequence[str],
+        *,
+        interval_sec: float = 1.0,
+        book_depth: int = 0,
+        max_workers: int = 16,
+    ) -> None:
+        self.bus = bus
+        self.adapters = list(adapters)
+        self.symbols = list(symbols)
+        self.interval_sec = interval_sec
+        self.book_depth = book_depth
+        self.max_workers = max_workers
+        self.errors: Dict[str, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll_once(self) -> Dict[str, str]:
+        """One round; returns {"venue:symbol": error} for failed fetches."""
+        jobs = [(a, s) for a in self.adapters for s in self.symbols]
+        errors: Dict[str, str] = {}
+
+        def _one(job: Tuple[TradingAdapter, str]) -> None:
+            a, sym = job
+            try:
+                bid, ask = a.get_best_bid_ask(sym)
+                self.bus.publish_quote(a.name, sym, bid, ask)
+                if self.book_depth > 0:
+                    bids, asks = a.get_order_book(sym, limit=self.book_depth)
+                    self.bus.publish_book(a.name, sym, bids, asks)
+            except Exception as e:
+                errors[f"{a.name}:{sym}"] = repr(e)[:200]
+
+        if jobs:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(jobs)))) as pool:
+                list(pool.map(_one, jobs))
+        self.errors = errors
+        return errors
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="bus-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            t0 = time.monotonic()
+            self.poll_once()
+            self._stop.wait(max(0.0, self.interval_sec - (time.monotonic() - t0)))
@@ -0,0 +1,284 @@
+# utils/order_store.py
+"""
+Own-order state store (one per venue).
+
+Live orders indexed by order_id, client_order_id and symbol, so
+"open orders for X" and "exposure per symbol" are answered without a
+request and without scanning every order.
+
+Transitions come from:
+- REST responses (place / get_order / get_open_orders): apply(OrderStatus)
+- batch results: apply_result(OrderRequest, OrderResult)
+- private stream events: apply() with a parsed row
+and a scheduled reconcile() against get_open_orders() repairs anything the
+stream missed (orders gone from the venue are resolved via get_order).
+
+Rules: terminal states (filled / canceled / rejected / expired) are sticky,
+filled_qty never goes backwards. Exposure is kept incrementally as the
+remaining (unfilled) qty / notional of open orders per symbol and side.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import replace
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from adapters.base import OrderRequest, OrderResult, OrderStatus, TradingAdapter
+
+TERMINAL = frozenset({"filled", "canceled", "rejected", "expired"})
+# get_order() error codes that confirm the venue has no such order
+# (adapters: order_not_found, Bybit retCode 110001, MEXC -2013)
+NOT_FOUND_CODES = frozenset({"order_not_found", "110001", "-2013"})
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class _Exposure:
+    __slots__ = ("buy_qty", "sell_qty", "buy_notional", "sell_notional", "orders")
+
+    def __init__(self) -> None:
+        self.buy_qty = 0.0
+        self.sell_qty = 0.0
+        self.buy_notional = 0.0
+        self.sell_notional = 0.0
+        self.orders = 0
+
+    def add(self, o: OrderStatus, sign: float) -> None:
+        rem = max(0.0, o.qty - o.filled_qty) * sign
+        px = o.avg_price if o.order_type == "market" else _limit_price(o)
+        if o.side == "buy":
+            self.buy_qty += rem
+            self.buy_notional += rem * (px or 0.0)
+        else:
+            self.sell_qty += rem
+            self.sell_notional += rem * (px or 0.0)
+        self.orders += 1 if sign > 0 else -1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "open_orders": self.orders,
+            "buy_qty": round(self.buy_qty, 12),
+            "sell_qty": round(self.sell_qty, 12),
+            "net_qty": round(self.buy_qty - self.sell_qty, 12),
+            "buy_notional": round(self.buy_notional, 8),
+            "sell_notional": round(self.sell_notional, 8),
+        }
+
+
+def _limit_price(o: OrderStatus) -> Optional[float]:
+    raw = o.raw or {}
+    for k in ("price", "orderPrice"):
+        v = raw.get(k)
+        try:
+            if v not in (None, ""):
+                return float(v)
+        except (TypeError, ValueError):
+            continue
+    return o.avg_price
+
+
+class OrderStore:
+    def __init__(self, venue: str = "") -> None:
+        self.venue = venue
+        self._lock = threading.RLock()
+        self._orders: Dict[str, OrderStatus] = {}          # order_id -> latest status
+        self._by_client: Dict[str, str] = {}               # client_order_id -> order_id
+        self._open_by_symbol: Dict[str, Set[str]] = {}     # symbol -> open order_ids
+        self._exposure: Dict[str, _Exposure] = {}
+        self._updated_ms: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {"applied": 0, "ignored": 0, "reconciles": 0, "repaired": 0}
+
+    # -------------------------
+    # Transitions
+    # -------------------------
+    def apply(self, st: OrderStatus, *, ts_ms: Optional[int] = None) -> bool:
+        """Apply one observed state. Returns False when ignored (stale / regressive)."""
+        if not st.order_id:
+            return False
+        ts = ts_ms if ts_ms is not None else _now_ms()
+        with self._lock:
+            prev = self._orders.get(st.order_id)
+            if prev is not None:
+                if prev.status in TERMINAL and st.status not in TERMINAL:
+                    self.stats["ignored"] += 1
+                    return False
+                if st.filled_qty < prev.filled_qty:
+                    self.stats["ignored"] += 1
+                    return False
+                if st.client_order_id is None and prev.client_order_id is not None:
+                    st = replace(st, client_order_id=prev.client_order_id)
+                if st.raw is None and prev.raw is not None:
+                    st = replace(st, raw=prev.raw)
+                self._unindex_open(prev)
+
+            self._orders[st.order_id] = st
+            self._updated_ms[st.order_id] = ts
+            if st.client_order_id:
+                self._by_client[st.client_order_id] = st.order_id
+            if st.status not in TERMINAL:
+                self._open_by_symbol.setdefault(st.symbol, set()).add(st.order_id)
+                self._exposure.setdefault(st.symbol, _Exposure()).add(st, +1.0)
+            self.stats["applied"] += 1
+            return True
+
+    def apply_many(self, items: Iterable[OrderStatus], *, ts_ms: Optional[int] = None) -> int:
+        return sum(1 for st in items if self.apply(st, ts_ms=ts_ms))
+
+    def apply_result(self, req: OrderRequest, res: OrderResult) -> bool:
+        """Track an order from a place_orders() result (accepted -> new, else rejected)."""
+        if not res.order_id:
+            return False
+        return self.apply(
+            OrderStatus(
+                order_id=res.order_id,
+                client_order_id=res.client_order_id or req.client_order_id,
+                symbol=res.symbol or req.symbol,
+                side="buy" if str(req.side).lower() == "buy" else "sell",
+                order_type="market" if str(req.order_type).lower() == "market" else "limit",
+                qty=float(req.qty),
+                filled_qty=0.0,
+                avg_price=None,
+                status="new" if res.ok else "rejected",
+                raw={"price": req.price} if req.price is not None else None,
+            )
+        )
+
+    def _unindex_open(self, prev: OrderStatus) -> None:
+        ids = self._open_by_symbol.get(prev.symbol)
+        if ids is not None and prev.order_id in ids:
+            ids.discard(prev.order_id)
+            self._exposure[prev.symbol].add(prev, -1.0)
+
+    def forget_terminal(self, older_than_sec: float = 3600.0) -> int:
+        """Drop finished orders not updated for `older_than_sec` (bounded memory)."""
+        cutoff = _now_ms() - int(older_than_sec * 1000)
+        with self._lock:
+            gone = [
+                oid for oid, st in self._orders.items()
+                if st.status in TERMINAL and self._updated_ms.get(oid, 0) < cutoff
+            ]
+            for oid in gone:
+                st = self._orders.pop(oid)
+                self._updated_ms.pop(oid, None)
+                if st.client_order_id and self._by_client.get(st.client_order_id) == oid:
+                    del self._by_client[st.client_order_id]
+            return len(gone)
+
+    # -------------------------
+    # Queries (no I/O)
+    # -------------------------
+    def get(self, order_id: str) -> Optional[OrderStatus]:
+        with self._lock:
+            return self._orders.get(order_id)
+
+    def by_client_id(self, client_order_id: str) -> Optional[OrderStatus]:
+        with self._lock:
+            oid = self._by_client.get(client_order_id)
+            return self._orders.get(oid) if oid else None
+
+    def open_orders(self, symbol: Optional[str] = None) -> List[OrderStatus]:
+        with self._lock:
+            if symbol is not None:
+                return [self._orders[i] for i in self._open_by_symbol.get(symbol, ())]
+            return [self._orders[i] for ids in self._open_by_symbol.values() for i in ids]
+
+    def open_count(self, symbol: str) -> int:
+        with self._lock:
+            return len(self._open_by_symbol.get(symbol, ()))
+
+    def exposure(self, symbol: str) -> Dict[str, Any]:
+        with self._lock:
+            e = self._exposure.get(symbol)
+            return (e or _Exposure()).to_dict()
+
+    def exposures(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {s: e.to_dict() for s, e in self._exposure.items() if e.orders}
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return sorted(s for s, ids in self._open_by_symbol.items() if ids)
+
+    # -------------------------
+    # Reconciliation
+    # -------------------------
+    def reconcile(self, adapter: TradingAdapter, symbols: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Compare with the venue's open orders and repair:
+        - open on venue, unknown / stale here -> applied
+        - open here, gone from venue -> resolved with get_order(); marked expired
+          only when the venue confirms it does not know the order, otherwise
+          left open for the next cycle (a timeout must not hide exposure)
+        symbols=None: every symbol with open orders here (plus a venue-wide query
+        when the adapter supports it).
+        """
+        syms: List[Optional[str]] = list(symbols) if symbols else list(self.symbols()) or [None]
+        seen: Set[str] = set()
+        added = resolved = unresolved = 0
+        errors: List[str] = []
+        for sym in syms:
+            try:
+                venue_open = adapter.get_open_orders(sym) or []
+            except Exception as e:
+                errors.append(f"{sym}: {e!r}"[:200])
+                continue
+            for st in venue_open:
+                seen.add(st.order_id)
+                known = self.get(st.order_id)
+                if known is None or known.status != st.status or known.filled_qty != st.filled_qty:
+                    if self.apply(st):
+                        added += 1
+
+            for st in self.open_orders(sym) if sym else []:
+                if st.order_id in seen:
+                    continue
+                try:
+                    final: Any = adapter.get_order(st.order_id, symbol=st.symbol)
+                except Exception as e:
+                    if getattr(e, "code", None) not in NOT_FOUND_CODES:
+                        errors.append(f"{st.order_id}: {e!r}"[:200])
+                        unresolved += 1
+                        continue
+                    # venue no longer lists it and does not know it
+                    final = replace(st, status="expired")
+                if not isinstance(final, OrderStatus):
+                    # dry-run payload / unparsed answer: nothing confirmed
+                    unresolved += 1
+                    continue
+                self.apply(final)
+                resolved += 1
+
+        with self._lock:
+            self.stats["reconciles"] += 1
+            self.stats["repaired"] += added + resolved
+        return {"venue": self.venue, "symbols": len(syms), "added": added, "resolved": resolved,
+                "unresolved": unresolved, "errors": errors}
+
+    def start_reconcile(
+        self,
+        adapter: TradingAdapter,
+        *,
+        interval_sec: float = 30.0,
+        symbols: Optional[Sequence[str]] = None,
+    ) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def _loop() -> None:
+            while not self._stop.wait(interval_sec):
+                try:
+                    self.reconcile(adapter, symbols)
+                except Exception:
+                    pass
+
+        self._thread = threading.Thread(target=_loop, name=f"{self.venue or 'orders'}-reconcile", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,245 @@
+# utils/regime_stats.py
+"""
+Streaming regime statistics (BTC daily regime inputs for tools/risk_scan.py).
+
+Every price tick updates in O(1):
+- rolling mean / variance of bar closes (sliding-window Welford: add the
+  new value, remove the evicted one) -> true Bollinger band / width / %b
+- realized volatility: rolling sum of squared log returns between closes
+- EWMA of returns and of squared return deviation (RiskMetrics style)
+- abs_ret: |last - previous close| / previous close (ratio)
+
+Closed bars form the window; the live price is folded in as the provisional
+last value without mutating state, so a regime change shows on the tick
+that causes it. A tick in a new bar (UTC buckets, default 1d) closes the
+previous bar at its last price.
+"""
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+from utils.resample import bucket_start
+
+_RESYNC_EVERY = 10_000      # recompute sums from the window now and then (float drift)
+
+
+class RollingStats:
+    """Mean / population variance of the last `window` values."""
+
+    def __init__(self, window: int) -> None:
+        self.window = max(1, int(window))
+        self._buf: Deque[float] = deque()
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._pushes = 0
+
+    @staticmethod
+    def _add(n: int, mean: float, m2: float, x: float) -> Tuple[int, float, float]:
+        n += 1
+        d = x - mean
+        mean += d / n
+        return n, mean, m2 + d * (x - mean)
+
+    @staticmethod
+    def _remove(n: int, mean: float, m2: float, x: float) -> Tuple[int, float, float]:
+        if n <= 1:
+            return 0, 0.0, 0.0
+        n -= 1
+        new_mean = mean - (x - mean) / n
+        return n, new_mean, max(0.0, m2 - (x - mean) * (x - new_mean))
+
+    def push(self, x: float) -> None:
+        n, mean, m2 = self.n, self.mean, self._m2
+        if len(self._buf) >= self.window:
+            n, mean, m2 = self._remove(n, mean, m2, self._buf.popleft())
+        self.n, self.mean, self._m2 = self._add(n, mean, m2, x)
+        self._buf.append(x)
+        self._pushes += 1
+        if self._pushes % _RESYNC_EVERY == 0:
+            self._resync()
+
+    def _resync(self) -> None:
+        n, mean, m2 = 0, 0.0, 0.0
+        for x in self._buf:
+            n, mean, m2 = self._add(n, mean, m2, x)
+        self.n, self.mean, self._m2 = n, mean, m2
+
+    def var(self) -> float:
+        return self._m2 / self.n if self.n else 0.0
+
+    def with_value(self, x: float) -> Tuple[int, float, float]:
+        """(n, mean, variance) as if `x` were pushed (state untouched)."""
+        n, mean, m2 = self.n, self.mean, self._m2
+        if len(self._buf) >= self.window:
+            n, mean, m2 = self._remove(n, mean, m2, self._buf[0])
+        n, mean, m2 = self._add(n, mean, m2, x)
+        return n, mean, m2 / n
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+
+class RollingSum:
+    def __init__(self, window: int) -> None:
+        self.window = max(1, int(window))
+        self._buf: Deque[float] = deque()
+        self.total = 0.0
+        self._pushes = 0
+
+    def push(self, x: float) -> None:
+        if len(self._buf) >= self.window:
+            self.total -= self._buf.popleft()
+        self._buf.append(x)
+        self.total += x
+        self._pushes += 1
+        if self._pushes % _RESYNC_EVERY == 0:
+            self.total = math.fsum(self._buf)
+
+    def with_value(self, x: float) -> Tuple[int, float]:
+        """(n, sum) as if `x` were pushed."""
+        if len(self._buf) >= self.window:
+            return len(self._buf), self.total - self._buf[0] + x
+        return len(self._buf) + 1, self.total + x
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+
+@dataclass(frozen=True)
+class RegimeInputs:
+    ts: int
+    last: Optional[float]
+    prev_close: Optional[float]
+    abs_ret: float                      # ratio
+    bb_mid: Optional[float]
+    bb_upper: Optional[float]
+    bb_lower: Optional[float]
+    bb_width_pct: float                 # (upper - lower) / mid * 100
+    percent_b: Optional[float]
+    realized_vol: Optional[float]       # annualized
+    ewma_ret: Optional[float]           # per bar
+    ewma_vol: Optional[float]           # annualized
+    bars: int                           # closed bars in the BB window
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class RegimeStats:
+    def __init__(
+        self,
+        *,
+        bar_ms: int = 86_400_000,
+        bb_window: int = 20,
+        bb_k: float = 2.0,
+        rv_window: int = 30,
+        ewma_halflife: float = 10.0,
+        periods_per_year: float = 365.0,
+    ) -> None:
+        self.bar_ms = bar_ms
+        self.bb_k = bb_k
+        self.periods_per_year = periods_per_year
+        self.alpha = 1.0 - 0.5 ** (1.0 / max(ewma_halflife, 1e-9))
+        self._closes = RollingStats(bb_window)
+        self._rv = RollingSum(rv_window)
+        self._ewma_m: Optional[float] = None
+        self._ewma_v = 0.0
+        self.prev_close: Optional[float] = None
+        self.bar_t: Optional[int] = None
+        self.last: Optional[float] = None
+        self.last_ts = 0
+
+    # -------------------------
+    # Ingest
+    # -------------------------
+    def seed_closes(self, closes: Iterable[float], *, bar_t: Optional[int] = None) -> None:
+        """Closed bars, ascending (e.g. get_daily_closes() without its open last bar)."""
+        for c in closes:
+            self.on_close(float(c))
+        if bar_t is not None:
+            self.bar_t = bucket_start(int(bar_t), self.bar_ms)
+
+    def on_close(self, close: float) -> None:
+        """One closed bar (bar feeds call this directly; ticks do it on rollover)."""
+        if close <= 0:
+            return
+        prev = self.prev_close
+        if prev is not None:
+            r = math.log(close / prev)
+            self._rv.push(r * r)
+            if self._ewma_m is None:
+                self._ewma_m = r
+            else:
+                d = r - self._ewma_m
+                self._ewma_m += self.alpha * d
+                self._ewma_v = (1.0 - self.alpha) * (self._ewma_v + self.alpha * d * d)
+        self._closes.push(close)
+        self.prev_close = close
+
+    def on_price(self, ts_ms: int, price: float) -> None:
+        if price <= 0:
+            return
+        b = bucket_start(int(ts_ms), self.bar_ms)
+        if self.bar_t is not None and b > self.bar_t and self.last is not None:
+            self.on_close(self.last)
+        if self.bar_t is None or b >= self.bar_t:
+            self.bar_t = b
+            self.last = float(price)
+            self.last_ts = int(ts_ms)
+
+    # -------------------------
+    # Read
+    # -------------------------
+    def snapshot(self) -> RegimeInputs:
+        last, prev = self.last, self.prev_close
+        if last is not None:
+            n, mean, var = self._closes.with_value(last)
+        else:
+            n, mean, var = self._closes.n, self._closes.mean, self._closes.var()
+
+        bb_mid = bb_up = bb_lo = pb = None
+        width = 0.0
+        if n:
+            sd = math.sqrt(max(var, 0.0))
+            bb_mid, bb_up, bb_lo = mean, mean + self.bb_k * sd, mean - self.bb_k * sd
+            width = (bb_up - bb_lo) / mean * 100.0 if mean else 0.0
+            if last is not None and bb_up > bb_lo:
+                pb = (last - bb_lo) / (bb_up - bb_lo)
+
+        abs_ret = 0.0
+        rv = ew_m = ew_vol = None
+        r_live = math.log(last / prev) if (last is not None and prev) else None
+        if r_live is not None:
+            abs_ret = abs(last - prev) / prev            # type: ignore[operator]
+            k, s = self._rv.with_value(r_live * r_live)
+            rv = math.sqrt(s / k * self.periods_per_year) if k else None
+        elif len(self._rv):
+            rv = math.sqrt(self._rv.total / len(self._rv) * self.periods_per_year)
+
+        if self._ewma_m is not None:
+            m, v = self._ewma_m, self._ewma_v
+            if r_live is not None:
+                d = r_live - m
+                m, v = m + self.alpha * d, (1.0 - self.alpha) * (v + self.alpha * d * d)
+            ew_m, ew_vol = m, math.sqrt(v * self.periods_per_year)
+
+        return RegimeInputs(
+            ts=self.last_ts or int(time.time() * 1000),
+            last=last,
+            prev_close=prev,
+            abs_ret=abs_ret,
+            bb_mid=bb_mid,
+            bb_upper=bb_up,
+            bb_lower=bb_lo,
+            bb_width_pct=width,
+            percent_b=pb,
+            realized_vol=rv,
+            ewma_ret=ew_m,
+            ewma_vol=ew_vol,
+            bars=len(self._closes),
+        )
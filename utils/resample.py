@@ -0,0 +1,294 @@
+# utils/resample.py
+"""
+Multi-timeframe candles from one base series (no extra kline requests).
+
+- resample(): 1m (or any finer) Klines -> 5m / 15m / 1h / 4h / 1d / 1w bars,
+  vectorized with NumPy (reduceat over bucket boundaries) when installed,
+  a single grouped pass otherwise
+- bars_from_trades(): the same from (ts, price, qty) trade columns
+- Resampler: incremental; every base-bar update (or trade) folds into all
+  targets in O(1): each target keeps its closed bars, an accumulator of the
+  finished base bars of the open bucket and the still-open base bar, which
+  may be revised any number of times until the next base bar starts
+
+Buckets are UTC-aligned like the venues' own candles (4h at 00/04/08..,
+1d at 00:00, 1w on Monday 00:00).
+"""
+from __future__ import annotations
+
+import itertools
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from adapters.base import TradingAdapter
+from adapters.klines import INTERVAL_MS, Klines, KlineRow, interval_ms
+
+try:
+    import numpy as np
+except ImportError:  # optional: grouped pure-Python fallback
+    np = None  # type: ignore[assignment]
+
+DEFAULT_TARGETS = ("5m", "15m", "1h", "4h", "1d")
+_WEEK_MS = INTERVAL_MS["1w"]
+_MONDAY_OFFSET_MS = 4 * 86_400_000       # 1970-01-01 was a Thursday
+
+
+def bucket_start(ts_ms: int, step_ms: int) -> int:
+    if step_ms == _WEEK_MS:
+        return ts_ms - (ts_ms - _MONDAY_OFFSET_MS) % step_ms
+    return ts_ms - ts_ms % step_ms
+
+
+def _check_target(base: str, target: str) -> int:
+    b, t = interval_ms(base), interval_ms(target)
+    if t < b or (t != _WEEK_MS and t % b) or (t == _WEEK_MS and _WEEK_MS % b):
+        raise ValueError(f"cannot build {target} bars from {base}")
+    return t
+
+
+# -------------------------
+# Batch (vectorized)
+# -------------------------
+def _group(
+    symbol: str,
+    interval: str,
+    t: Any, o: Any, h: Any, lo: Any, c: Any, v: Any,
+) -> Klines:
+    """Group ascending rows by bucket of `interval`; columns are array.array."""
+    step = interval_ms(interval)
+    n = len(t)
+    out = Klines(symbol, interval)
+    if n == 0:
+        return out
+    if np is not None:
+        tt = np.frombuffer(t, dtype=np.int64)
+        if step == _WEEK_MS:
+            b = tt - (tt - _MONDAY_OFFSET_MS) % step
+        else:
+            b = tt - tt % step
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(b)) + 1))
+        ends = np.concatenate((starts[1:], [n])) - 1
+        cols = (
+            b[starts],
+            np.frombuffer(o, dtype=np.float64)[starts],
+            np.maximum.reduceat(np.frombuffer(h, dtype=np.float64), starts),
+            np.minimum.reduceat(np.frombuffer(lo, dtype=np.float64), starts),
+            np.frombuffer(c, dtype=np.float64)[ends],
+            np.add.reduceat(np.frombuffer(v, dtype=np.float64), starts),
+        )
+        for dst, src in zip(out.columns(), cols):
+            dst.frombytes(np.ascontiguousarray(src).tobytes())
+        return out
+
+    for key, grp in itertools.groupby(range(n), key=lambda i: bucket_start(t[i], step)):
+        idx = list(grp)
+        i0, i1 = idx[0], idx[-1]
+        out.open_time.append(key)
+        out.open.append(o[i0])
+        out.high.append(max(h[i] for i in idx))
+        out.low.append(min(lo[i] for i in idx))
+        out.close.append(c[i1])
+        out.volume.append(sum(v[i] for i in idx))
+    return out
+
+
+def resample(k: Klines, interval: str) -> Klines:
+    """Coarser bars from an ascending base series (the last bar may be partial)."""
+    _check_target(k.interval, interval)
+    return _group(k.symbol, interval, k.open_time, k.open, k.high, k.low, k.close, k.volume)
+
+
+def bars_from_trades(
+    symbol: str,
+    interval: str,
+    ts_ms: Sequence[int],
+    price: Sequence[float],
+    qty: Sequence[float],
+) -> Klines:
+    """OHLCV from ascending trades (ts_ms / price / qty columns)."""
+    t = ts_ms if isinstance(ts_ms, array) and ts_ms.typecode == "q" else array("q", ts_ms)
+    p = price if isinstance(price, array) and price.typecode == "d" else array("d", price)
+    q = qty if isinstance(qty, array) and qty.typecode == "d" else array("d", qty)
+    return _group(symbol, interval, t, p, p, p, p, q)
+
+
+# -------------------------
+# Incremental
+# -------------------------
+class _Bar:
+    __slots__ = ("t", "o", "h", "l", "c", "v")
+
+    def __init__(self, t: int, o: float, h: float, l: float, c: float, v: float) -> None:
+        self.t, self.o, self.h, self.l, self.c, self.v = t, o, h, l, c, v
+
+    def fold(self, o: "_Bar") -> None:
+        if o.h > self.h:
+            self.h = o.h
+        if o.l < self.l:
+            self.l = o.l
+        self.c = o.c
+        self.v += o.v
+
+    def row(self) -> KlineRow:
+        return (self.t, self.o, self.h, self.l, self.c, self.v)
+
+
+class _Target:
+    __slots__ = ("interval", "step", "closed", "acc")
+
+    def __init__(self, symbol: str, interval: str) -> None:
+        self.interval = interval
+        self.step = interval_ms(interval)
+        self.closed = Klines(symbol, interval)
+        self.acc: Optional[_Bar] = None          # finished base bars of the open bucket
+
+
+class Resampler:
+    """
+    One symbol, one base interval, many targets.
+      r = Resampler("BTCUSDT", base="1m")
+      r.load(adapter.get_klines("BTCUSDT", "1m", start_ms))   # seed from stored 1m
+      r.update_bar(t, o, h, l, c, v)      # stream: base bar (new or revised)
+      r.update_trade(ts, price, qty)      # or raw trades
+      r.bars("1h"); r.open_bar("1d"); r.closes("1d", 2)
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        *,
+        base: str = "1m",
+        targets: Sequence[str] = DEFAULT_TARGETS,
+        max_bars: int = 5000,
+    ) -> None:
+        self.symbol = symbol
+        self.base = base
+        self.base_step = interval_ms(base)
+        for t in targets:
+            _check_target(base, t)
+        self._targets: Dict[str, _Target] = {t: _Target(symbol, t) for t in targets}
+        self.max_bars = max_bars
+        self._cur: Optional[_Bar] = None          # open base bar (revisable)
+        self.stats: Dict[str, int] = {"bars": 0, "revisions": 0, "trades": 0, "stale": 0}
+
+    # -------------------------
+    # Ingest
+    # -------------------------
+    def load(self, k: Klines) -> None:
+        """Seed from a stored base series (replaces state). The last row stays open."""
+        if k.interval != self.base:
+            raise ValueError(f"expected {self.base} bars, got {k.interval}")
+        n = len(k)
+        if n == 0:
+            return
+        done = Klines(k.symbol, k.interval, *(col[:n - 1] for col in k.columns()))
+        last = _Bar(*(col[n - 1] for col in k.columns()))
+        for tg in self._targets.values():
+            r = resample(done, tg.interval) if len(done) else Klines(self.symbol, tg.interval)
+            tg.acc = None
+            if len(r) and r.open_time[-1] == bucket_start(last.t, tg.step):
+                tg.acc = _Bar(*(col[-1] for col in r.columns()))
+                for col in r.columns():
+                    del col[-1]
+            r.symbol = self.symbol
+            tg.closed = r
+            self._trim(tg)
+        self._cur = last
+        self.stats["bars"] += n
+
+    def update_bar(self, t: int, o: float, h: float, l: float, c: float, v: float) -> bool:
+        """Base bar `t` (new, or a revision of the open one). Older bars are ignored."""
+        cur = self._cur
+        if cur is not None:
+            if t == cur.t:
+                cur.o, cur.h, cur.l, cur.c, cur.v = o, h, l, c, v
+                self.stats["revisions"] += 1
+                return True
+            if t < cur.t:
+                self.stats["stale"] += 1
+                return False
+            self._finish(cur)
+        self._cur = _Bar(t, o, h, l, c, v)
+        self.stats["bars"] += 1
+        return True
+
+    def update_trade(self, ts_ms: int, price: float, qty: float) -> bool:
+        t = bucket_start(ts_ms, self.base_step)
+        cur = self._cur
+        self.stats["trades"] += 1
+        if cur is not None and t == cur.t:
+            if price > cur.h:
+                cur.h = price
+            if price < cur.l:
+                cur.l = price
+            cur.c = price
+            cur.v += qty
+            return True
+        return self.update_bar(t, price, price, price, price, qty)
+
+    def _finish(self, bar: _Bar) -> None:
+        """Fold a finished base bar into every target (closing buckets it leaves)."""
+        for tg in self._targets.values():
+            b = bucket_start(bar.t, tg.step)
+            acc = tg.acc
+            if acc is not None and acc.t == b:
+                acc.fold(bar)
+                continue
+            if acc is not None:
+                for col, x in zip(tg.closed.columns(), acc.row()):
+                    col.append(x)
+                self._trim(tg)
+            tg.acc = _Bar(b, bar.o, bar.h, bar.l, bar.c, bar.v)
+
+    def _trim(self, tg: _Target) -> None:
+        extra = len(tg.closed) - self.max_bars
+        if extra > self.max_bars // 4:          # amortized: trim in chunks
+            for col in tg.closed.columns():
+                del col[:extra]
+
+    # -------------------------
+    # Read
+    # -------------------------
+    def open_bar(self, interval: str) -> Optional[KlineRow]:
+        """Current (incomplete) bar of `interval`, including the open base bar."""
+        tg = self._targets[interval]
+        cur = self._cur
+        if cur is None:
+            return tg.acc.row() if tg.acc else None
+        b = bucket_start(cur.t, tg.step)
+        if tg.acc is not None and tg.acc.t == b:
+            out = _Bar(*tg.acc.row())
+            out.fold(cur)
+            return out.row()
+        # the open base bar starts a new bucket; acc (if any) is complete but not yet closed
+        return (b, cur.o, cur.h, cur.l, cur.c, cur.v)
+
+    def bars(self, interval: str, *, include_open: bool = True) -> Klines:
+        """Closed bars (+ the open one) as a columnar copy."""
+        tg = self._targets[interval]
+        out = Klines(self.symbol, interval, *(array(col.typecode, col) for col in tg.closed.columns()))
+        cur = self._cur
+        if cur is not None and tg.acc is not None and tg.acc.t != bucket_start(cur.t, tg.step):
+            for col, x in zip(out.columns(), tg.acc.row()):
+                col.append(x)
+        if include_open:
+            ob = self.open_bar(interval)
+            if ob is not None:
+                for col, x in zip(out.columns(), ob):
+                    col.append(x)
+        return out
+
+    def closes(self, interval: str, n: int) -> List[float]:
+        """Last `n` closes of `interval` (open bar last), ascending by time."""
+        return list(self.bars(interval).close[-n:])
+
+    def backfill(self, adapter: TradingAdapter, *, lookback_ms: int, now_ms: Optional[int] = None) -> int:
+        """Seed from the adapter's base-interval history (one paginated backfill for every target)."""
+        end = int(time.time() * 1000) if now_ms is None else int(now_ms)
+        k = adapter.get_klines(self.symbol, self.base, end - lookback_ms, end)
+        self.load(k)
+        return len(k)
+
+    def intervals(self) -> Tuple[str, ...]:
+        return tuple(self._targets)
@@ -0,0 +1,378 @@
+# utils/shm_ring.py
+"""
+Cross-process quote fan-out over shared memory (NO-EXEC).
+
+One publisher process owns the exchange connections and writes every quote
+into a named shared-memory segment; any number of worker processes attach
+read-only and map it zero-copy. N workers cost one set of venue requests.
+
+Segment layout (little-endian, records 64 bytes = one cache line):
+  header   64 B   magic "UBSM", version, record size, capacity, max_symbols,
+                  n_symbols, head (next seq), publisher pid, heartbeat ms
+  symbols  max_symbols x 32 B   "venue:SYMBOL" (utf-8, NUL padded)
+  latest   max_symbols x 64 B   newest quote per symbol id
+  ring     capacity x 64 B      every quote, slot = seq % capacity
+record: lock u64 | ts_ms i64 | sym_id u32 | flags u32 | bid ask bid_qty ask_qty f64
+
+Seqlock per record: the writer stores lock = 2*seq-1 (odd: being written),
+the fields, then lock = 2*seq (even: done). A reader copies the record and
+accepts it only if lock is even and unchanged across the copy. In the ring
+a lock beyond the expected seq means the slot was overwritten: the reader
+has fallen more than `capacity` quotes behind; it skips ahead and counts
+the lost quotes (poll() never returns a torn or out-of-order record).
+Aligned 8-byte stores are single copies on x86-64 / arm64, which is what
+the lock word relies on.
+"""
+from __future__ import annotations
+
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from adapters.base import AdapterError, ErrorClass
+
+try:
+    import numpy as np
+except ImportError:  # optional: structured zero-copy views
+    np = None  # type: ignore[assignment]
+
+MAGIC = b"UBSM"
+VERSION = 1
+DEFAULT_NAME = os.environ.get("UNIVBOT_SHM_NAME", "univbot-md")
+
+_HDR = struct.Struct("<4sHHIII")        # magic, version, rec_size, capacity, max_symbols, n_symbols
+_N_SYMBOLS_OFF = 16
+_HEAD_OFF = 24                          # u64 next seq
+_PID_OFF = 32                           # u32
+_HEARTBEAT_OFF = 40                     # i64 ms
+_HDR_SIZE = 64
+_NAME_SIZE = 32
+_REC = struct.Struct("<QqIIdddd8x")
+_LOCK = struct.Struct("<Q")
+_U64 = struct.Struct("<Q")
+_I64 = struct.Struct("<q")
+_U32 = struct.Struct("<I")
+REC_SIZE = _REC.size                    # 64
+
+if np is not None:
+    REC_DTYPE = np.dtype({
+        "names": ["lock", "ts_ms", "sym_id", "flags", "bid", "ask", "bid_qty", "ask_qty"],
+        "formats": ["<u8", "<i8", "<u4", "<u4", "<f8", "<f8", "<f8", "<f8"],
+        "offsets": [0, 8, 16, 20, 24, 32, 40, 48],
+        "itemsize": REC_SIZE,
+    })
+
+
+class ShmQuote(NamedTuple):
+    seq: int
+    ts_ms: int
+    key: str            # "venue:SYMBOL"
+    bid: float
+    ask: float
+    bid_qty: float
+    ask_qty: float
+
+
+def _layout(capacity: int, max_symbols: int) -> Tuple[int, int, int, int]:
+    """(symbols_off, latest_off, ring_off, total_size)"""
+    sym_off = _HDR_SIZE
+    latest_off = sym_off + max_symbols * _NAME_SIZE
+    ring_off = latest_off + max_symbols * REC_SIZE
+    return sym_off, latest_off, ring_off, ring_off + capacity * REC_SIZE
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _attach(name: str, *, untrack: bool) -> shared_memory.SharedMemory:
+    """Open an existing segment; untrack keeps this process's resource tracker from unlinking it at exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=not untrack)  # type: ignore[call-arg]
+    except TypeError:       # Python < 3.13: no track=
+        shm = shared_memory.SharedMemory(name=name)
+        if untrack:
+            from multiprocessing import resource_tracker
+            try:
+                resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+            except Exception:
+                pass
+        return shm
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True         # exists, owned by someone else
+    return True
+
+
+def _live_owner(buf: Any, stale_after_ms: int) -> Optional[str]:
+    """Why an existing segment must not be taken over (None: dead publisher / not ours)."""
+    if len(buf) < _HDR_SIZE or bytes(buf[:4]) != MAGIC:
+        return None
+    pid = _U32.unpack_from(buf, _PID_OFF)[0]
+    age = _now_ms() - _I64.unpack_from(buf, _HEARTBEAT_OFF)[0]
+    if not _pid_alive(pid) or age > stale_after_ms:
+        return None
+    return f"publisher pid {pid} alive, heartbeat {age}ms ago"
+
+
+class ShmQuoteWriter:
+    """
+    Single publisher. close(unlink=True) removes the segment.
+    An existing segment of the same name is taken over only when its
+    publisher is gone (pid not running, or no heartbeat for
+    `stale_after_ms`); a live one raises AdapterError(STOP, "shm_in_use")
+    instead of splitting the feed across two segments.
+    """
+
+    def __init__(
+        self,
+        name: str = DEFAULT_NAME,
+        *,
+        capacity: int = 65_536,
+        max_symbols: int = 4096,
+        stale_after_ms: int = 5_000,
+    ) -> None:
+        if capacity <= 0 or max_symbols <= 0:
+            raise ValueError("capacity and max_symbols must be > 0")
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self._sym_off, self._latest_off, self._ring_off, size = _layout(capacity, max_symbols)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            old = _attach(name, untrack=True)
+            try:
+                busy = _live_owner(old.buf, stale_after_ms)
+                if busy is not None:
+                    raise AdapterError(
+                        f"shm {name} in use: {busy}",
+                        error_class=ErrorClass.STOP,
+                        code="shm_in_use",
+                    )
+                # stale segment of a dead publisher: take it over (same name = same feed)
+                old.unlink()
+            finally:
+                old.close()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        self._ids: Dict[str, int] = {}
+        self._seq = 0
+        self._latest_seq: List[int] = [0] * max_symbols
+        _HDR.pack_into(self.buf, 0, MAGIC, VERSION, REC_SIZE, capacity, max_symbols, 0)
+        _U64.pack_into(self.buf, _HEAD_OFF, 1)
+        _U32.pack_into(self.buf, _PID_OFF, os.getpid())
+        self.heartbeat()
+
+    def symbol_id(self, key: str) -> int:
+        i = self._ids.get(key)
+        if i is not None:
+            return i
+        i = len(self._ids)
+        if i >= self.max_symbols:
+            raise AdapterError(f"shm symbol table full ({self.max_symbols})", error_class=ErrorClass.STOP)
+        raw = key.encode("utf-8")[:_NAME_SIZE]
+        off = self._sym_off + i * _NAME_SIZE
+        self.buf[off:off + _NAME_SIZE] = raw.ljust(_NAME_SIZE, b"\0")
+        self._ids[key] = i
+        _U32.pack_into(self.buf, _N_SYMBOLS_OFF, i + 1)     # name first, then publish the count
+        return i
+
+    def write(
+        self,
+        key: str,
+        bid: float,
+        ask: float,
+        *,
+        bid_qty: float = 0.0,
+        ask_qty: float = 0.0,
+        ts_ms: Optional[int] = None,
+    ) -> int:
+        sid = self.symbol_id(key)
+        ts = _now_ms() if ts_ms is None else int(ts_ms)
+        self._seq += 1
+        seq = self._seq
+        buf = self.buf
+        off = self._ring_off + (seq % self.capacity) * REC_SIZE
+        _LOCK.pack_into(buf, off, 2 * seq - 1)
+        _REC.pack_into(buf, off, 2 * seq - 1, ts, sid, 0, bid, ask, bid_qty, ask_qty)
+        _LOCK.pack_into(buf, off, 2 * seq)
+
+        n = self._latest_seq[sid] + 1
+        self._latest_seq[sid] = n
+        off = self._latest_off + sid * REC_SIZE
+        _LOCK.pack_into(buf, off, 2 * n - 1)
+        _REC.pack_into(buf, off, 2 * n - 1, ts, sid, 0, bid, ask, bid_qty, ask_qty)
+        _LOCK.pack_into(buf, off, 2 * n)
+
+        _U64.pack_into(buf, _HEAD_OFF, seq + 1)
+        return seq
+
+    def heartbeat(self) -> None:
+        _I64.pack_into(self.buf, _HEARTBEAT_OFF, _now_ms())
+
+    def close(self, *, unlink: bool = True) -> None:
+        self.buf = None  # type: ignore[assignment]
+        self.shm.close()
+        if unlink:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ShmQuoteReader:
+    """
+    Attach to a publisher's segment (read-only use). poll() walks the ring from
+    this reader's cursor; latest() reads the per-symbol table.
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME, *, from_start: bool = False, untrack: bool = True) -> None:
+        """
+        untrack: keep the segment out of this process's resource tracker, which
+        would otherwise unlink it when the worker exits. Pass False in children
+        of the publisher process (they share its tracker).
+        """
+        self.shm = _attach(name, untrack=untrack)
+        self.buf = self.shm.buf
+        magic, ver, rec_size, capacity, max_symbols, _ = _HDR.unpack_from(self.buf, 0)
+        if magic != MAGIC or ver != VERSION or rec_size != REC_SIZE:
+            self.shm.close()
+            raise AdapterError(f"shm {name}: unexpected layout {magic!r} v{ver}", error_class=ErrorClass.STOP)
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self._sym_off, self._latest_off, self._ring_off, _ = _layout(capacity, max_symbols)
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        head = self.head()
+        self.cursor = max(1, head - capacity + 1) if from_start else head
+        self.stats: Dict[str, int] = {"read": 0, "lapped": 0, "lost": 0, "retries": 0}
+
+    # -------------------------
+    # Header / symbols
+    # -------------------------
+    def head(self) -> int:
+        return _U64.unpack_from(self.buf, _HEAD_OFF)[0]
+
+    def publisher_pid(self) -> int:
+        return _U32.unpack_from(self.buf, _PID_OFF)[0]
+
+    def heartbeat_age_ms(self, now_ms: Optional[int] = None) -> int:
+        now = _now_ms() if now_ms is None else int(now_ms)
+        return now - _I64.unpack_from(self.buf, _HEARTBEAT_OFF)[0]
+
+    def behind(self) -> int:
+        """Quotes published but not yet polled (> capacity means some are already lost)."""
+        return self.head() - self.cursor
+
+    def _refresh_names(self) -> None:
+        n = _U32.unpack_from(self.buf, _N_SYMBOLS_OFF)[0]
+        for i in range(len(self._names), n):
+            off = self._sym_off + i * _NAME_SIZE
+            name = bytes(self.buf[off:off + _NAME_SIZE]).rstrip(b"\0").decode("utf-8")
+            self._names.append(name)
+            self._ids[name] = i
+
+    def key(self, sym_id: int) -> str:
+        if sym_id >= len(self._names):
+            self._refresh_names()
+        return self._names[sym_id]
+
+    def symbols(self) -> List[str]:
+        self._refresh_names()
+        return list(self._names)
+
+    # -------------------------
+    # Read
+    # -------------------------
+    def _read(self, off: int) -> Optional[Tuple[Any, ...]]:
+        """Consistent copy of one record (None if the writer kept it busy)."""
+        buf = self.buf
+        for _ in range(100):
+            rec = _REC.unpack_from(buf, off)
+            lock = rec[0]
+            if not lock & 1 and _LOCK.unpack_from(buf, off)[0] == lock:
+                return rec
+            self.stats["retries"] += 1          # writer is mid-record
+        return None
+
+    def poll(self, max_n: Optional[int] = None) -> List[ShmQuote]:
+        head = self.head()
+        if head - self.cursor > self.capacity:
+            lost = head - self.capacity - self.cursor
+            self.stats["lapped"] += 1
+            self.stats["lost"] += lost
+            self.cursor = head - self.capacity
+        end = head if max_n is None else min(head, self.cursor + max_n)
+        out: List[ShmQuote] = []
+        seq = self.cursor
+        while seq < end:
+            rec = self._read(self._ring_off + (seq % self.capacity) * REC_SIZE)
+            if rec is None:
+                break
+            lock = rec[0]
+            if lock > 2 * seq:
+                # overwritten while we were reading: lapped, jump to the oldest live seq
+                new = self.head() - self.capacity + 1
+                self.stats["lapped"] += 1
+                self.stats["lost"] += max(0, new - seq)
+                seq = max(new, seq + 1)
+                end = max(end, seq)
+                continue
+            if lock < 2 * seq:
+                break                           # not yet written (head raced ahead of the slot)
+            _, ts, sid, _flags, bid, ask, bq, aq = rec
+            out.append(ShmQuote(seq, ts, self.key(sid), bid, ask, bq, aq))
+            seq += 1
+        self.cursor = seq
+        self.stats["read"] += len(out)
+        return out
+
+    def latest(self, key: str) -> Optional[ShmQuote]:
+        """Newest quote of one symbol; its seq is that symbol's update count."""
+        sid = self._ids.get(key)
+        if sid is None:
+            self._refresh_names()
+            sid = self._ids.get(key)
+            if sid is None:
+                return None
+        rec = self._read(self._latest_off + sid * REC_SIZE)
+        if rec is None or rec[0] == 0:
+            return None
+        lock, ts, _sid, _flags, bid, ask, bq, aq = rec
+        return ShmQuote(lock // 2, ts, key, bid, ask, bq, aq)
+
+    def best_bid_ask(self, venue: str, symbol: str, *, max_age_ms: int = 3_000) -> Tuple[float, float]:
+        """Drop-in for adapter.get_best_bid_ask (BboSource); missing / stale -> RETRY."""
+        q = self.latest(f"{venue}:{symbol}")
+        if q is None:
+            raise AdapterError(f"shm: no quote for {venue}:{symbol}", error_class=ErrorClass.RETRY)
+        age = _now_ms() - q.ts_ms
+        if age > max_age_ms:
+            raise AdapterError(f"shm: {venue}:{symbol} quote stale ({age}ms)", error_class=ErrorClass.RETRY)
+        return q.bid, q.ask
+
+    def latest_view(self) -> Any:
+        """
+        Zero-copy structured NumPy view of the latest table (one row per symbol id).
+        Rows are not seqlock-checked: fine for scans, use latest() for a decision.
+        Drop the view before close() (the segment cannot close while it is exported).
+        """
+        if np is None:
+            raise RuntimeError("numpy is required for latest_view()")
+        n = _U32.unpack_from(self.buf, _N_SYMBOLS_OFF)[0]
+        return np.frombuffer(self.buf, dtype=REC_DTYPE, count=n, offset=self._latest_off)
+
+    def close(self) -> None:
+        self.buf = None  # type: ignore[assignment]
+        self.shm.close()
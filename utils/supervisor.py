@@ -0,0 +1,243 @@
+# utils/supervisor.py
+"""
+Mountain: event-driven supervisor (versioned inputs -> derived decisions).
+
+- a source is an input value with a version; set() bumps the version only
+  when the value actually changes (==), so re-reading an unchanged file or
+  re-sending the same metric is free
+- a derived node is fn(*deps); it is recomputed only when one of its deps
+  has a newer version than the one it last used, and it bumps its own version
+  only if the result differs (unchanged results stop propagation)
+- nodes must be registered after their deps, so registration order is a
+  topological order: run() walks it once, deterministically
+- every recompute that changes a value emits a Decision carrying the versions
+  of its direct inputs and of every source it transitively depends on, i.e.
+  exactly which observations produced it (history keeps the last N)
+
+FileSource re-reads a JSON state file (smoke / guard / fire) only when its
+mtime or size changes.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from adapters.clock import get_clock
+
+_UNSET: Any = object()
+
+
+@dataclass(frozen=True)
+class Decision:
+    name: str
+    version: int
+    value: Any
+    inputs: Dict[str, int]          # direct deps -> version used
+    sources: Dict[str, int]         # transitive sources -> version used
+    seq: int                        # supervisor-wide emit order
+    ts: int
+    compute_us: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "value": self.value,
+            "inputs": dict(self.inputs),
+            "sources": dict(self.sources),
+            "seq": self.seq,
+            "ts": self.ts,
+            "compute_us": round(self.compute_us, 1),
+        }
+
+
+class _Node:
+    __slots__ = ("name", "deps", "fn", "value", "version", "used", "sources", "changed_ms")
+
+    def __init__(self, name: str, deps: Tuple[str, ...], fn: Optional[Callable[..., Any]]) -> None:
+        self.name = name
+        self.deps = deps
+        self.fn = fn
+        self.value: Any = None
+        self.version = 0
+        self.used: Dict[str, int] = {d: -1 for d in deps}
+        self.sources: Tuple[str, ...] = ()
+        self.changed_ms = 0
+
+
+class Supervisor:
+    def __init__(self, *, history: int = 1000) -> None:
+        self._nodes: Dict[str, _Node] = {}
+        self._order: List[_Node] = []           # derived nodes, topological
+        self._dirty = False
+        self._seq = 0
+        self._last: Dict[str, Decision] = {}
+        self.history: Deque[Decision] = deque(maxlen=history)
+        self.listeners: List[Callable[[Decision], None]] = []
+        self.stats: Dict[str, int] = {"sets": 0, "changes": 0, "runs": 0, "recomputes": 0, "decisions": 0}
+
+    # -------------------------
+    # Graph
+    # -------------------------
+    def source(self, name: str, value: Any = _UNSET) -> None:
+        if name in self._nodes:
+            raise ValueError(f"node {name!r} already registered")
+        n = self._nodes[name] = _Node(name, (), None)
+        n.sources = (name,)
+        if value is not _UNSET:
+            self.set(name, value)
+
+    def derive(self, name: str, deps: Sequence[str], fn: Callable[..., Any]) -> None:
+        if name in self._nodes:
+            raise ValueError(f"node {name!r} already registered")
+        missing = [d for d in deps if d not in self._nodes]
+        if missing:
+            raise ValueError(f"{name}: unknown deps {missing} (register deps first)")
+        n = _Node(name, tuple(deps), fn)
+        srcs: Dict[str, None] = {}
+        for d in deps:
+            srcs.update(dict.fromkeys(self._nodes[d].sources))
+        n.sources = tuple(sorted(srcs))
+        self._nodes[name] = n
+        self._order.append(n)
+        self._dirty = True
+
+    # -------------------------
+    # Inputs
+    # -------------------------
+    def set(self, name: str, value: Any) -> bool:
+        """New observation for a source; True if it changed (version bumped)."""
+        n = self._nodes[name]
+        if n.fn is not None:
+            raise ValueError(f"{name!r} is derived, not a source")
+        self.stats["sets"] += 1
+        if n.version and n.value == value:
+            return False
+        n.value = value
+        n.version += 1
+        n.changed_ms = get_clock().time_ms()
+        self.stats["changes"] += 1
+        self._dirty = True
+        return True
+
+    def update(self, values: Dict[str, Any]) -> bool:
+        changed = False
+        for k, v in values.items():
+            changed = self.set(k, v) or changed
+        return changed
+
+    # -------------------------
+    # Evaluate
+    # -------------------------
+    def run(self) -> List[Decision]:
+        """Recompute stale derived nodes in dependency order; returns the decisions that changed."""
+        if not self._dirty:
+            return []
+        self._dirty = False
+        self.stats["runs"] += 1
+        out: List[Decision] = []
+        nodes = self._nodes
+        for n in self._order:
+            deps = [nodes[d] for d in n.deps]
+            if all(dn.version == n.used[dn.name] for dn in deps):
+                continue
+            if any(dn.version == 0 for dn in deps):
+                continue                        # some input never observed yet
+            t0 = time.perf_counter()
+            value = n.fn(*(dn.value for dn in deps))  # type: ignore[misc]
+            us = (time.perf_counter() - t0) * 1e6
+            n.used = {dn.name: dn.version for dn in deps}
+            self.stats["recomputes"] += 1
+            if n.version and value == n.value:
+                continue
+            n.value = value
+            n.version += 1
+            n.changed_ms = get_clock().time_ms()
+            self._seq += 1
+            d = Decision(
+                name=n.name,
+                version=n.version,
+                value=value,
+                inputs=dict(n.used),
+                sources={s: nodes[s].version for s in n.sources},
+                seq=self._seq,
+                ts=n.changed_ms,
+                compute_us=us,
+            )
+            self._last[n.name] = d
+            out.append(d)
+        self.stats["decisions"] += len(out)
+        self.history.extend(out)
+        for d in out:
+            for fn in self.listeners:
+                try:
+                    fn(d)
+                except Exception:
+                    pass
+        return out
+
+    # -------------------------
+    # Read
+    # -------------------------
+    def value(self, name: str) -> Any:
+        return self._nodes[name].value
+
+    def version(self, name: str) -> int:
+        return self._nodes[name].version
+
+    def decision(self, name: str) -> Optional[Decision]:
+        """Last emitted decision for a derived node."""
+        return self._last.get(name)
+
+    def audit(self) -> Dict[str, Any]:
+        """{node: {"version", "inputs"|"changed_ms"}} for risk_state.json."""
+        out: Dict[str, Any] = {}
+        for name, n in self._nodes.items():
+            if n.fn is None:
+                out[name] = {"version": n.version, "changed_ms": n.changed_ms}
+            else:
+                d = self._last.get(name)
+                out[name] = {
+                    "version": n.version,
+                    "inputs": dict(n.used),
+                    "sources": dict(d.sources) if d else {},
+                    "seq": d.seq if d else 0,
+                }
+        return out
+
+
+class FileSource:
+    """A JSON state file as a source value (None when missing / unreadable)."""
+
+    def __init__(self, path: Path, *, encoding: str = "utf-8") -> None:
+        self.path = Path(path)
+        self.encoding = encoding
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._polled = False
+        self.value: Optional[Dict[str, Any]] = None
+
+    def poll(self) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(re-read?, value); the file is only parsed when mtime / size moved."""
+        try:
+            st = os.stat(self.path)
+            stamp: Optional[Tuple[int, int]] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if self._polled and stamp == self._stamp:
+            return False, self.value
+        self._polled = True
+        self._stamp = stamp
+        if stamp is None:
+            self.value = None
+            return True, None
+        try:
+            d = json.loads(self.path.read_text(encoding=self.encoding))
+        except Exception:
+            d = None
+        self.value = d if isinstance(d, dict) else None
+        return True, self.value
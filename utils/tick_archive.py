@@ -0,0 +1,404 @@
+# utils/tick_archive.py
+"""
+Tick / L2 snapshot archive (top-of-book = depth 1).
+
+Layout: <root>/<venue>/<SYMBOL>/<YYYYMMDD>.d<depth>.tick  + .tidx sidecar
+
+- prices / sizes are stored as integer ticks (price_tick / qty_step of the
+  symbol), so every column is an int64
+- rows are buffered per symbol and written as blocks (block_rows or
+  block_sec, whichever first); a block never spans two UTC days
+- inside a block each column is delta-encoded along time, byte-shuffled
+  (all low bytes together, ...) and the whole block is zlib-compressed:
+  slowly moving prices turn into long zero runs
+- .tidx holds one fixed-size entry per block (t_first, t_last, offset, ...):
+  a range query mmaps it, bisects to the first block and decodes only the
+  blocks it needs
+
+Block = header | zlib(shuffle(delta(columns)))
+columns = ts_ms, bid_px[depth], bid_qty[depth], ask_px[depth], ask_qty[depth]
+
+The reader returns NumPy arrays when NumPy is installed, array.array
+otherwise (same values; L2 columns are row-major rows x depth, 2-D with
+NumPy, flat without).
+"""
+from __future__ import annotations
+
+import bisect
+import itertools
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from adapters.base import TradingAdapter
+
+try:
+    import numpy as np
+except ImportError:  # optional: reader falls back to array.array
+    np = None  # type: ignore[assignment]
+
+_MAGIC = b"TKB1"
+# magic, depth, n_rows, t_first, t_last, price_tick, qty_step, raw_len, comp_len, crc32
+_HDR = struct.Struct("<4sHIqqddIII")
+# t_first, t_last, offset, n_rows, block_len
+_IDX = struct.Struct("<qqQII")
+
+DEFAULT_TICK = 1e-8
+
+Level = Tuple[float, float]
+
+
+def _day(ts_ms: int) -> str:
+    return time.strftime("%Y%m%d", time.gmtime(ts_ms / 1000.0))
+
+
+def _paths(root: Path, venue: str, symbol: str, day: str, depth: int) -> Tuple[Path, Path]:
+    d = root / venue / symbol.upper()
+    return d / f"{day}.d{depth}.tick", d / f"{day}.d{depth}.tidx"
+
+
+# -------------------------
+# Codec
+# -------------------------
+def _shuffle(raw: bytes, width: int = 8) -> bytes:
+    return b"".join(raw[i::width] for i in range(width))
+
+
+def _unshuffle(data: bytes, width: int = 8) -> bytes:
+    n = len(data) // width
+    out = bytearray(len(data))
+    for i in range(width):
+        out[i::width] = data[i * n:(i + 1) * n]
+    return bytes(out)
+
+
+def _encode_columns(cols: Sequence[Sequence[int]]) -> bytes:
+    buf = array("q")
+    for c in cols:
+        if not c:
+            continue
+        buf.append(c[0])
+        buf.extend(b - a for a, b in zip(c, itertools.islice(c, 1, None)))
+    if sys.byteorder == "big":
+        buf.byteswap()                 # on-disk format is little-endian
+    return _shuffle(buf.tobytes())
+
+
+def _decode_columns(raw: bytes, n_cols: int, n_rows: int) -> Any:
+    """-> int64 matrix (n_cols x n_rows) as ndarray, or list of array('q')."""
+    data = _unshuffle(raw)
+    if np is not None:
+        m = np.frombuffer(data, dtype="<i8").reshape(n_cols, n_rows)
+        return np.cumsum(m, axis=1)
+    a = array("q")
+    a.frombytes(data)
+    if sys.byteorder == "big":
+        a.byteswap()
+    return [array("q", itertools.accumulate(a[i * n_rows:(i + 1) * n_rows])) for i in range(n_cols)]
+
+
+# -------------------------
+# Writer
+# -------------------------
+class _Series:
+    __slots__ = ("symbol", "day", "rows", "price_tick", "qty_step", "t_open")
+
+    def __init__(self, symbol: str, price_tick: float, qty_step: float) -> None:
+        self.symbol = symbol
+        self.day = ""
+        self.rows: List[Tuple[int, ...]] = []
+        self.price_tick = price_tick
+        self.qty_step = qty_step
+        self.t_open = 0.0
+
+
+class TickArchiveWriter:
+    """Append snapshots of one venue. Thread-safe; call close() (or flush()) on exit."""
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        venue: str,
+        *,
+        depth: int = 1,
+        block_rows: int = 4096,
+        block_sec: float = 60.0,
+        level: int = 6,
+    ) -> None:
+        self.root = Path(root)
+        self.venue = venue
+        self.depth = max(1, int(depth))
+        self.block_rows = block_rows
+        self.block_sec = block_sec
+        self.level = level
+        self._lock = threading.Lock()
+        self._series: Dict[str, _Series] = {}
+        self.stats: Dict[str, int] = {"rows": 0, "blocks": 0, "bytes": 0}
+
+    def set_scale(self, symbol: str, price_tick: float, qty_step: float) -> None:
+        """Integer grid of a symbol (MarketInfo.price_tick / qty_step). Takes effect at the next block."""
+        with self._lock:
+            s = self._series.get(symbol)
+            if s is not None:
+                self._flush_series(s)
+                s.price_tick, s.qty_step = price_tick, qty_step
+            else:
+                self._series[symbol] = _Series(symbol, price_tick, qty_step)
+
+    def append(
+        self,
+        symbol: str,
+        ts_ms: int,
+        bids: Sequence[Level],
+        asks: Sequence[Level],
+    ) -> None:
+        """bids / asks: [(price, size), ...] best first (get_order_book shape); missing levels -> 0."""
+        with self._lock:
+            s = self._series.get(symbol)
+            if s is None:
+                s = self._series[symbol] = _Series(symbol, DEFAULT_TICK, DEFAULT_TICK)
+            day = _day(ts_ms)
+            if day != s.day:
+                self._flush_series(s)
+                s.day = day
+            if not s.rows:
+                s.t_open = time.monotonic()
+
+            d = self.depth
+            pt, qs = s.price_tick, s.qty_step
+            bp = [0] * d
+            bq = [0] * d
+            ap = [0] * d
+            aq = [0] * d
+            for i, (px, sz) in enumerate(bids[:d]):
+                bp[i] = round(px / pt)
+                bq[i] = round(sz / qs)
+            for i, (px, sz) in enumerate(asks[:d]):
+                ap[i] = round(px / pt)
+                aq[i] = round(sz / qs)
+            s.rows.append((int(ts_ms), *bp, *bq, *ap, *aq))
+            self.stats["rows"] += 1
+
+            if len(s.rows) >= self.block_rows or time.monotonic() - s.t_open >= self.block_sec:
+                self._flush_series(s)
+
+    def append_bbo(self, symbol: str, ts_ms: int, bid: float, ask: float,
+                   bid_qty: float = 0.0, ask_qty: float = 0.0) -> None:
+        self.append(symbol, ts_ms, [(bid, bid_qty)], [(ask, ask_qty)])
+
+    def flush(self) -> None:
+        with self._lock:
+            for s in self._series.values():
+                self._flush_series(s)
+
+    close = flush
+
+    def _flush_series(self, s: _Series) -> None:
+        if not s.rows:
+            return
+        rows, s.rows = s.rows, []
+        cols = list(zip(*rows))
+        raw = _encode_columns(cols)
+        comp = zlib.compress(raw, self.level)
+        hdr = _HDR.pack(
+            _MAGIC, self.depth, len(rows), rows[0][0], rows[-1][0],
+            s.price_tick, s.qty_step, len(raw), len(comp), zlib.crc32(comp),
+        )
+        dat, idx = _paths(self.root, self.venue, s.symbol, s.day, self.depth)
+        dat.parent.mkdir(parents=True, exist_ok=True)
+        with open(dat, "ab") as f:
+            off = f.seek(0, os.SEEK_END)
+            f.write(hdr)
+            f.write(comp)
+        # index entry only after the block is on disk: a torn block is never indexed
+        with open(idx, "ab") as f:
+            f.write(_IDX.pack(rows[0][0], rows[-1][0], off, len(rows), _HDR.size + len(comp)))
+        self.stats["blocks"] += 1
+        self.stats["bytes"] += _HDR.size + len(comp)
+
+
+class ArchiveRecorder:
+    """
+    Polls an adapter and appends every snapshot (runs next to any adapter).
+    depth=1 uses get_best_bid_ask (sizes 0), depth>1 get_order_book(limit=depth).
+    """
+
+    def __init__(
+        self,
+        adapter: TradingAdapter,
+        writer: TickArchiveWriter,
+        symbols: Sequence[str],
+        *,
+        interval_sec: float = 1.0,
+    ) -> None:
+        self.adapter = adapter
+        self.writer = writer
+        self.symbols = list(symbols)
+        self.interval_sec = interval_sec
+        self.errors: Dict[str, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def load_scales(self) -> None:
+        for sym in self.symbols:
+            try:
+                mi = self.adapter.get_market_info(sym)
+                self.writer.set_scale(sym, mi.price_tick or DEFAULT_TICK, mi.qty_step or DEFAULT_TICK)
+            except Exception as e:
+                self.errors[sym] = f"market_info: {e!r}"[:200]
+
+    def poll_once(self) -> None:
+        for sym in self.symbols:
+            try:
+                if self.writer.depth == 1:
+                    bid, ask = self.adapter.get_best_bid_ask(sym)
+                    self.writer.append_bbo(sym, int(time.time() * 1000), bid, ask)
+                else:
+                    bids, asks = self.adapter.get_order_book(sym, limit=self.writer.depth)
+                    self.writer.append(sym, int(time.time() * 1000), bids, asks)
+                self.errors.pop(sym, None)
+            except Exception as e:
+                self.errors[sym] = repr(e)[:200]
+
+    def start(self) -> "ArchiveRecorder":
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self.load_scales()
+
+        def _loop() -> None:
+            while not self._stop.is_set():
+                t0 = time.monotonic()
+                self.poll_once()
+                self._stop.wait(max(0.0, self.interval_sec - (time.monotonic() - t0)))
+            self.writer.flush()
+
+        self._thread = threading.Thread(target=_loop, name=f"{self.adapter.name}-archive", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self.writer.flush()
+
+
+# -------------------------
+# Reader
+# -------------------------
+class _IdxView:
+    """Sequence of t_last over an mmapped .tidx (for bisect)."""
+
+    def __init__(self, mm: Any) -> None:
+        self.mm = mm
+        self.n = len(mm) // _IDX.size
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, i: int) -> int:
+        return _IDX.unpack_from(self.mm, i * _IDX.size)[1]
+
+    def entry(self, i: int) -> Tuple[int, int, int, int, int]:
+        return _IDX.unpack_from(self.mm, i * _IDX.size)
+
+
+def _blocks(dat: Path, idx: Path, start_ms: int, end_ms: int) -> Iterator[Tuple[Tuple[Any, ...], bytes]]:
+    if not dat.exists() or not idx.exists() or idx.stat().st_size < _IDX.size:
+        return
+    with open(idx, "rb") as fi, open(dat, "rb") as fd:
+        mi = mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ)
+        md = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            view = _IdxView(mi)
+            i = bisect.bisect_left(view, start_ms)   # first block ending at/after start
+            while i < view.n:
+                t_first, _, off, _, blen = view.entry(i)
+                if t_first > end_ms:
+                    break
+                hdr = _HDR.unpack_from(md, off)
+                comp = md[off + _HDR.size:off + blen]
+                if hdr[0] == _MAGIC and zlib.crc32(comp) == hdr[9]:
+                    yield hdr, comp
+                i += 1
+        finally:
+            mi.close()
+            md.close()
+
+
+def _concat(parts: List[Any], typecode: str) -> Any:
+    if np is not None:
+        return np.concatenate(parts) if parts else np.empty(0, dtype="f8" if typecode == "d" else "i8")
+    out = array(typecode)
+    for p in parts:
+        out.extend(p)
+    return out
+
+
+def read_range(
+    root: Union[str, Path],
+    venue: str,
+    symbol: str,
+    start_ms: int,
+    end_ms: int,
+    *,
+    depth: int = 1,
+) -> Dict[str, Any]:
+    """
+    Snapshots with start_ms <= ts <= end_ms.
+    -> {"ts": int64 ms, "bid_px", "bid_qty", "ask_px", "ask_qty": float64}
+    depth>1: each px/qty column is rows x depth (2-D ndarray / flat row-major array).
+    """
+    root = Path(root)
+    d = max(1, int(depth))
+    names = ("bid_px", "bid_qty", "ask_px", "ask_qty")
+    ts_parts: List[Any] = []
+    parts: Dict[str, List[Any]] = {k: [] for k in names}
+
+    first_day, last_day = _day(start_ms), _day(end_ms)
+    sym_dir = root / venue / symbol.upper()
+    days = sorted(p.name.split(".", 1)[0] for p in sym_dir.glob(f"*.d{d}.tick")) if sym_dir.exists() else []
+    for day in days:
+        if not first_day <= day <= last_day:
+            continue
+        dat, idx = _paths(root, venue, symbol, day, d)
+        for hdr, comp in _blocks(dat, idx, start_ms, end_ms):
+            _, _, n, _, _, pt, qs, raw_len, _, _ = hdr
+            m = _decode_columns(zlib.decompress(comp, bufsize=raw_len), 1 + 4 * d, n)
+            if np is not None:
+                ts = m[0]
+                keep = (ts >= start_ms) & (ts <= end_ms)
+                ts_parts.append(ts[keep])
+                for j, k in enumerate(names):
+                    block = m[1 + j * d:1 + (j + 1) * d].T[keep]
+                    parts[k].append(block * (pt if j % 2 == 0 else qs))
+            else:
+                ts = m[0]
+                keep = [r for r in range(n) if start_ms <= ts[r] <= end_ms]
+                ts_parts.append(array("q", (ts[r] for r in keep)))
+                for j, k in enumerate(names):
+                    scale = pt if j % 2 == 0 else qs
+                    cols = m[1 + j * d:1 + (j + 1) * d]
+                    parts[k].append(array("d", (cols[c][r] * scale for r in keep for c in range(d))))
+
+    out: Dict[str, Any] = {"ts": _concat(ts_parts, "q")}
+    for k in names:
+        v = _concat(parts[k], "d")
+        if np is not None and d == 1:
+            v = v.reshape(-1)
+        out[k] = v
+    out["depth"] = d
+    return out
+
+
+def list_symbols(root: Union[str, Path], venue: str) -> List[str]:
+    p = Path(root) / venue
+    return sorted(x.name for x in p.iterdir() if x.is_dir()) if p.exists() else []
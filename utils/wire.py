@@ -0,0 +1,408 @@
+# utils/wire.py
+"""
+Compact binary records for inter-component signals (JSON stays the debug view).
+
+Every record starts with the same 4-byte header: b"UB" | type id u8 | version u8,
+followed by a fixed little-endian struct for that (type, version):
+- quote  (1)  ts_ms, venue, symbol, bid, ask, bid_qty, ask_qty
+- gate   (2)  ts_ms, action, allow_orders, retry_after_sec, source,
+              then reason as u16 length + utf-8 (the only variable part)
+- order  (3)  adapters.base.OrderRequest: symbol, client_order_id, side,
+              order_type, time_in_force, reduce_only, qty, price (NaN = None)
+- fill   (4)  adapters.paper.PaperFill: ts_ms, order_id, symbol, side,
+              maker, price, qty, fee
+Strings are fixed-width, NUL padded; anything longer is a ValueError (never
+silently truncated), except the free-text gate reason (capped at 1024 B).
+
+Decoding is the hot side: records come back as NamedTuples (Quote,
+OrderRecord, FillRecord: same field names as the dataclasses, built
+positionally from one precompiled unpack_from) and gates as dicts. Short
+repeated strings (venue, symbol) are interned per raw field. encode()
+accepts both the dataclass and the record; OrderRecord.to_request() /
+FillRecord.to_fill() give the dataclass back.
+
+Cost vs json.dumps(indent=2) (tools/wire_dump.py bench): quote / order /
+fill encode >= 10x cheaper, decode ~9-10x; gate ~7x both ways (dict in,
+dict out and a variable-length reason: the dict is the floor, not struct).
+
+The registry maps (type id, version) -> Schema; decode() dispatches on the
+header, so a reader keeps decoding old versions after a layout bump (register
+the old Schema next to the new one, encode() always uses the latest).
+to_debug_dict() / to_json() turn any record back into the JSON view.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import struct
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+from adapters.base import OrderRequest
+from adapters.paper import PaperFill
+
+MAGIC = b"UB"
+_HDR = struct.Struct("<2sBB")
+HEADER_SIZE = _HDR.size
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_ACTIONS = ("PROCEED", "RETRY", "STOP", "KILL")
+_ACTION_ID = {a: i for i, a in enumerate(_ACTIONS)}
+_SIDES = ("buy", "sell")
+_SIDE_ID = {s: i for i, s in enumerate(_SIDES)}
+_ORDER_TYPES = ("market", "limit")
+_ORDER_TYPE_ID = {s: i for i, s in enumerate(_ORDER_TYPES)}
+_TIFS = ("GTC", "IOC", "FOK")
+_TIF_ID = {s: i for i, s in enumerate(_TIFS)}
+_MAX_REASON = 1024
+
+
+class Quote(NamedTuple):
+    venue: str
+    symbol: str
+    bid: float
+    ask: float
+    ts_ms: int
+    bid_qty: float = 0.0
+    ask_qty: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+class OrderRecord(NamedTuple):
+    """Decoded order intent (fields of adapters.base.OrderRequest)."""
+    symbol: str
+    side: str
+    order_type: str
+    qty: float
+    price: Optional[float]
+    time_in_force: str
+    reduce_only: bool
+    client_order_id: Optional[str]
+
+    def to_request(self) -> OrderRequest:
+        return OrderRequest(*self)  # type: ignore[arg-type]
+
+
+class FillRecord(NamedTuple):
+    """Decoded fill (fields of adapters.paper.PaperFill)."""
+    order_id: str
+    symbol: str
+    side: str
+    price: float
+    qty: float
+    maker: bool
+    fee: float
+    ts_ms: int
+
+    def to_fill(self) -> PaperFill:
+        return PaperFill(*self)
+
+
+def _s(value: Optional[str], width: int, field: str) -> bytes:
+    raw = (value or "").encode("utf-8")
+    if len(raw) > width:
+        raise ValueError(f"{field} too long for the wire format ({len(raw)} > {width} bytes): {value!r}")
+    return raw
+
+
+# raw fixed-width field -> str for the few distinct venues / symbols (hit: one dict lookup)
+_INTERNED: Dict[bytes, str] = {}
+_MAX_INTERNED = 4096
+
+
+def _interned(raw: bytes) -> str:
+    s = _INTERNED.get(raw)
+    if s is None:
+        s = raw.rstrip(b"\0").decode("utf-8")
+        if len(_INTERNED) < _MAX_INTERNED:
+            _INTERNED[raw] = s
+    return s
+
+
+# NamedTuple construction without the generated __new__'s argument parsing
+_tuple_new = tuple.__new__
+
+
+def _enum(table: Dict[str, int], value: str, field: str) -> int:
+    try:
+        return table[value]
+    except KeyError:
+        raise ValueError(f"unsupported {field} {value!r} (one of {', '.join(table)})") from None
+
+
+class Schema:
+    """
+    One (type id, version) layout: encode(obj) -> bytes, decode(buf) -> obj.
+    unpack(buf) is the raw field tuple (header included) for hot loops that
+    do not need the object.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        type_id: int,
+        version: int,
+        py_type: type,
+        layout: struct.Struct,
+        encode: Callable[[Any], bytes],
+        decode: Callable[[Buffer], Any],
+        *,
+        aliases: Tuple[type, ...] = (),
+    ) -> None:
+        self.name = name
+        self.type_id = type_id
+        self.version = version
+        self.py_type = py_type
+        self.layout = layout
+        self.encode = encode
+        self.decode = decode
+        self.aliases = aliases      # other types encode() accepts (decoded records)
+
+    def unpack(self, buf: Buffer) -> Tuple[Any, ...]:
+        return self.layout.unpack_from(buf)
+
+    def __repr__(self) -> str:
+        return f"Schema({self.name} id={self.type_id} v{self.version})"
+
+
+_BY_ID: Dict[Tuple[int, int], Schema] = {}
+_BY_HEADER: Dict[bytes, Schema] = {}
+_DECODERS: Dict[bytes, Callable[[Buffer], Any]] = {}     # header -> schema.decode
+_LATEST: Dict[type, Schema] = {}
+
+
+def register(schema: Schema, *, latest: bool = True) -> Schema:
+    key = (schema.type_id, schema.version)
+    if key in _BY_ID:
+        raise ValueError(f"schema id={schema.type_id} v{schema.version} already registered")
+    _BY_ID[key] = schema
+    hdr = _HDR.pack(MAGIC, schema.type_id, schema.version)
+    _BY_HEADER[hdr] = schema
+    _DECODERS[hdr] = schema.decode
+    if latest:
+        for t in (schema.py_type, *schema.aliases):
+            _LATEST[t] = schema
+    return schema
+
+
+def schemas() -> Dict[Tuple[int, int], Schema]:
+    return dict(_BY_ID)
+
+
+# -------------------------
+# quote v1
+# -------------------------
+_QUOTE_V1 = struct.Struct("<2sBBq16s24sdddd")
+
+
+def _enc_quote(q: Quote) -> bytes:
+    return _QUOTE_V1.pack(
+        MAGIC, 1, 1, int(q.ts_ms), _s(q.venue, 16, "venue"), _s(q.symbol, 24, "symbol"),
+        q.bid, q.ask, q.bid_qty, q.ask_qty,
+    )
+
+
+def _dec_quote(buf: Buffer, _unpack: Callable[[Buffer], Tuple[Any, ...]] = _QUOTE_V1.unpack_from) -> Quote:
+    _, _, _, ts, venue, sym, bid, ask, bq, aq = _unpack(buf)
+    get = _INTERNED.get
+    return _tuple_new(Quote, (get(venue) or _interned(venue), get(sym) or _interned(sym), bid, ask, ts, bq, aq))
+
+
+QUOTE = register(Schema("quote", 1, 1, Quote, _QUOTE_V1, _enc_quote, _dec_quote))
+
+
+# -------------------------
+# gate v1 (risk_scan / liquidity / Fire / Mountain gate dicts)
+# -------------------------
+_GATE_V1 = struct.Struct("<2sBBqBBxxI16sH")
+
+
+def _enc_gate(g: Dict[str, Any], _pack: Callable[..., bytes] = _GATE_V1.pack) -> bytes:
+    get = g.get
+    reason = get("reason")
+    rb = reason.encode("utf-8") if type(reason) is str else str(reason or "").encode("utf-8")
+    if len(rb) > _MAX_REASON:
+        rb = rb[:_MAX_REASON]
+    source = get("source")
+    action = _ACTION_ID.get(get("action"))  # type: ignore[arg-type]
+    if action is None:
+        action = _enum(_ACTION_ID, str(get("action")), "action")
+    ts = get("ts") or 0
+    retry = get("retry_after_sec") or 0
+    return _pack(
+        MAGIC, 2, 1,
+        ts if type(ts) is int else int(ts),
+        action,
+        1 if get("allow_orders") else 0,
+        retry if type(retry) is int else int(retry),
+        _s(source, 16, "source") if source else b"",
+        len(rb),
+    ) + rb
+
+
+def _dec_gate(
+    buf: Buffer,
+    _unpack: Callable[[Buffer], Tuple[Any, ...]] = _GATE_V1.unpack_from,
+    _off: int = _GATE_V1.size,
+) -> Dict[str, Any]:
+    _, _, _, ts, action, allow, retry, source, n = _unpack(buf)
+    out: Dict[str, Any] = {
+        "action": _ACTIONS[action],
+        "allow_orders": allow == 1,
+        "reason": str(buf[_off:_off + n], "utf-8", "replace"),
+        "retry_after_sec": retry,
+    }
+    if ts:
+        out["ts"] = ts
+    if source[0]:
+        out["source"] = _INTERNED.get(source) or _interned(source)
+    return out
+
+
+GATE = register(Schema("gate", 2, 1, dict, _GATE_V1, _enc_gate, _dec_gate))
+
+
+# -------------------------
+# order intent v1 (adapters.base.OrderRequest)
+# -------------------------
+_ORDER_V1 = struct.Struct("<2sBB24s40sBBBBdd")
+_REDUCE_ONLY = 0x01
+
+
+def _enc_order(o: Union[OrderRequest, OrderRecord], _pack: Callable[..., bytes] = _ORDER_V1.pack) -> bytes:
+    sym = o.symbol.encode("utf-8") if o.symbol else b""
+    coid = o.client_order_id.encode("utf-8") if o.client_order_id else b""
+    if len(sym) > 24 or len(coid) > 40:
+        _s(o.symbol, 24, "symbol")
+        _s(o.client_order_id, 40, "client_order_id")
+    try:
+        side, otype, tif = _SIDE_ID[o.side], _ORDER_TYPE_ID[o.order_type], _TIF_ID[o.time_in_force]
+    except KeyError:
+        # slow path only for the error message
+        _enum(_SIDE_ID, o.side, "side")
+        _enum(_ORDER_TYPE_ID, o.order_type, "order_type")
+        _enum(_TIF_ID, o.time_in_force, "time_in_force")
+        raise
+    price = o.price
+    return _pack(
+        MAGIC, 3, 1, sym, coid, side, otype, tif,
+        _REDUCE_ONLY if o.reduce_only else 0,
+        float(o.qty),
+        math.nan if price is None else float(price),
+    )
+
+
+def _dec_order(buf: Buffer, _unpack: Callable[[Buffer], Tuple[Any, ...]] = _ORDER_V1.unpack_from) -> OrderRecord:
+    _, _, _, sym, coid, side, otype, tif, flags, qty, price = _unpack(buf)
+    return _tuple_new(OrderRecord, (
+        _INTERNED.get(sym) or _interned(sym), _SIDES[side], _ORDER_TYPES[otype],
+        qty, None if price != price else price, _TIFS[tif],
+        flags & _REDUCE_ONLY == _REDUCE_ONLY, coid.rstrip(b"\0").decode() if coid[0] else None,
+    ))
+
+
+ORDER = register(Schema("order", 3, 1, OrderRequest, _ORDER_V1, _enc_order, _dec_order, aliases=(OrderRecord,)))
+
+
+# -------------------------
+# fill v1 (adapters.paper.PaperFill)
+# -------------------------
+_FILL_V1 = struct.Struct("<2sBBq40s24sBBxxxxxxddd")
+_MAKER = 0x01
+
+
+def _enc_fill(f: Union[PaperFill, FillRecord], _pack: Callable[..., bytes] = _FILL_V1.pack) -> bytes:
+    return _pack(
+        MAGIC, 4, 1,
+        int(f.ts_ms),
+        _s(f.order_id, 40, "order_id"),
+        _s(f.symbol, 24, "symbol"),
+        _enum(_SIDE_ID, f.side, "side"),
+        _MAKER if f.maker else 0,
+        f.price, f.qty, f.fee,
+    )
+
+
+def _dec_fill(buf: Buffer, _unpack: Callable[[Buffer], Tuple[Any, ...]] = _FILL_V1.unpack_from) -> FillRecord:
+    _, _, _, ts, oid, sym, side, flags, price, qty, fee = _unpack(buf)
+    return _tuple_new(FillRecord, (
+        oid.rstrip(b"\0").decode(), _INTERNED.get(sym) or _interned(sym), _SIDES[side],
+        price, qty, flags & _MAKER == _MAKER, fee, ts,
+    ))
+
+
+FILL = register(Schema("fill", 4, 1, PaperFill, _FILL_V1, _enc_fill, _dec_fill, aliases=(FillRecord,)))
+
+
+# -------------------------
+# Dispatch
+# -------------------------
+def encode(obj: Any) -> bytes:
+    """Latest schema for type(obj) (gate dicts: any dict)."""
+    schema = _LATEST.get(type(obj))
+    if schema is None:
+        raise ValueError(f"no wire schema for {type(obj).__name__}")
+    return schema.encode(obj)
+
+
+def header(buf: Buffer) -> Schema:
+    schema = _BY_HEADER.get(bytes(buf[:HEADER_SIZE]))
+    if schema is not None:
+        return schema
+    if len(buf) < HEADER_SIZE:
+        raise ValueError("short wire record")
+    magic, type_id, version = _HDR.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError(f"not a wire record (magic {bytes(magic)!r})")
+    schema = _BY_ID.get((type_id, version))
+    if schema is None:
+        raise ValueError(f"unknown wire schema id={type_id} v{version}")
+    return schema
+
+
+def decode(buf: Buffer) -> Any:
+    dec = _DECODERS.get(buf[:HEADER_SIZE] if type(buf) is bytes else bytes(buf[:HEADER_SIZE]))
+    return dec(buf) if dec is not None else header(buf).decode(buf)
+
+
+def as_dict(obj: Any) -> Dict[str, Any]:
+    """Field dict of anything encode() takes or decode() returns."""
+    if isinstance(obj, dict):
+        return obj
+    if isinstance(obj, tuple):
+        return obj._asdict()  # type: ignore[attr-defined]
+    return asdict(obj)
+
+
+def to_debug_dict(buf: Buffer) -> Dict[str, Any]:
+    schema = header(buf)
+    return {"schema": schema.name, "version": schema.version, **as_dict(schema.decode(buf))}
+
+
+def to_json(buf: Buffer, *, indent: Optional[int] = 2) -> str:
+    return json.dumps(to_debug_dict(buf), ensure_ascii=False, indent=indent)
+
+
+# -------------------------
+# Files (one record per file, replaced atomically)
+# -------------------------
+def write_record(path: Path, obj: Any) -> Path:
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_bytes(encode(obj))
+    os.replace(tmp, p)
+    return p
+
+
+def read_record(path: Path) -> Optional[Any]:
+    """Decoded record, or None when missing / not a valid record."""
+    try:
+        return decode(Path(path).read_bytes())
+    except (OSError, ValueError, struct.error):
+        return None